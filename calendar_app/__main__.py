@@ -0,0 +1,11 @@
+"""
+包入口 - python -m calendar_app（参数见 calendar_app/app/cli.py）
+"""
+
+import sys
+
+from calendar_app.app.cli import main
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,525 @@
+"""
+基准测试 - 测量格子渲染、Excel构建与整图导出的耗时、体积与内存，并与基线比较
+
+用法:
+    python -m calendar_app.app.benchmark run --output bench.json
+    python -m calendar_app.app.benchmark run --baseline bench_baseline.json
+    python -m calendar_app.app.benchmark compare bench_baseline.json bench.json --time-threshold 0.2
+    python -m calendar_app.app.benchmark startup --budget-ms 250
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import PIL
+
+from calendar_app.config.calendar_config import CalendarConfig
+from calendar_app.integration.excel_builder import ExcelBuilder
+from calendar_app.models.calendar_models import ImageGenerationRequest
+from calendar_app.services.calendar_service import CalendarService
+from calendar_app.services.cell_image_service import CellImageService
+from calendar_app.services.full_image_exporter import FullImageExporter
+from calendar_app.services.layout_resolver import resolve_font_path
+from calendar_app.services.metrics import get_peak_rss_bytes
+from calendar_app.services.optional_imports import load_cairosvg
+from calendar_app.services.render_pool import RenderPool
+
+
+BENCHMARK_YEAR = 2026  # 固定年份，保证各次运行的输入一致
+RESULT_VERSION = 1  # 结果文件格式版本
+
+# 格子尺寸矩阵：名称 -> (Excel列宽, 行高点数)
+CELL_SIZES: Dict[str, Tuple[float, float]] = {
+    "small": (15, 80),
+    "default": (CalendarConfig.DATE_COLUMN_WIDTH, CalendarConfig.ROW_HEIGHT),
+    "large": (44, 240),
+}
+RENDER_BACKENDS = ("pil", "composite", "svg")
+RENDER_SCALES = (1, 2, 4)
+
+# 启动耗时：命令行入口在全新解释器中的导入耗时预算（毫秒），以及启动时不应加载的重量级依赖
+STARTUP_MODULE = "calendar_app.app.cli"
+IMPORT_BUDGET_MS = 250
+HEAVY_MODULES = ("openpyxl", "numpy", "cairosvg", "cairocffi")
+
+# 各类指标的默认回归阈值（相对基线的增幅），指标名后缀决定类别
+DEFAULT_THRESHOLDS = {"time": 0.15, "bytes": 0.05, "memory": 0.20}
+# 绝对差值低于该值的变化视为噪声（毫秒 / 字节）
+NOISE_FLOORS = {"time": 0.5, "bytes": 256, "memory": 256 * 1024}
+
+
+@dataclass
+class Regression:
+    """超过阈值的指标变化"""
+
+    case: str  # 用例名
+    metric: str  # 指标名
+    baseline: float  # 基线值
+    current: float  # 当前值
+    change: float  # 相对变化（0.2 表示变慢/变大 20%）
+    threshold: float  # 阈值
+
+
+def metric_kind(metric: str) -> Optional[str]:
+    """根据指标名判断类别（time / bytes / memory），不参与比较的指标返回None"""
+    if metric.endswith("_ms"):
+        return "time"
+    if metric.endswith("_peak_bytes"):
+        return "memory"
+    if metric.endswith("_bytes"):
+        return "bytes"
+    return None
+
+
+def make_config(base: CalendarConfig = CalendarConfig, **overrides) -> CalendarConfig:
+    """
+    生成基准测试用配置（关闭磁盘缓存、增量构建与并行，保证每次都真实渲染）
+
+    Args:
+        base: 基础配置
+        overrides: 覆盖的配置项
+
+    Returns:
+        CalendarConfig: 动态配置类
+    """
+    values = {
+        "CACHE_DIR": None,
+        "INCREMENTAL_BUILD": False,
+        "RENDER_WORKERS": 1,
+        "METRICS_FILE": None,
+    }
+    values.update(overrides)
+    return type("BenchmarkConfig", (base,), values)
+
+
+def _size_config(base: CalendarConfig, size_name: str, **overrides) -> CalendarConfig:
+    column_width, row_height = CELL_SIZES[size_name]
+    return make_config(base, DATE_COLUMN_WIDTH=column_width, ROW_HEIGHT=row_height, **overrides)
+
+
+def _time_ms(func: Callable[[], object]) -> Tuple[float, object]:
+    start = time.perf_counter()
+    result = func()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def _traced_peak(func: Callable[[], object]) -> int:
+    """单独运行一次并返回 tracemalloc 统计的Python分配峰值（字节）"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _rss_peak_worker(kind: str, base_snapshot: dict, size_name: str, work_dir: str) -> Optional[int]:
+    """在全新子进程中运行一次用例，返回该进程的RSS峰值"""
+    base = CalendarConfig.from_snapshot(base_snapshot)
+    if kind == "xlsx":
+        bench_xlsx(base, size_name, 1, work_dir, measure_rss=False)
+    else:
+        bench_full_image(base, size_name, 1, work_dir, measure_rss=False)
+    return get_peak_rss_bytes()
+
+
+def _rss_peak(kind: str, base: CalendarConfig, size_name: str, work_dir: str) -> Optional[int]:
+    """
+    进程RSS峰值（含Pillow等C层内存，tracemalloc 统计不到）
+
+    每次在 spawn 出的新进程中测量，结果包含解释器与依赖库的基础占用，适合前后对比。
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(_rss_peak_worker, kind, base.snapshot(), size_name, work_dir).result()
+
+
+def _percentile(samples: Sequence[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def bench_cell_render(base: CalendarConfig, backend: str, scale: int, size_name: str,
+                      repeat: int) -> Optional[Dict[str, float]]:
+    """
+    单格渲染延迟（预热一轮后，逐格计时 repeat 轮）
+
+    Returns:
+        Optional[Dict[str, float]]: 指标，后端不可用时为None
+    """
+    if backend == "svg" and load_cairosvg() is None:
+        return None
+    config = _size_config(base, size_name, RENDER_ENGINE=backend, RENDER_SCALE=scale)
+    service = CellImageService(config)
+    data = CalendarService(config, service.layout).generate_year_data(BENCHMARK_YEAR)
+    requests = [
+        ImageGenerationRequest(
+            month=cell.month,
+            day=cell.day,
+            weekday_char=cell.weekday_char,
+            cell_width_px=cell.width_px,
+            cell_height_px=cell.height_px,
+            is_weekend=cell.is_weekend,
+        )
+        for cell in data.months[0].cells
+    ]
+    # 第一轮包含字体加载、字号拟合与图层缓存的建立
+    first_pass, _images = _time_ms(lambda: [service.create_image(request) for request in requests])
+
+    samples = []
+    for _ in range(repeat):
+        for request in requests:
+            elapsed, _image = _time_ms(lambda: service.create_image(request))
+            samples.append(elapsed)
+    return {
+        "first_pass_ms": first_pass / len(requests),
+        "median_ms": statistics.median(samples),
+        "p95_ms": _percentile(samples, 0.95),
+        "mean_ms": statistics.fmean(samples),
+        "samples": len(samples),
+    }
+
+
+def bench_xlsx(base: CalendarConfig, size_name: str, repeat: int, work_dir: str,
+               measure_rss: bool = True) -> Dict[str, float]:
+    """整年xlsx：构建（建表 + 渲染 + 填充）与保存耗时、文件大小、内存峰值"""
+    config = _size_config(base, size_name, TEMP_DIR=os.path.join(work_dir, "temp"))
+    output_file = os.path.join(work_dir, f"bench_{size_name}.xlsx")
+    with RenderPool(config, workers=1) as pool:
+        data = CalendarService(config, pool.layout).generate_year_data(BENCHMARK_YEAR)
+
+        def build() -> ExcelBuilder:
+            builder = ExcelBuilder(config, render_pool=pool)
+            builder.create_workbook()
+            builder.setup_layout()
+            builder.fill_cells(data)
+            return builder
+
+        def build_and_save():
+            if not build().save(output_file):
+                raise RuntimeError(f"保存文件失败: {output_file}")
+
+        build_and_save()  # 预热字体与图层缓存
+        build_times = []
+        save_times = []
+        for _ in range(repeat):
+            gc.collect()
+            elapsed, builder = _time_ms(build)
+            build_times.append(elapsed)
+            elapsed, saved = _time_ms(lambda: builder.save(output_file))
+            if not saved:
+                raise RuntimeError(f"保存文件失败: {output_file}")
+            save_times.append(elapsed)
+        peak = _traced_peak(build_and_save)
+    metrics = {
+        "build_ms": statistics.median(build_times),
+        "save_ms": statistics.median(save_times),
+        "output_bytes": os.path.getsize(output_file),
+        "traced_peak_bytes": peak,
+    }
+    if measure_rss:
+        metrics["rss_peak_bytes"] = _rss_peak("xlsx", base, size_name, work_dir)
+    return metrics
+
+
+def bench_full_image(base: CalendarConfig, size_name: str, repeat: int, work_dir: str,
+                     measure_rss: bool = True) -> Dict[str, float]:
+    """整年大图：FullImageExporter 渲染并保存PNG的耗时、文件大小、内存峰值"""
+    config = _size_config(base, size_name)
+    output_file = os.path.join(work_dir, f"bench_{size_name}.png")
+    with RenderPool(config, workers=1) as pool:
+        exporter = FullImageExporter(config, render_pool=pool)
+        data = CalendarService(config, pool.layout).generate_year_data(BENCHMARK_YEAR)
+        render = lambda: exporter.render_year_image(data, output_file)
+        render()
+        times = []
+        for _ in range(repeat):
+            gc.collect()
+            times.append(_time_ms(render)[0])
+        peak = _traced_peak(render)
+    metrics = {
+        "render_ms": statistics.median(times),
+        "output_bytes": os.path.getsize(output_file),
+        "traced_peak_bytes": peak,
+    }
+    if measure_rss:
+        metrics["rss_peak_bytes"] = _rss_peak("full_image", base, size_name, work_dir)
+    return metrics
+
+
+_IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+print(json.dumps({{"import_ms": elapsed, "heavy": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def bench_import(repeat: int, module: str = STARTUP_MODULE) -> Dict[str, float]:
+    """
+    模块在全新解释器中的导入耗时（每轮启动一个子进程，取中位数）
+
+    Returns:
+        Dict[str, float]: import_ms 与启动时已加载的重量级依赖个数 heavy_modules
+    """
+    package_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [package_root, env.get("PYTHONPATH")]))
+    code = _IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)
+    times = []
+    heavy = []
+    for _ in range(max(3, repeat)):
+        output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True,
+                                text=True, check=True).stdout
+        probe = json.loads(output.strip().splitlines()[-1])
+        times.append(probe["import_ms"])
+        heavy = probe["heavy"]
+    if heavy:
+        print(f" 已加载重量级依赖: {', '.join(heavy)}", end="")
+    return {"import_ms": statistics.median(times), "heavy_modules": len(heavy)}
+
+
+def check_import_budget(metrics: Dict[str, float], budget_ms: float = IMPORT_BUDGET_MS) -> List[str]:
+    """
+    检查启动耗时是否在预算内
+
+    Returns:
+        List[str]: 超出预算的说明（为空表示通过）
+    """
+    problems = []
+    if metrics["import_ms"] > budget_ms:
+        problems.append(f"导入耗时 {metrics['import_ms']:.1f}ms 超过预算 {budget_ms:.0f}ms")
+    if metrics["heavy_modules"]:
+        problems.append(f"启动时加载了 {metrics['heavy_modules']} 个重量级依赖（{', '.join(HEAVY_MODULES)}）")
+    return problems
+
+
+def run_benchmarks(base: CalendarConfig = CalendarConfig, repeat: int = 3, quick: bool = False,
+                   case_filter: Optional[str] = None) -> dict:
+    """
+    运行完整基准矩阵
+
+    Args:
+        base: 基础配置（字体、颜色等沿用该配置）
+        repeat: 每个用例的重复轮数（取中位数）
+        quick: 只测默认格子尺寸
+        case_filter: 只运行名称包含该子串的用例
+
+    Returns:
+        dict: 结果（meta + 各用例指标）
+    """
+    sizes = ["default"] if quick else list(CELL_SIZES)
+    cases: List[Tuple[str, Callable[[str], Optional[Dict[str, float]]]]] = [
+        ("startup/import_cli", lambda work_dir: bench_import(repeat)),
+    ]
+    for size_name in sizes:
+        for backend in RENDER_BACKENDS:
+            for scale in RENDER_SCALES:
+                cases.append((
+                    f"cell_render/{backend}/scale{scale}/{size_name}",
+                    lambda work_dir, b=backend, s=scale, n=size_name: bench_cell_render(base, b, s, n, repeat),
+                ))
+        cases.append((f"xlsx/{size_name}", lambda work_dir, n=size_name: bench_xlsx(base, n, repeat, work_dir)))
+        cases.append((f"full_image/{size_name}",
+                      lambda work_dir, n=size_name: bench_full_image(base, n, repeat, work_dir)))
+
+    results = {}
+    skipped = []
+    with tempfile.TemporaryDirectory(prefix="calendar_bench_") as work_dir:
+        for name, run in cases:
+            if case_filter and case_filter not in name:
+                continue
+            print(f"  {name} ...", end="", flush=True)
+            metrics = run(work_dir)
+            if metrics is None:
+                skipped.append(name)
+                print(" 跳过（后端不可用）")
+                continue
+            results[name] = metrics
+            print(" " + ", ".join(f"{key}={_format_value(key, value)}" for key, value in metrics.items()))
+
+    return {
+        "version": RESULT_VERSION,
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pillow": PIL.__version__,
+            "cairosvg": load_cairosvg() is not None,
+            "cpu_count": os.cpu_count(),
+            "font_path": resolve_font_path(base),
+            "year": BENCHMARK_YEAR,
+            "repeat": repeat,
+            "skipped": skipped,
+        },
+        "results": results,
+    }
+
+
+def compare_results(baseline: dict, current: dict,
+                    thresholds: Optional[Dict[str, float]] = None) -> List[Regression]:
+    """
+    与基线比较，返回超过阈值的指标（数值越小越好，新增或缺失的用例不计）
+
+    Args:
+        baseline: 基线结果
+        current: 当前结果
+        thresholds: 各类别阈值（默认 DEFAULT_THRESHOLDS）
+
+    Returns:
+        List[Regression]: 回归列表
+    """
+    thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+    regressions = []
+    for case, metrics in current.get("results", {}).items():
+        base_metrics = baseline.get("results", {}).get(case)
+        if not base_metrics:
+            continue
+        for metric, value in metrics.items():
+            kind = metric_kind(metric)
+            base_value = base_metrics.get(metric)
+            if kind is None or not base_value:
+                continue
+            if value - base_value <= NOISE_FLOORS[kind]:
+                continue
+            change = value / base_value - 1
+            if change > thresholds[kind]:
+                regressions.append(Regression(case, metric, base_value, value, change, thresholds[kind]))
+    return regressions
+
+
+def print_comparison(baseline: dict, current: dict, regressions: List[Regression]):
+    """打印与基线的逐项对比"""
+    flagged = {(item.case, item.metric) for item in regressions}
+    for case, metrics in current.get("results", {}).items():
+        base_metrics = baseline.get("results", {}).get(case, {})
+        for metric, value in metrics.items():
+            base_value = base_metrics.get(metric)
+            if metric_kind(metric) is None or not base_value:
+                continue
+            mark = "✗" if (case, metric) in flagged else "✓"
+            print(f"  {mark} {case} {metric}: {_format_value(metric, base_value)} -> "
+                  f"{_format_value(metric, value)} ({value / base_value - 1:+.1%})")
+
+
+def _format_value(metric: str, value: float) -> str:
+    kind = metric_kind(metric)
+    if kind == "time":
+        return f"{value:.2f}ms"
+    if kind in ("bytes", "memory"):
+        return f"{value / 1024:.1f}KB"
+    return str(value)
+
+
+def load_results(path: str) -> dict:
+    """读取结果文件"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_results(results: dict, path: str):
+    """写出结果文件（JSON）"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def _thresholds_from_args(args) -> Dict[str, float]:
+    return {"time": args.time_threshold, "bytes": args.size_threshold, "memory": args.memory_threshold}
+
+
+def _add_threshold_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--time-threshold", type=float, default=DEFAULT_THRESHOLDS["time"],
+                        help="耗时回归阈值（相对增幅，默认0.15）")
+    parser.add_argument("--size-threshold", type=float, default=DEFAULT_THRESHOLDS["bytes"],
+                        help="文件大小回归阈值（默认0.05）")
+    parser.add_argument("--memory-threshold", type=float, default=DEFAULT_THRESHOLDS["memory"],
+                        help="内存峰值回归阈值（默认0.20）")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(prog="calendar_app.app.benchmark", description="年日历渲染与导出基准测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run = subparsers.add_parser("run", help="运行基准测试")
+    run.add_argument("--output", default=None, help="结果JSON文件")
+    run.add_argument("--baseline", default=None, help="基线JSON文件（提供时比较并在回归时返回1）")
+    run.add_argument("--repeat", type=int, default=3, help="每个用例重复轮数（默认3）")
+    run.add_argument("--quick", action="store_true", help="只测默认格子尺寸")
+    run.add_argument("--filter", default=None, help="只运行名称包含该子串的用例")
+    _add_threshold_arguments(run)
+
+    compare = subparsers.add_parser("compare", help="比较两个结果文件")
+    compare.add_argument("baseline", help="基线JSON文件")
+    compare.add_argument("current", help="当前结果JSON文件")
+    _add_threshold_arguments(compare)
+
+    startup = subparsers.add_parser("startup", help="测量命令行入口的导入耗时并检查预算")
+    startup.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS,
+                         help=f"导入耗时预算（毫秒，默认{IMPORT_BUDGET_MS}）")
+    startup.add_argument("--repeat", type=int, default=5, help="子进程启动次数（默认5，取中位数）")
+    return parser
+
+
+def _report(baseline: dict, current: dict, thresholds: Dict[str, float]) -> int:
+    regressions = compare_results(baseline, current, thresholds)
+    print(f"\n与基线比较:")
+    print_comparison(baseline, current, regressions)
+    if regressions:
+        print(f"\n✗ {len(regressions)} 项指标超过回归阈值")
+        return 1
+    print(f"\n✓ 未发现回归")
+    return 0
+
+
+def _check_startup(budget_ms: float, repeat: int) -> int:
+    metrics = bench_import(repeat)
+    print(f"{STARTUP_MODULE} 导入耗时: {metrics['import_ms']:.1f}ms（预算 {budget_ms:.0f}ms）")
+    problems = check_import_budget(metrics, budget_ms)
+    for problem in problems:
+        print(f"✗ {problem}")
+    if problems:
+        return 1
+    print(f"✓ 启动耗时在预算内")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行主函数"""
+    args = build_parser().parse_args(argv)
+    if args.command == "compare":
+        return _report(load_results(args.baseline), load_results(args.current), _thresholds_from_args(args))
+    if args.command == "startup":
+        return _check_startup(args.budget_ms, args.repeat)
+
+    print(f"开始基准测试（重复 {args.repeat} 轮）...")
+    results = run_benchmarks(repeat=max(1, args.repeat), quick=args.quick, case_filter=args.filter)
+    if args.output:
+        save_results(results, args.output)
+        print(f"✓ 结果已写入: {args.output}")
+    if args.baseline:
+        return _report(load_results(args.baseline), results, _thresholds_from_args(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
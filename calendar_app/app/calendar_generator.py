@@ -2,28 +2,84 @@
 日历生成器 - 主应用类，协调各个服务完成日历生成
 """
 
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Iterable, Optional, Sequence
 
 from calendar_app.config.calendar_config import CalendarConfig
+from calendar_app.models.calendar_models import BatchJob, BatchReport
 from calendar_app.services.calendar_service import CalendarService
 from calendar_app.services.file_manager import FileManager
-from calendar_app.integration.excel_builder import ExcelBuilder
+from calendar_app.services.full_image_exporter import FullImageExporter
+from calendar_app.services.layout_resolver import resolve_layout
+from calendar_app.services.metrics import MetricsRecorder, RunMetrics, counter_delta
+from calendar_app.services.build_manifest import BuildManifest
+from calendar_app.services.output_store import OutputStore
+from calendar_app.services.pdf_exporter import PdfExporter
+from calendar_app.services.render_pool import RenderPool
+from calendar_app.services.tile_exporter import DeepZoomExporter
 
 
 class CalendarGenerator:
     """日历生成器 - 协调各服务完成日历生成"""
     
-    def __init__(self, config: CalendarConfig = None):
+    SUPPORTED_FORMATS = ("xlsx", "png", "pdf", "dzi")  # 批量生成支持的输出格式
+    
+    def __init__(self, config: CalendarConfig = None, workers: Optional[int] = None):
         """
         初始化生成器
         
         Args:
             config: 配置对象（可选，默认使用标准配置）
+            workers: 格子渲染进程数（可选，默认按CPU核数，1 为串行）
         """
         self.config = config or CalendarConfig
-        self.calendar_service = CalendarService(self.config)
+        self.layout = resolve_layout(self.config)
+        self.calendar_service = CalendarService(self.config, self.layout)
         self.file_manager = FileManager(self.config)
-        self.excel_builder = ExcelBuilder(self.config)
+        self.render_pool = RenderPool(self.config, workers, layout=self.layout)
+        self._excel_builder = None  # 首次生成xlsx时创建（openpyxl 导入较慢，只导出图片/PDF时不加载）
+        self.image_exporter = FullImageExporter(self.config, render_pool=self.render_pool)
+        self.tile_exporter = DeepZoomExporter(self.config, image_exporter=self.image_exporter)
+        self.pdf_exporter = PdfExporter(self.config, image_exporter=self.image_exporter)
+        self.output_store = OutputStore(self.config)
+        self.build_manifest = BuildManifest(self.config)
+        self._year_class_locks = {}
+        self._year_class_locks_guard = threading.Lock()
+    
+    @property
+    def excel_builder(self):
+        """Excel构建器（延迟创建）"""
+        if self._excel_builder is None:
+            self._excel_builder = self._create_excel_builder()
+        return self._excel_builder
+    
+    def _create_excel_builder(self, streaming: bool = False):
+        """创建Excel构建器（按需导入 openpyxl 集成层）"""
+        if streaming:
+            from calendar_app.integration.streaming_excel_builder import StreamingExcelBuilder
+            return StreamingExcelBuilder(self.config, render_pool=self.render_pool)
+        from calendar_app.integration.excel_builder import ExcelBuilder
+        return ExcelBuilder(self.config, render_pool=self.render_pool)
+    
+    def warm_up(self, formats: Sequence[str] = ("xlsx",)):
+        """
+        预先加载指定格式用到的后端、字体与渲染进程（常驻模式下启动时调用一次）
+        
+        Args:
+            formats: 之后要生成的输出格式
+        """
+        for fmt in formats:
+            if fmt not in self.SUPPORTED_FORMATS:
+                raise ValueError(f"不支持的输出格式: {fmt}")
+        if "xlsx" in formats:
+            self._create_excel_builder()
+        if "pdf" in formats and not self.pdf_exporter.is_available():
+            print("  ✗ PDF导出不可用（需要 cairosvg 及系统 cairo 库）")
+        self.render_pool.warm_up()
     
     def generate(self, year: int = None, output_file: str = None) -> bool:
         """
@@ -36,56 +92,415 @@ class CalendarGenerator:
         Returns:
             bool: 是否成功生成
         """
+        return self.generate_with_metrics(year, output_file).success
+    
+    def generate_with_metrics(self, year: int = None, output_file: str = None,
+                              metrics_file: str = None) -> RunMetrics:
+        """
+        生成年日历并返回运行指标（各阶段耗时、格子渲染耗时分布、缓存命中率、内存峰值）
+        
+        Args:
+            year: 年份（默认当前年份）
+            output_file: 输出文件名（默认为yearly_calendar_{year}.xlsx）
+            metrics_file: 指标追加写入的 JSON lines 文件（默认使用配置 METRICS_FILE，为None时不写）
+            
+        Returns:
+            RunMetrics: 运行指标（失败时 status 为 failed，error 为异常信息）
+        """
+        metrics = RunMetrics(format="xlsx")
+        recorder = MetricsRecorder(metrics, trace_memory=self.config.METRICS_TRACEMALLOC)
+        render_cache_before = self.render_pool.render_cache.get_stats()
+        font_cache_before = self.render_pool.image_service.get_font_cache_stats().as_dict()
+        recorder.start()
+        with self.render_pool.collect_latency() as latency:
+            try:
+                metrics.status = self._generate_workbook(year, output_file, metrics, recorder)
+            except Exception as e:
+                metrics.status = "failed"
+                metrics.error = f"{type(e).__name__}: {e}"
+                print(f"\n✗ 生成日历出错: {e}")
+                # 清理临时文件
+                if self._excel_builder is not None:
+                    self._excel_builder.cleanup_temp_files()
+        metrics.cell_latency = latency
+        recorder.finish()
+        metrics.render_cache = counter_delta(render_cache_before, self.render_pool.render_cache.get_stats())
+        metrics.font_cache = counter_delta(
+            font_cache_before, self.render_pool.image_service.get_font_cache_stats().as_dict())
+        
+        metrics_file = metrics_file or self.config.METRICS_FILE
+        if metrics_file:
+            try:
+                metrics.write_jsonl(metrics_file)
+            except OSError as e:
+                print(f"写入运行指标失败: {e}")
+        return metrics
+    
+    def _generate_workbook(self, year: Optional[int], output_file: Optional[str],
+                           metrics: RunMetrics, recorder: MetricsRecorder) -> str:
+        """
+        生成年日历工作簿（各阶段计入 recorder）
+        
+        Returns:
+            str: rendered（新生成）、cached（复用缓存）或 skipped（输出已是最新）
+        """
+        # 处理默认参数
+        if year is None:
+            year = datetime.now().year
+        
+        if output_file is None:
+            output_file = self.file_manager.get_output_filename(year)
+        metrics.year = year
+        metrics.output_file = output_file
+        
+        print(f"开始生成年日历...")
+        print(f"  年份: {year}")
+        print(f"  输出文件: {output_file}")
+        
+        with recorder.stage("check"):
+            # 输入未变化时直接跳过（类似 make）
+            stale_stages = self.build_manifest.get_stale_stages(year, "xlsx", output_file)
+            if not stale_stages:
+                print(f"\n✓ 输出已是最新，跳过生成: {output_file}")
+                return "skipped"
+            if self.build_manifest.enabled:
+                print(f"  需要重建的阶段: {', '.join(stale_stages)}")
+            
+            # 同类年份（闰年与否 + 1月1日周几）的成品完全一致，命中缓存时直接复用
+            year_class = self.calendar_service.get_year_class(year)
+            if self.output_store.restore(year_class, "xlsx", output_file):
+                self.build_manifest.record(year, "xlsx", output_file)
+                print(f"\n✓ 复用同类年份缓存 ({year_class.key})")
+                print(f"✓ 文件: {output_file}")
+                return "cached"
+        
+        # 第1阶段：数据准备
+        print(f"\n[1/4] 生成日历数据...")
+        with recorder.stage("data"):
+            calendar_data = self.calendar_service.generate_year_data(year)
+        print(f"  ✓ 总格子数: {calendar_data.total_cells}")
+        
+        # 第2阶段：创建Excel工作簿
+        print(f"\n[2/4] 创建Excel工作簿...")
+        with recorder.stage("workbook"):
+            self.excel_builder.create_workbook()
+            self.excel_builder.setup_layout()
+        print(f"  ✓ 工作簿创建成功")
+        
+        # 第3阶段：填充数据和图像
+        print(f"\n[3/4] 生成格子图像并填充数据...")
+        with recorder.stage("fill"):
+            self.excel_builder.fill_cells(calendar_data)
+        print(f"  ✓ 数据填充完成")
+        cache_stats = self.render_pool.render_cache.get_stats()
+        if self.render_pool.render_cache.enabled:
+            print(f"  ✓ 渲染缓存: 命中 {cache_stats.hits}, 未命中 {cache_stats.misses}")
+        media_registry = self.excel_builder.media_registry
+        if media_registry.images_added:
+            print(f"  ✓ 图像去重: {media_registry.images_added} 张 -> {media_registry.unique_count} 个媒体文件")
+        encode_stats = self.excel_builder.encode_stats
+        if encode_stats.images:
+            print(f"  ✓ PNG编码 ({self.render_pool.png_profile}): {encode_stats.images} 张, "
+                  f"原始像素 {encode_stats.raw_bytes / 1024:.0f} KB -> {encode_stats.encoded_bytes / 1024:.0f} KB")
+            if encode_stats.baseline_images and self.render_pool.png_profile != "default":
+                print(f"  ✓ 相对 default 档位 ({encode_stats.baseline_images} 张): "
+                      f"{encode_stats.baseline_bytes / 1024:.0f} KB -> {encode_stats.compared_bytes / 1024:.0f} KB, "
+                      f"节省 {encode_stats.saved_bytes / 1024:.0f} KB")
+        font_stats = self.excel_builder.image_service.get_font_cache_stats()
+        print(f"  ✓ 字体缓存: 命中 {font_stats.font_hits}, 加载 {font_stats.font_misses}; "
+              f"字号拟合: 命中 {font_stats.fit_hits}, 计算 {font_stats.fit_misses}")
+        
+        # 第4阶段：保存文件
+        print(f"\n[4/4] 保存Excel文件...")
+        with recorder.stage("save"):
+            if not self.excel_builder.save(output_file):
+                raise RuntimeError(f"保存文件失败: {output_file}")
+            self.output_store.save_file(year_class, "xlsx", output_file)
+            self.build_manifest.record(year, "xlsx", output_file)
+        print(f"  ✓ 文件保存成功")
+        
+        # 清理临时文件
+        print(f"\n清理临时文件...")
+        with recorder.stage("cleanup"):
+            self.excel_builder.cleanup_temp_files()
+        print(f"  ✓ 清理完成")
+        
+        # 成功完成
+        print(f"\n{'='*50}")
+        print(f"✓ 年日历已成功生成")
+        print(f"✓ 文件: {output_file}")
+        print(f"✓ 年份: {year}")
+        print(f"✓ 耗时: " + ", ".join(f"{stage.name} {stage.wall:.2f}s" for stage in metrics.stages))
+        print(f"{'='*50}")
+        
+        return "rendered"
+    
+    def close(self):
+        """释放渲染进程池"""
+        self.render_pool.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def export_image(self, year: int = None, output_file: str = None) -> bool:
+        """
+        导出一张完整年日历图片
+        
+        Args:
+            year: 年份（默认当前年份）
+            output_file: 输出文件名（默认为yearly_calendar_{year}.png）
+            
+        Returns:
+            bool: 是否成功导出
+        """
         try:
-            # 处理默认参数
             if year is None:
                 year = datetime.now().year
             
             if output_file is None:
-                output_file = self.file_manager.get_output_filename(year)
+                output_file = self.get_output_path("png", year)
             
-            print(f"开始生成年日历...")
-            print(f"  年份: {year}")
-            print(f"  输出文件: {output_file}")
+            status = self._produce("png", year, output_file)
+            if status == "skipped":
+                print(f"✓ 输出已是最新，跳过导出: {output_file}")
+            elif status == "cached":
+                print(f"✓ 复用同类年份缓存: {output_file}")
+            else:
+                print(f"✓ 年日历大图已导出: {output_file}")
+            return True
+        
+        except Exception as e:
+            print(f"\n✗ 导出日历大图出错: {e}")
+            return False
+    
+    def export_pdf(self, year: int = None, output_file: str = None) -> bool:
+        """
+        导出单页矢量PDF（按 PAPER_SIZE / ORIENTATION 排版，需要 cairosvg）
+        
+        Args:
+            year: 年份（默认当前年份）
+            output_file: 输出文件名（默认为yearly_calendar_{year}.pdf）
+            
+        Returns:
+            bool: 是否成功导出
+        """
+        try:
+            if year is None:
+                year = datetime.now().year
+            
+            if output_file is None:
+                output_file = self.get_output_path("pdf", year)
+            
+            status = self._produce("pdf", year, output_file)
+            if status == "skipped":
+                print(f"✓ 输出已是最新，跳过导出: {output_file}")
+            elif status == "cached":
+                print(f"✓ 复用同类年份缓存: {output_file}")
+            else:
+                print(f"✓ 年日历PDF已导出: {output_file}")
+            return True
+        
+        except Exception as e:
+            print(f"\n✗ 导出日历PDF出错: {e}")
+            return False
+    
+    def export_tiles(self, year: int = None, output_file: str = None) -> bool:
+        """
+        导出 Deep Zoom 瓦片金字塔（供网页缩放查看）
+        
+        Args:
+            year: 年份（默认当前年份）
+            output_file: .dzi 文件名（默认为yearly_calendar_{year}.dzi，瓦片在同名 _files 目录）
+            
+        Returns:
+            bool: 是否成功导出
+        """
+        try:
+            if year is None:
+                year = datetime.now().year
+            
+            if output_file is None:
+                output_file = self.get_output_path("dzi", year)
+            
+            status = self._produce("dzi", year, output_file)
+            if status == "skipped":
+                print(f"✓ 输出已是最新，跳过导出: {output_file}")
+            else:
+                print(f"✓ 瓦片金字塔已导出: {output_file}")
+            return True
+        
+        except Exception as e:
+            print(f"\n✗ 导出瓦片金字塔出错: {e}")
+            return False
+    
+    def generate_batch(self, years: Iterable[int], formats: Sequence[str] = ("xlsx",),
+                       output_dir: str = ".", max_jobs: Optional[int] = None) -> BatchReport:
+        """
+        批量生成多个年份、多种格式的日历
+        
+        所有任务共享同一个渲染进程池、字体缓存与图层缓存，任务之间并发执行（有上限）。
+        
+        Args:
+            years: 年份列表
+            formats: 输出格式（xlsx / png / pdf / dzi）
+            output_dir: 输出目录
+            max_jobs: 同时进行的任务数（默认使用配置 BATCH_MAX_JOBS）
+            
+        Returns:
+            BatchReport: 各任务状态、耗时与吞吐量
+        """
+        for fmt in formats:
+            if fmt not in self.SUPPORTED_FORMATS:
+                raise ValueError(f"不支持的输出格式: {fmt}")
+        
+        os.makedirs(output_dir, exist_ok=True)
+        jobs = [
+            BatchJob(year=year, format=fmt,
+                     output_file=os.path.join(output_dir, self.get_output_path(fmt, year)))
+            for year in years
+            for fmt in formats
+        ]
+        return self.run_jobs(jobs, max_jobs)
+    
+    def run_jobs(self, jobs: Sequence[BatchJob], max_jobs: Optional[int] = None) -> BatchReport:
+        """
+        执行一组生成任务（输出路径由调用方指定）
+        
+        Args:
+            jobs: 任务列表
+            max_jobs: 同时进行的任务数（默认使用配置 BATCH_MAX_JOBS）
+            
+        Returns:
+            BatchReport: 各任务状态、耗时与吞吐量
+        """
+        for job in jobs:
+            if job.format not in self.SUPPORTED_FORMATS:
+                raise ValueError(f"不支持的输出格式: {job.format}")
+        
+        jobs = list(jobs)
+        max_jobs = max(1, int(max_jobs or self.config.BATCH_MAX_JOBS))
+        
+        print(f"开始批量生成: {len(jobs)} 个任务, 并发 {max_jobs}, 渲染进程 {self.render_pool.workers}")
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_jobs) as executor:
+            for job in executor.map(self._run_batch_job, jobs):
+                if job.status == "failed":
+                    print(f"  ✗ {job.year} {job.format}: {job.error}")
+                else:
+                    print(f"  ✓ {job.year} {job.format} ({job.status}, {job.elapsed:.2f}s) -> {job.output_file}")
+        report = BatchReport(jobs=jobs, elapsed=time.perf_counter() - start)
+        
+        print(f"\n{'='*50}")
+        print(f"✓ 成功 {len(report.succeeded)} / {len(jobs)}（渲染 {report.count('rendered')}，"
+              f"复用缓存 {report.count('cached')}，已是最新 {report.count('skipped')}），失败 {len(report.failed)}")
+        print(f"✓ 总耗时 {report.elapsed:.2f}s，渲染吞吐量 {report.calendars_per_minute:.1f} 个/分钟")
+        print(f"{'='*50}")
+        return report
+    
+    def get_output_path(self, fmt: str, year: int) -> str:
+        """按输出格式获取默认文件名"""
+        if fmt == "png":
+            return self.file_manager.get_output_image_filename(year)
+        if fmt == "pdf":
+            return self.file_manager.get_output_pdf_filename(year)
+        if fmt == "dzi":
+            return self.file_manager.get_output_tiles_filename(year)
+        return self.file_manager.get_output_filename(year)
+    
+    def _run_batch_job(self, job: BatchJob) -> BatchJob:
+        """执行单个批量任务（异常记录到任务中，不影响其他任务）"""
+        start = time.perf_counter()
+        try:
+            job.status = self._produce(job.format, job.year, job.output_file)
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        job.elapsed = time.perf_counter() - start
+        return job
+    
+    def _produce(self, fmt: str, year: int, output_file: str) -> str:
+        """
+        生成单个输出文件（同类年份命中成品缓存时直接复制）
+        
+        Returns:
+            str: rendered（新生成）、cached（复用缓存）或 skipped（输出已是最新）
+        """
+        if not self.build_manifest.get_stale_stages(year, fmt, output_file):
+            return "skipped"
+        
+        year_class = self.calendar_service.get_year_class(year)
+        # 同一年份类别同时只渲染一次，后到的任务等待后直接复用缓存
+        with self._get_year_class_lock(year_class, fmt):
+            if self.output_store.restore(year_class, fmt, output_file):
+                self.build_manifest.record(year, fmt, output_file)
+                return "cached"
             
-            # 第1阶段：数据准备
-            print(f"\n[1/4] 生成日历数据...")
             calendar_data = self.calendar_service.generate_year_data(year)
-            print(f"  ✓ 总格子数: {calendar_data.total_cells}")
+            if fmt == "png":
+                self.image_exporter.render_year_image(calendar_data, output_file)
+            elif fmt == "pdf":
+                self.pdf_exporter.export(calendar_data, output_file)
+            elif fmt == "dzi":
+                self.tile_exporter.export(calendar_data, output_file)
+            else:
+                builder = self._create_excel_builder()
+                try:
+                    builder.create_workbook()
+                    builder.setup_layout()
+                    builder.fill_cells(calendar_data)
+                    if not builder.save(output_file):
+                        raise RuntimeError(f"保存文件失败: {output_file}")
+                finally:
+                    builder.cleanup_temp_files()
+            self.output_store.save_file(year_class, fmt, output_file)
+            self.build_manifest.record(year, fmt, output_file)
+            return "rendered"
+    
+    def _get_year_class_lock(self, year_class, fmt: str) -> threading.Lock:
+        with self._year_class_locks_guard:
+            return self._year_class_locks.setdefault((year_class, fmt), threading.Lock())
+    
+    def generate_multi_year(self, years: Iterable[int], output_file: str = None) -> bool:
+        """
+        生成多年份工作簿（每年一张工作表，流式写出，内存占用不随年份数增长）
+        
+        Args:
+            years: 年份列表
+            output_file: 输出文件名（默认为yearly_calendar_{start}-{end}.xlsx）
             
-            # 第2阶段：创建Excel工作簿
-            print(f"\n[2/4] 创建Excel工作簿...")
-            self.excel_builder.create_workbook()
-            self.excel_builder.setup_layout()
-            print(f"  ✓ 工作簿创建成功")
+        Returns:
+            bool: 是否成功生成
+        """
+        try:
+            years = list(years)
+            if not years:
+                raise ValueError("年份列表为空")
             
-            # 第3阶段：填充数据和图像
-            print(f"\n[3/4] 生成格子图像并填充数据...")
-            self.excel_builder.fill_cells(calendar_data)
-            print(f"  ✓ 数据填充完成")
+            if output_file is None:
+                output_file = self.file_manager.get_multi_year_filename(min(years), max(years))
             
-            # 第4阶段：保存文件
-            print(f"\n[4/4] 保存Excel文件...")
-            if not self.excel_builder.save(output_file):
-                return False
-            print(f"  ✓ 文件保存成功")
+            print(f"开始生成多年份日历...")
+            print(f"  年份: {years[0]} ~ {years[-1]} (共{len(years)}年)")
+            print(f"  输出文件: {output_file}")
             
-            # 清理临时文件
-            print(f"\n清理临时文件...")
-            self.file_manager.cleanup_temp_files()
-            print(f"  ✓ 清理完成")
+            builder = self._create_excel_builder(streaming=True)
+            builder.create_workbook()
+            for year in years:
+                calendar_data = self.calendar_service.generate_year_data(year)
+                builder.add_year_sheet(calendar_data)
+                print(f"  ✓ {year} 工作表已写出")
             
-            # 成功完成
-            print(f"\n{'='*50}")
-            print(f"✓ 年日历已成功生成")
-            print(f"✓ 文件: {output_file}")
-            print(f"✓ 年份: {year}")
-            print(f"{'='*50}")
+            if not builder.save(output_file):
+                return False
             
+            registry = builder.media_registry
+            print(f"\n✓ 多年份日历已生成: {output_file}")
+            print(f"✓ 图像去重: {registry.images_added} 张 -> {registry.unique_count} 个媒体文件")
             return True
         
         except Exception as e:
-            print(f"\n✗ 生成日历出错: {e}")
-            # 清理临时文件
-            self.file_manager.cleanup_temp_files()
+            print(f"\n✗ 生成多年份日历出错: {e}")
             return False
@@ -0,0 +1,280 @@
+"""
+命令行入口 - 生成一个或多个年份、多种格式的日历
+
+用法:
+    python -m calendar_app --years 2026 --formats xlsx,png,pdf --output-dir out
+    python -m calendar_app --years 2026 --formats pdf --output - > calendar.pdf
+    python -m calendar_app --years 2020-2040 --workers 8 --cache-dir /var/cache/calendar --config site.json
+    python -m calendar_app.app.cli batch --years 2020-2040 --formats xlsx,png --output-dir out
+    python -m calendar_app serve --formats png,pdf < jobs.jsonl   # 常驻模式，每行一个JSON任务
+    python -m calendar_app http --port 8080 --max-concurrency 4     # HTTP服务，GET /calendar/2026.png
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from dataclasses import asdict
+from datetime import datetime
+from typing import List, Optional
+
+from calendar_app.app.calendar_generator import CalendarGenerator
+from calendar_app.config.calendar_config import CalendarConfig
+from calendar_app.models.calendar_models import BatchJob
+
+
+COMMANDS = ("generate", "batch", "serve", "http")  # 子命令（省略时为 generate）
+RENDER_ENGINES = ("composite", "svg", "pil", "auto")  # --backend 可选值
+STDOUT_PATH = "-"  # --output 取该值时写到标准输出
+
+
+def parse_years(spec: str) -> List[int]:
+    """
+    解析年份参数，支持单个年份、区间与逗号分隔组合
+
+    Args:
+        spec: 如 "2026"、"2020-2030"、"2020-2025,2030"
+
+    Returns:
+        List[int]: 去重后按出现顺序排列的年份
+    """
+    years = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = (int(value) for value in part.split("-", 1))
+            if start > end:
+                raise argparse.ArgumentTypeError(f"年份区间无效: {part}")
+            years.extend(range(start, end + 1))
+        else:
+            years.append(int(part))
+    if not years:
+        raise argparse.ArgumentTypeError("至少需要一个年份")
+    return list(dict.fromkeys(years))
+
+
+def parse_formats(spec: str) -> List[str]:
+    """解析输出格式参数（逗号分隔）"""
+    formats = [part.strip().lower() for part in spec.split(",") if part.strip()]
+    for fmt in formats:
+        if fmt not in CalendarGenerator.SUPPORTED_FORMATS:
+            raise argparse.ArgumentTypeError(f"不支持的输出格式: {fmt}")
+    return formats
+
+
+def load_config_file(path: str) -> dict:
+    """
+    读取配置覆盖文件（JSON 对象，键为 CalendarConfig 的大写配置名）
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        dict: 配置项 -> 值
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        values = json.load(f)
+    if not isinstance(values, dict):
+        raise ValueError(f"配置文件必须是JSON对象: {path}")
+    return values
+
+
+def build_config(args) -> CalendarConfig:
+    """根据配置文件与命令行参数生成配置（命令行参数优先）"""
+    values = load_config_file(args.config) if args.config else {}
+    if args.cache_dir:
+        values["CACHE_DIR"] = args.cache_dir
+    if args.no_cache:
+        values["CACHE_DIR"] = None
+    if args.backend:
+        values["RENDER_ENGINE"] = args.backend
+    if args.force:
+        values["INCREMENTAL_BUILD"] = False
+    return CalendarConfig.with_overrides(values) if values else CalendarConfig
+
+
+def _add_config_arguments(parser: argparse.ArgumentParser):
+    """添加渲染与配置相关参数（各子命令共用）"""
+    parser.add_argument("--output-dir", default=".", help="输出目录")
+    parser.add_argument("--workers", type=int, default=None, help="格子渲染进程数（默认按CPU核数）")
+    parser.add_argument("--cache-dir", default=None, help="缓存目录（覆盖 CACHE_DIR）")
+    parser.add_argument("--no-cache", action="store_true", help="不使用磁盘缓存")
+    parser.add_argument("--backend", choices=RENDER_ENGINES, default=None, help="格子渲染引擎（覆盖 RENDER_ENGINE）")
+    parser.add_argument("--config", default=None, help="配置覆盖文件（JSON，如 {\"PAPER_SIZE\": \"A4\"}）")
+    parser.add_argument("--force", action="store_true", help="忽略增量构建，输出已是最新时也重新生成")
+
+
+def _add_generation_arguments(parser: argparse.ArgumentParser, years_required: bool):
+    """添加生成相关参数（generate 与 batch 共用）"""
+    parser.add_argument("--years", type=parse_years, required=years_required,
+                        default=None if years_required else [datetime.now().year],
+                        help="年份，如 2026 或 2020-2040,2050（默认当前年份）")
+    parser.add_argument("--formats", type=parse_formats, default=["xlsx"], help="输出格式，逗号分隔（xlsx,png,pdf,dzi）")
+    parser.add_argument("--jobs", type=int, default=None, help="同时进行的任务数")
+    _add_config_arguments(parser)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(prog="calendar_app", description="年日历生成工具（省略子命令时为 generate）")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser("generate", help="生成指定年份与格式的日历")
+    _add_generation_arguments(generate, years_required=False)
+    generate.add_argument("-o", "--output", default=None,
+                          help="输出文件路径（仅限单个年份与格式；- 表示写到标准输出）")
+
+    batch = subparsers.add_parser("batch", help="批量生成多个年份的日历")
+    _add_generation_arguments(batch, years_required=True)
+
+    serve = subparsers.add_parser("serve", help="常驻模式：预先加载字体与后端，从标准输入逐行读取JSON任务")
+    serve.add_argument("--formats", type=parse_formats, default=["xlsx"], help="需要预热的输出格式，逗号分隔")
+    _add_config_arguments(serve)
+
+    http = subparsers.add_parser("http", help="HTTP服务：GET /calendar/{year}.xlsx|png|pdf")
+    http.add_argument("--host", default=None, help="监听地址（默认使用配置 SERVER_HOST）")
+    http.add_argument("--port", type=int, default=None, help="监听端口（默认使用配置 SERVER_PORT）")
+    http.add_argument("--max-concurrency", type=int, default=None,
+                      help="同时进行的渲染数（默认使用配置 SERVER_MAX_CONCURRENCY）")
+    _add_config_arguments(http)
+    return parser
+
+
+def run_batch(args) -> int:
+    """执行 batch 子命令"""
+    with CalendarGenerator(build_config(args), workers=args.workers) as generator:
+        report = generator.generate_batch(
+            args.years,
+            formats=args.formats,
+            output_dir=args.output_dir,
+            max_jobs=args.jobs,
+        )
+    return 1 if report.failed else 0
+
+
+def run_generate(args) -> int:
+    """执行 generate 子命令"""
+    if args.output is None:
+        return run_batch(args)
+
+    if len(args.years) != 1 or len(args.formats) != 1:
+        print("✗ --output 只能用于单个年份与单个格式，多个输出请使用 --output-dir", file=sys.stderr)
+        return 2
+    year, fmt = args.years[0], args.formats[0]
+    if args.output != STDOUT_PATH:
+        return _run_single(args, BatchJob(year=year, format=fmt, output_file=args.output))
+
+    if fmt == "dzi":
+        print("✗ dzi 是目录结构，不能写到标准输出", file=sys.stderr)
+        return 2
+    # 写到标准输出时进度信息改走标准错误，先生成到临时目录再整体输出；
+    # 临时文件不记录构建清单（复用只依赖成品缓存）
+    config = build_config(args).with_overrides({"INCREMENTAL_BUILD": False})
+    with tempfile.TemporaryDirectory(prefix="calendar_stdout_") as directory:
+        output_file = os.path.join(directory, f"calendar.{fmt}")
+        with redirect_stdout(sys.stderr):
+            status = _run_single(args, BatchJob(year=year, format=fmt, output_file=output_file), config)
+        if status == 0:
+            with open(output_file, "rb") as f:
+                shutil.copyfileobj(f, sys.stdout.buffer)
+            sys.stdout.buffer.flush()
+    return status
+
+
+def _run_single(args, job: BatchJob, config: Optional[CalendarConfig] = None) -> int:
+    """生成单个指定路径的输出文件（config 默认按命令行参数生成）"""
+    _ensure_parent_dir(job.output_file)
+    with CalendarGenerator(config or build_config(args), workers=args.workers) as generator:
+        report = generator.run_jobs([job], max_jobs=1)
+    return 1 if report.failed else 0
+
+
+def run_serve(args) -> int:
+    """
+    执行 serve 子命令（常驻模式）
+
+    启动时加载一次字体、渲染后端与渲染进程，之后每行读取一个任务，如
+    {"year": 2026, "format": "png", "output": "out/2026.png"}（format 默认为 --formats 的第一个，
+    output 默认为 --output-dir 下的标准文件名），每个任务在标准输出写回一行JSON结果；
+    进度信息写到标准错误。标准输入结束时退出。
+    """
+    responses = sys.stdout
+    with redirect_stdout(sys.stderr):
+        with CalendarGenerator(build_config(args), workers=args.workers) as generator:
+            generator.warm_up(args.formats)
+            print(f"✓ 常驻模式已就绪（{', '.join(args.formats)}），等待任务...")
+            for line in sys.stdin:
+                line = line.strip()
+                if not line:
+                    continue
+                response = _serve_request(generator, line, args)
+                responses.write(json.dumps(response, ensure_ascii=False) + "\n")
+                responses.flush()
+    return 0
+
+
+def run_http(args) -> int:
+    """执行 http 子命令（Ctrl+C 退出）"""
+    # 按需导入，其他子命令不加载 asyncio 服务代码
+    from calendar_app.app.server import CalendarServer, run_server
+
+    server = CalendarServer(build_config(args), workers=args.workers, max_concurrency=args.max_concurrency)
+    try:
+        asyncio.run(run_server(server, args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n✓ 服务已停止")
+    return 0
+
+
+def _serve_request(generator: CalendarGenerator, line: str, args) -> dict:
+    """执行常驻模式的单个任务（任务格式错误也以失败结果返回，不中断服务）"""
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("任务必须是JSON对象")
+        year = int(request.get("year") or datetime.now().year)
+        fmt = str(request.get("format") or args.formats[0]).lower()
+        output_file = request.get("output") or os.path.join(args.output_dir, generator.get_output_path(fmt, year))
+        job = BatchJob(year=year, format=fmt, output_file=output_file)
+        _ensure_parent_dir(job.output_file)
+        generator.run_jobs([job], max_jobs=1)
+    except (OSError, TypeError, ValueError) as e:
+        return {"status": "failed", "error": str(e)}
+    return asdict(job)
+
+
+def _ensure_parent_dir(path: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行主函数"""
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] not in COMMANDS + ("-h", "--help"):
+        argv.insert(0, "generate")
+    args = build_parser().parse_args(argv)
+    try:
+        if args.command == "generate":
+            return run_generate(args)
+        if args.command == "batch":
+            return run_batch(args)
+        if args.command == "serve":
+            return run_serve(args)
+        if args.command == "http":
+            return run_http(args)
+    except (OSError, ValueError) as e:
+        print(f"✗ {e}", file=sys.stderr)
+        return 2
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
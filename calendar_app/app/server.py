@@ -0,0 +1,386 @@
+"""
+HTTP渲染服务 - 基于 asyncio 的本地日历服务
+
+接口:
+    GET /calendar/{year}.xlsx | .png | .pdf   生成（或从缓存返回）对应年份的日历
+    GET /healthz                              运行状态与缓存统计（JSON）
+
+用法:
+    python -m calendar_app http --port 8080 --workers 4 --max-concurrency 4
+"""
+
+import asyncio
+import json
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import suppress
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from calendar_app.app.calendar_generator import CalendarGenerator
+from calendar_app.config.calendar_config import CalendarConfig
+from calendar_app.models.calendar_models import BatchJob
+from calendar_app.services.calendar_service import CalendarService
+from calendar_app.services.file_manager import FileManager
+from calendar_app.services.optional_imports import load_cairosvg
+from calendar_app.services.render_pool import get_config_payload, load_config_payload, resolve_worker_count
+from calendar_app.services.response_cache import CachedResponse, ResponseCache
+
+
+CONTENT_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "png": "image/png",
+    "pdf": "application/pdf",
+}
+CALENDAR_PATH = re.compile(r"/calendar/(\d{1,4})\.(xlsx|png|pdf)")
+REASONS = {
+    200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+MAX_HEADER_LINES = 100  # 单个请求最多读取的请求头行数
+
+# 渲染进程内的生成器（每个进程初始化一次，格子渲染在该进程内串行进行）
+_worker_generator: Optional[CalendarGenerator] = None
+
+
+def _init_render_worker(config_payload):
+    """渲染进程初始化：重建配置并预热字体与渲染后端"""
+    global _worker_generator
+    # 成品写到用完即删的临时目录，不记录构建清单（否则清单随请求无限增长），复用只依赖成品缓存
+    config = load_config_payload(config_payload).with_overrides({"INCREMENTAL_BUILD": False})
+    _worker_generator = CalendarGenerator(config, workers=1)
+    _worker_generator.warm_up(())
+
+
+def _render_artifact(year: int, fmt: str) -> bytes:
+    """在渲染进程中生成一个成品，写到本次调用独有的临时目录后读回字节"""
+    with tempfile.TemporaryDirectory(prefix="calendar_server_") as directory:
+        job = BatchJob(year=year, format=fmt,
+                       output_file=os.path.join(directory, _worker_generator.get_output_path(fmt, year)))
+        _worker_generator.run_jobs([job], max_jobs=1)
+        if job.status == "failed":
+            raise RuntimeError(job.error)
+        with open(job.output_file, "rb") as f:
+            return f.read()
+
+
+class UnavailableError(RuntimeError):
+    """请求的格式在当前环境不可用（如缺少 cairo）"""
+
+
+@dataclass
+class ServerStats:
+    """服务统计"""
+
+    requests: int = 0  # 收到的请求数
+    renders: int = 0  # 实际渲染次数
+    coalesced: int = 0  # 合并到进行中渲染的请求数
+    not_modified: int = 0  # 返回 304 的请求数
+    errors: int = 0  # 返回 5xx 的请求数
+
+
+class CalendarServer:
+    """
+    日历HTTP服务
+
+    - 渲染在进程池中进行，同时进行的渲染数受 max_concurrency 限制，其余请求排队
+    - 内存LRU + 磁盘成品缓存，响应带 ETag，If-None-Match 命中时返回 304
+    - 同一缓存键（同类年份 + 格式）的并发请求只渲染一次，其余请求等待同一结果
+    """
+
+    def __init__(self, config: CalendarConfig = CalendarConfig, workers: Optional[int] = None,
+                 max_concurrency: Optional[int] = None):
+        """
+        初始化服务
+
+        Args:
+            config: 配置对象
+            workers: 渲染进程数（默认使用配置 RENDER_WORKERS，为None时按CPU核数）
+            max_concurrency: 同时进行的渲染数（默认使用配置 SERVER_MAX_CONCURRENCY）
+        """
+        self.config = config
+        self.workers = resolve_worker_count(workers, config)
+        self.max_concurrency = max(1, int(max_concurrency or config.SERVER_MAX_CONCURRENCY))
+        self.calendar_service = CalendarService(config)
+        self.file_manager = FileManager(config)
+        self.response_cache = ResponseCache(config)
+        self.stats = ServerStats()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[Tuple[str, str, str], asyncio.Task] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: Optional[str] = None, port: Optional[int] = None) -> Tuple[str, int]:
+        """
+        开始监听（port 为 0 时由系统分配端口）
+
+        Returns:
+            Tuple[str, int]: 实际监听的地址与端口
+        """
+        host = self.config.SERVER_HOST if host is None else host
+        port = self.config.SERVER_PORT if port is None else port
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        """持续处理请求直到被取消"""
+        await self._server.serve_forever()
+
+    async def close(self):
+        """停止监听并关闭渲染进程池"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, executor.shutdown)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def get_calendar(self, year: int, fmt: str) -> CachedResponse:
+        """
+        获取某年份某格式的成品（内存缓存 -> 进行中的渲染 -> 磁盘缓存 -> 渲染）
+
+        Args:
+            year: 年份
+            fmt: 输出格式（xlsx / png / pdf）
+
+        Returns:
+            CachedResponse: 成品内容与 ETag
+        """
+        if fmt not in CONTENT_TYPES:
+            raise ValueError(f"不支持的输出格式: {fmt}")
+        year_class = self.calendar_service.get_year_class(year)
+        key = self.response_cache.make_key(year_class, fmt)
+        entry = self.response_cache.get(key)
+        if entry is not None:
+            return entry
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._load_or_render(year_class, year, fmt, key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield：某个客户端断开时不取消其他请求共享的渲染
+        return await asyncio.shield(task)
+
+    async def _load_or_render(self, year_class, year: int, fmt: str, key) -> CachedResponse:
+        loop = asyncio.get_running_loop()
+        entry = await loop.run_in_executor(None, self.response_cache.load, year_class, fmt)
+        if entry is None:
+            if fmt == "pdf" and load_cairosvg() is None:
+                raise UnavailableError("导出PDF需要 cairosvg（及系统 cairo 库）")
+            async with self._get_semaphore():
+                self.stats.renders += 1
+                data = await loop.run_in_executor(self._get_executor(), _render_artifact, year, fmt)
+            entry = CachedResponse.from_bytes(data)
+        self.response_cache.put(key, entry)
+        return entry
+
+    async def handle_request(self, method: str, target: str,
+                             headers: Dict[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        处理一个请求（不涉及网络，可直接调用）
+
+        Args:
+            method: 请求方法
+            target: 请求路径（可带查询串）
+            headers: 请求头（名称小写）
+
+        Returns:
+            Tuple[int, Dict[str, str], bytes]: 状态码、响应头、响应体（HEAD 请求为空）
+        """
+        self.stats.requests += 1
+        if method not in ("GET", "HEAD"):
+            return self._text_response(405, "只支持 GET 与 HEAD", {"Allow": "GET, HEAD"})
+        path = urlsplit(target).path
+        if path == "/healthz":
+            body = json.dumps(self.get_status(), ensure_ascii=False).encode("utf-8")
+            return 200, {"Content-Type": "application/json; charset=utf-8"}, b"" if method == "HEAD" else body
+
+        match = CALENDAR_PATH.fullmatch(path)
+        if not match or int(match.group(1)) < 1:
+            return self._text_response(404, "未找到，请使用 /calendar/{year}.xlsx|png|pdf")
+        year, fmt = int(match.group(1)), match.group(2)
+        try:
+            entry = await self.get_calendar(year, fmt)
+        except UnavailableError as e:
+            self.stats.errors += 1
+            return self._text_response(503, str(e))
+        except Exception as e:
+            self.stats.errors += 1
+            print(f"✗ 生成 {year}.{fmt} 出错: {e}")
+            return self._text_response(500, f"生成失败: {e}")
+
+        response_headers = {
+            "ETag": entry.etag,
+            "Cache-Control": "no-cache",  # 客户端可缓存，但每次用 ETag 重新验证（配置可能变化）
+        }
+        if self._etag_matches(headers.get("if-none-match"), entry.etag):
+            self.stats.not_modified += 1
+            return 304, response_headers, b""
+        response_headers["Content-Type"] = CONTENT_TYPES[fmt]
+        response_headers["Content-Disposition"] = f'inline; filename="{self._get_filename(fmt, year)}"'
+        response_headers["Content-Length"] = str(len(entry.data))
+        return 200, response_headers, b"" if method == "HEAD" else entry.data
+
+    def get_status(self) -> dict:
+        """运行状态（服务统计、缓存统计与进行中的渲染数）"""
+        return {
+            "status": "ok",
+            "workers": self.workers,
+            "max_concurrency": self.max_concurrency,
+            "inflight": len(self._inflight),
+            "server": asdict(self.stats),
+            "cache": dict(asdict(self.response_cache.stats),
+                          entries=len(self.response_cache), bytes=self.response_cache.size_bytes),
+        }
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理一个连接（HTTP/1.1 默认保持连接，可连续处理多个请求）"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode("latin-1").split()
+                headers = await self._read_headers(reader)
+                if len(parts) != 3 or headers is None:
+                    self._write_response(writer, *self._text_response(400, "请求格式错误"), keep_alive=False)
+                    await writer.drain()
+                    break
+                method, target, version = parts
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                if headers.get("content-length", "0") != "0" or "transfer-encoding" in headers:
+                    keep_alive = False  # 不读取请求体，无法继续复用连接
+                status, response_headers, body = await self.handle_request(method, target, headers)
+                self._write_response(writer, status, response_headers, body, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+    @staticmethod
+    async def _read_headers(reader: asyncio.StreamReader) -> Optional[Dict[str, str]]:
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                return headers
+            name, separator, value = line.decode("latin-1").partition(":")
+            if not separator:
+                return None
+            headers[name.strip().lower()] = value.strip()
+        return None
+
+    @staticmethod
+    def _write_response(writer: asyncio.StreamWriter, status: int, headers: Dict[str, str],
+                        body: bytes, keep_alive: bool = True):
+        headers = dict(headers)
+        headers.setdefault("Content-Length", str(len(body)))
+        headers["Connection"] = "keep-alive" if keep_alive else "close"
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+
+    @staticmethod
+    def _text_response(status: int, message: str,
+                       headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        headers = dict(headers or {})
+        headers["Content-Type"] = "text/plain; charset=utf-8"
+        return status, headers, message.encode("utf-8")
+
+    @staticmethod
+    def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+        if not if_none_match:
+            return False
+        candidates = [value.strip() for value in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+    def _get_filename(self, fmt: str, year: int) -> str:
+        if fmt == "png":
+            return self.file_manager.get_output_image_filename(year)
+        if fmt == "pdf":
+            return self.file_manager.get_output_pdf_filename(year)
+        return self.file_manager.get_output_filename(year)
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_render_worker,
+                initargs=(get_config_payload(self.config),),
+            )
+        return self._executor
+
+
+async def fetch(host: str, port: int, path: str, method: str = "GET",
+                headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+    """
+    本地HTTP客户端（不依赖第三方库，便于离线测试与健康检查）
+
+    Args:
+        host: 服务地址
+        port: 服务端口
+        path: 请求路径
+        method: 请求方法
+        headers: 额外请求头
+
+    Returns:
+        Tuple[int, Dict[str, str], bytes]: 状态码、响应头（名称小写）、响应体
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {host}:{port}", "Connection: close"]
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        await writer.drain()
+
+        status = int((await reader.readline()).split()[1])
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+        if method == "HEAD" or status == 304:
+            body = b""
+        elif "content-length" in response_headers:
+            body = await reader.readexactly(int(response_headers["content-length"]))
+        else:
+            body = await reader.read()
+        return status, response_headers, body
+    finally:
+        writer.close()
+        with suppress(ConnectionError):
+            await writer.wait_closed()
+
+
+async def run_server(server: CalendarServer, host: Optional[str] = None, port: Optional[int] = None):
+    """启动服务并持续运行，退出时释放渲染进程池"""
+    async with server:
+        host, port = await server.start(host, port)
+        print(f"✓ 日历服务已启动: http://{host}:{port}/calendar/{{year}}.xlsx|png|pdf "
+              f"(渲染进程 {server.workers}, 并发 {server.max_concurrency})")
+        await server.serve_forever()
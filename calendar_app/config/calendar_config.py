@@ -2,6 +2,9 @@
 配置管理 - 集中管理所有常数和配置
 """
 
+import hashlib
+import json
+
 
 class CalendarConfig:
     """日历配置类"""
@@ -9,6 +12,13 @@ class CalendarConfig:
     # ===== Excel配置 =====
     PAPER_SIZE = "A3"  # 纸张大小
     ORIENTATION = "landscape"  # 横向
+    PAPER_SIZES_MM = {  # 纸张尺寸（纵向宽, 高，毫米），PDF导出按此排版
+        "A2": (420, 594),
+        "A3": (297, 420),
+        "A4": (210, 297),
+        "Letter": (215.9, 279.4),
+        "Tabloid": (279.4, 431.8),
+    }
     
     # 页边距（厘米）
     MARGIN_LEFT = 0.4
@@ -41,6 +51,8 @@ class CalendarConfig:
         "/System/Library/Fonts/STHeiti Medium.ttc",
         "/System/Library/Fonts/STHeiti Light.ttc",
     ]
+    FONT_INDEX = 0  # .ttc 字体集合中的字体索引
+    FONT_CACHE_SIZE = 128  # 进程内缓存的字体对象上限（按路径、字号、索引区分）
     FONT_MONTH_SIZE = 12  # 月份字号
     FONT_DATE_SIZE = None  # 日期字号（按比例计算）
     FONT_WEEKDAY_SIZE = None  # 周几字号（按比例计算）
@@ -71,12 +83,43 @@ class CalendarConfig:
     WEEKDAY_TRIANGLE_TEXT_HEIGHT_RATIO = 0.55  # 周几文字占三角形高度比例
 
     # ===== 渲染配置 =====
-    RENDER_SCALE = 4  # 先高分辨率绘制，提升清晰度
+    RENDER_SCALE = 4  # 先高分辨率绘制，提升清晰度（绘制后缩小到目标尺寸）
+    RESAMPLE_FILTER = "LANCZOS"  # 超采样缩小滤镜（LANCZOS / BICUBIC / BILINEAR / BOX）
+    SUPERSAMPLE_TEXT = True  # 文字是否也超采样（False 时文字按目标尺寸直接抗锯齿绘制，仅三角形超采样；仅 composite 引擎支持，其他引擎设为 False 会报错）
+    CELL_IMAGE_DPI = None  # Excel嵌入图像的DPI（None 时与格子像素一致，即96 DPI）
+    CELL_PNG_PROFILE = "default"  # Excel嵌入图像编码：default（RGBA无损）/ fast（调色板，快）/ small（调色板，最小）
+    PNG_BASELINE_STATS = False  # 非 default 档位时统计相对 default 档位的节省量（对新渲染的格子额外编码一次 default 档位）
+    FULL_IMAGE_SCALE = 1  # 整年大图相对格子像素的倍率（打印海报时调大，如 300 / 96）
+    FULL_IMAGE_STREAM_THRESHOLD_PX = 40_000_000  # 整图像素数超过该值时按月份条带流式写出PNG（0 为始终流式）
+    TILE_SIZE = 254  # Deep Zoom 瓦片边长（像素，不含重叠）
+    TILE_OVERLAP = 1  # Deep Zoom 瓦片重叠像素
+    TILE_FORMAT = "png"  # Deep Zoom 瓦片格式（png / jpg）
+    RENDER_WORKERS = None  # 格子渲染进程数（None 时按CPU核数，1 为串行）
+    BATCH_MAX_JOBS = 4  # 批量生成时同时进行的任务数
+    RENDER_ENGINE = "composite"  # composite（图层合成）/ svg / pil / auto（有cairosvg用SVG，否则PIL）
     
     # ===== 文件配置 =====
-    TEMP_DIR = "./temp_calendar_images"  # 临时目录
+    TEMP_DIR = "./temp_calendar_images"  # 临时根目录（每次运行在其下创建独有的工作区）
+    TEMP_LOCATION = "local"  # 工作区位置：local（TEMP_DIR）/ system（系统临时目录，遵循 TMPDIR）/ tmpfs（/dev/shm）
+    EXCEL_CELL_MODE = "image"  # image（每格嵌入图片，像素精确）/ native（单元格富文本 + 渐变填充，无图片）
+    IN_MEMORY_IMAGES = True  # 格子图像直接以内存缓冲区嵌入Excel，不写临时文件
+    DEDUP_EXCEL_MEDIA = True  # 内存模式下像素相同的格子图像只写入一份 xl/media
     OUTPUT_FILENAME_PATTERN = "yearly_calendar_{year}.xlsx"  # 输出文件名模式
     OUTPUT_IMAGE_PATTERN = "yearly_calendar_{year}.png"  # 大图输出文件名模式
+    OUTPUT_PDF_PATTERN = "yearly_calendar_{year}.pdf"  # PDF输出文件名模式
+    OUTPUT_TILES_PATTERN = "yearly_calendar_{year}.dzi"  # Deep Zoom 描述文件名模式（瓦片在同名 _files 目录）
+    OUTPUT_MULTI_YEAR_PATTERN = "yearly_calendar_{start}-{end}.xlsx"  # 多年份工作簿文件名模式
+    CACHE_DIR = "./.calendar_cache"  # 缓存目录（为None时不使用磁盘缓存）
+    RENDER_CACHE_MAX_BYTES = 256 * 1024 * 1024  # 格子渲染缓存上限（字节，0 为不启用）
+    INCREMENTAL_BUILD = True  # 输入（配置、字体、代码）未变化时跳过已存在的输出文件
+    METRICS_FILE = None  # 运行指标追加写入的 JSON lines 文件（None 时不写）
+    METRICS_TRACEMALLOC = False  # 运行指标是否包含 tracemalloc 分配峰值（有额外开销）
+
+    # ===== HTTP服务配置 =====
+    SERVER_HOST = "127.0.0.1"  # 监听地址
+    SERVER_PORT = 8080  # 监听端口
+    SERVER_MAX_CONCURRENCY = 4  # 同时进行的渲染数（其余请求排队）
+    RESPONSE_CACHE_MAX_BYTES = 64 * 1024 * 1024  # 内存响应缓存上限（字节，0 为只用磁盘缓存）
 
     
     # ===== 周几名称 =====
@@ -86,6 +129,69 @@ class CalendarConfig:
         "July", "August", "September", "October", "November", "December"
     ]
     
+    @classmethod
+    def snapshot(cls) -> dict:
+        """导出所有配置常量（大写属性）"""
+        return {
+            name: getattr(cls, name)
+            for name in dir(cls)
+            if name.isupper() and not callable(getattr(cls, name))
+        }
+
+    @classmethod
+    def from_snapshot(cls, values: dict):
+        """根据配置快照重建配置类（用于跨进程传递动态配置）"""
+        return type("SnapshotCalendarConfig", (cls,), dict(values))
+
+    @classmethod
+    def with_overrides(cls, values: dict):
+        """
+        生成覆盖部分配置项的配置类（如命令行的配置文件）
+
+        Args:
+            values: 配置项 -> 值（JSON 数组在原值为元组时转换为元组）
+
+        Returns:
+            CalendarConfig: 动态配置类
+        """
+        known = cls.snapshot()
+        unknown = sorted(name for name in values if name not in known)
+        if unknown:
+            raise ValueError(f"未知的配置项: {', '.join(unknown)}")
+        overrides = {}
+        for name, value in values.items():
+            if isinstance(known[name], tuple) and isinstance(value, list):
+                value = tuple(value)
+            overrides[name] = value
+        return type("OverriddenCalendarConfig", (cls,), overrides)
+
+    @classmethod
+    def fingerprint(cls, names=None) -> str:
+        """
+        计算配置指纹
+
+        Args:
+            names: 参与计算的配置项（默认全部）
+
+        Returns:
+            str: sha256 十六进制摘要
+        """
+        values = cls.snapshot()
+        if names is not None:
+            values = {name: values.get(name) for name in names}
+        payload = json.dumps(values, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def get_page_size_mm(cls):
+        """根据纸张大小与方向获取页面 (宽, 高)，单位毫米"""
+        if cls.PAPER_SIZE not in cls.PAPER_SIZES_MM:
+            raise ValueError(f"未知纸张大小: {cls.PAPER_SIZE}")
+        width, height = cls.PAPER_SIZES_MM[cls.PAPER_SIZE]
+        if cls.ORIENTATION == "landscape":
+            return height, width
+        return width, height
+
     @classmethod
     def get_date_font_size(cls, cell_height_px):
         """根据格子高度计算日期字号"""
@@ -159,6 +265,13 @@ class CalendarConfig:
         """根据Excel行高计算日期格子高度（像素）"""
         return cls.points_to_pixels(cls.get_row_height_points())
 
+    @classmethod
+    def get_cell_image_scale(cls) -> float:
+        """Excel嵌入图像相对格子像素的倍率（按 CELL_IMAGE_DPI 计算）"""
+        if not cls.CELL_IMAGE_DPI:
+            return 1.0
+        return cls.CELL_IMAGE_DPI / 96
+
     @classmethod
     def get_month_cell_width_px(cls) -> int:
         """根据月份列宽比例计算月份格子宽度（像素）"""
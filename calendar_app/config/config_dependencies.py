@@ -0,0 +1,124 @@
+"""
+配置依赖 - 声明各配置项影响哪些生成阶段，用于增量重建与缓存键
+"""
+
+from typing import Dict, Iterable, List, Tuple
+
+from calendar_app.config.calendar_config import CalendarConfig
+
+
+STAGE_LAYOUT = "layout"  # 行列布局与格子尺寸
+STAGE_CELL_RASTER = "cell_raster"  # 格子图像像素
+STAGE_EXCEL_STYLE = "excel_style"  # Excel页面、背景与边框样式
+STAGE_FULL_IMAGE = "full_image"  # 整年大图的背景与边框
+STAGE_TILES = "tiles"  # Deep Zoom 瓦片切分与编码
+STAGE_PDF_PAGE = "pdf_page"  # PDF页面尺寸、页边距与背景
+
+STAGE_DEPENDENCIES: Dict[str, Tuple[str, ...]] = {
+    STAGE_LAYOUT: (
+        "DATE_COLUMN_WIDTH", "ROW_HEIGHT", "DAYS_PER_MONTH_MAX", "MONTH_SPACER_HEIGHT_RATIO",
+        "CELL_WIDTH_PX", "CELL_HEIGHT_PX", "WEEKDAY_NAMES",
+    ),
+    STAGE_CELL_RASTER: (
+        "FONT_PATH", "FONT_FALLBACK_PATHS", "FONT_FAMILY_NAME", "FONT_INDEX",
+        "FONT_MONTH_SIZE", "FONT_DATE_SIZE", "FONT_WEEKDAY_SIZE",
+        "MONTH_LABEL_FONT_SIZE_RATIO", "MONTH_LABEL_STROKE_WIDTH",
+        "MONTH_LABEL_ENGLISH_SIZE_RATIO", "MONTH_LABEL_ENGLISH_STROKE_WIDTH",
+        "DATE_AREA_HEIGHT_RATIO", "DATE_AREA_WIDTH_RATIO",
+        "WEEKDAY_AREA_HEIGHT_RATIO", "WEEKDAY_AREA_WIDTH_RATIO",
+        "CONTENT_MARGIN_RATIO", "TRIANGLE_MARGIN_RATIO",
+        "TRIANGLE_WIDTH_RATIO", "TRIANGLE_HEIGHT_RATIO", "LINE_WIDTH",
+        "DATE_FONT_SIZE_RATIO", "WEEKDAY_FONT_SIZE_RATIO",
+        "DATE_TEXT_AREA_RATIO", "WEEKDAY_TEXT_AREA_RATIO",
+        "WEEKDAY_TRIANGLE_TEXT_WIDTH_RATIO", "WEEKDAY_TRIANGLE_TEXT_HEIGHT_RATIO",
+        "COLOR_TEXT_DATE", "COLOR_TRIANGLE", "COLOR_TEXT_WEEKDAY",
+        "MONTH_ENGLISH_NAMES",
+        "RENDER_ENGINE", "RENDER_SCALE", "RESAMPLE_FILTER", "SUPERSAMPLE_TEXT",
+    ),
+    STAGE_EXCEL_STYLE: (
+        "PAPER_SIZE", "ORIENTATION",
+        "MARGIN_LEFT", "MARGIN_RIGHT", "MARGIN_TOP", "MARGIN_BOTTOM",
+        "COLOR_MONTH_BG", "COLOR_WEEKEND_BG", "COLOR_WEEKDAY_BG",
+        "CELL_IMAGE_DPI", "IN_MEMORY_IMAGES", "DEDUP_EXCEL_MEDIA", "EXCEL_CELL_MODE",
+        "CELL_PNG_PROFILE",
+    ),
+    STAGE_FULL_IMAGE: (
+        "COLOR_WEEKEND_BG", "COLOR_WEEKDAY_BG", "FULL_IMAGE_SCALE",
+    ),
+    STAGE_TILES: (
+        "TILE_SIZE", "TILE_OVERLAP", "TILE_FORMAT",
+    ),
+    STAGE_PDF_PAGE: (
+        "PAPER_SIZE", "PAPER_SIZES_MM", "ORIENTATION",
+        "MARGIN_LEFT", "MARGIN_RIGHT", "MARGIN_TOP", "MARGIN_BOTTOM",
+        "COLOR_WEEKEND_BG", "COLOR_WEEKDAY_BG",
+    ),
+}
+
+# 各输出格式依赖的阶段
+OUTPUT_STAGES: Dict[str, Tuple[str, ...]] = {
+    "xlsx": (STAGE_LAYOUT, STAGE_CELL_RASTER, STAGE_EXCEL_STYLE),
+    "png": (STAGE_LAYOUT, STAGE_CELL_RASTER, STAGE_FULL_IMAGE),
+    "dzi": (STAGE_LAYOUT, STAGE_CELL_RASTER, STAGE_FULL_IMAGE, STAGE_TILES),
+    "pdf": (STAGE_LAYOUT, STAGE_CELL_RASTER, STAGE_PDF_PAGE),
+}
+
+# 不影响任何输出内容的配置项（运行方式、路径、缓存等）
+NON_OUTPUT_KEYS = (
+    "TEMP_DIR", "TEMP_LOCATION", "CACHE_DIR", "RENDER_CACHE_MAX_BYTES", "FONT_CACHE_SIZE",
+    "OUTPUT_FILENAME_PATTERN", "OUTPUT_IMAGE_PATTERN", "OUTPUT_MULTI_YEAR_PATTERN", "OUTPUT_TILES_PATTERN",
+    "OUTPUT_PDF_PATTERN",
+    "RENDER_WORKERS", "BATCH_MAX_JOBS", "INCREMENTAL_BUILD", "FULL_IMAGE_STREAM_THRESHOLD_PX",
+    "METRICS_FILE", "METRICS_TRACEMALLOC", "PNG_BASELINE_STATS",
+    "SERVER_HOST", "SERVER_PORT", "SERVER_MAX_CONCURRENCY", "RESPONSE_CACHE_MAX_BYTES",
+)
+
+
+def get_unclassified_keys(config: CalendarConfig = CalendarConfig) -> List[str]:
+    """未声明依赖的配置项（保守起见视为影响所有阶段）"""
+    classified = set(NON_OUTPUT_KEYS)
+    for keys in STAGE_DEPENDENCIES.values():
+        classified.update(keys)
+    return sorted(name for name in config.snapshot() if name not in classified)
+
+
+def get_stage_keys(stage: str, config: CalendarConfig = CalendarConfig) -> List[str]:
+    """
+    获取某阶段依赖的全部配置项
+
+    Args:
+        stage: 阶段名
+        config: 配置对象
+
+    Returns:
+        List[str]: 配置项名（含未声明依赖的配置项）
+    """
+    return sorted(set(STAGE_DEPENDENCIES[stage]) | set(get_unclassified_keys(config)))
+
+
+def get_stage_fingerprint(stage: str, config: CalendarConfig = CalendarConfig) -> str:
+    """计算单个阶段的配置指纹"""
+    return config.fingerprint(get_stage_keys(stage, config))
+
+
+def get_output_stages(fmt: str) -> Tuple[str, ...]:
+    """获取输出格式依赖的阶段"""
+    return OUTPUT_STAGES[fmt]
+
+
+def get_output_fingerprint(fmt: str, config: CalendarConfig = CalendarConfig) -> str:
+    """计算某输出格式依赖的全部配置项的指纹"""
+    keys = set()
+    for stage in get_output_stages(fmt):
+        keys.update(get_stage_keys(stage, config))
+    return config.fingerprint(sorted(keys))
+
+
+def get_changed_stages(old: Dict[str, str], new: Dict[str, str]) -> List[str]:
+    """比较两组阶段指纹，返回发生变化的阶段"""
+    return [stage for stage, fingerprint in new.items() if old.get(stage) != fingerprint]
+
+
+def iter_stage_fingerprints(stages: Iterable[str], config: CalendarConfig = CalendarConfig) -> Dict[str, str]:
+    """计算一组阶段的指纹"""
+    return {stage: get_stage_fingerprint(stage, config) for stage in stages}
@@ -2,27 +2,63 @@
 Excel集成 - 使用openpyxl构建和填充Excel工作簿
 """
 
-import os
+import io
+from typing import Dict, Optional, Tuple
+
 from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Alignment, Border, Side
+from openpyxl.cell.rich_text import CellRichText, TextBlock
+from openpyxl.cell.text import InlineFont
+from openpyxl.styles import PatternFill, GradientFill, Alignment, Border, Side
+from openpyxl.styles.fills import Stop
 from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.worksheet import Worksheet
 from openpyxl.drawing.image import Image as XLImage
 from openpyxl.drawing.spreadsheet_drawing import AnchorMarker, TwoCellAnchor
 
 from calendar_app.config.calendar_config import CalendarConfig
 from calendar_app.models.calendar_models import YearCalendarData, CellInfo
 from calendar_app.services.cell_image_service import CellImageService
-from calendar_app.services.file_manager import FileManager
+from calendar_app.services.file_manager import FileManager, atomic_output
+from calendar_app.services.png_encoder import PngEncodeStats
+from calendar_app.services.render_pool import RenderPool
+from calendar_app.integration.xlsx_media import MediaRegistry, save_workbook
 from calendar_app.models.calendar_models import ImageGenerationRequest
 
 
+CELL_MODES = ("image", "native")
+
+
 class ExcelBuilder:
-    """Excel工作簿构建器"""
+    """
+    Excel工作簿构建器
+    
+    image 模式每个日期格子嵌入一张渲染好的图片（与整图像素一致）；
+    native 模式只用单元格富文本、字体、对齐与渐变填充表达格子内容，工作簿不含任何图片。
+    """
     
-    def __init__(self, config: CalendarConfig = CalendarConfig):
+    def __init__(self, config: CalendarConfig = CalendarConfig,
+                 render_pool: Optional[RenderPool] = None, workers: Optional[int] = None):
+        """
+        初始化构建器
+        
+        Args:
+            config: 配置对象
+            render_pool: 共享的渲染池（可选）
+            workers: 未提供渲染池时新建渲染池的进程数（默认按CPU核数）
+        """
         self.config = config
         self.file_manager = FileManager(config)
-        self.image_service = CellImageService(config)
+        self.render_pool = render_pool or RenderPool(config, workers)
+        self.image_service = self.render_pool.image_service
+        self.layout = self.render_pool.layout
+        self.media_registry = MediaRegistry()
+        self.encode_stats = PngEncodeStats()
+        self.cell_mode = str(config.EXCEL_CELL_MODE).lower()
+        if self.cell_mode not in CELL_MODES:
+            raise ValueError(f"不支持的Excel格子模式: {config.EXCEL_CELL_MODE}")
+        self._native_fonts: Dict[Tuple[str, int], InlineFont] = {}
+        self._native_fills: Dict[bool, GradientFill] = {}
+        self._native_alignment = Alignment(horizontal='right', vertical='justify', wrap_text=True)
         self.workbook = None
         self.worksheet = None
     
@@ -34,6 +70,8 @@ class ExcelBuilder:
             Workbook: openpyxl工作簿对象
         """
         self.workbook = Workbook()
+        self.media_registry.clear()
+        self.encode_stats = PngEncodeStats()
         self.worksheet = self.workbook.active
         self.worksheet.title = "年历"
         return self.workbook
@@ -44,7 +82,7 @@ class ExcelBuilder:
             raise ValueError("工作簿未初始化")
         
         # 设置页面
-        self.worksheet.page_setup.paperSize = self.worksheet.PAPERSIZE_A3
+        self.worksheet.page_setup.paperSize = Worksheet.PAPERSIZE_A3
         self.worksheet.page_setup.orientation = 'landscape'
         self.worksheet.print_options.horizontalCentered = True
         self.worksheet.sheet_view.showGridLines = False
@@ -56,14 +94,14 @@ class ExcelBuilder:
         self.worksheet.page_margins.bottom = self.config.MARGIN_BOTTOM
         
         # 设置列宽
-        date_column_width = self.config.get_date_column_width()
-        for col_num in range(1, self.config.DAYS_PER_MONTH_MAX + 1):
+        date_column_width = self.layout.date_column_width
+        for col_num in range(1, self.layout.column_count + 1):
             col_letter = get_column_letter(col_num)
             self.worksheet.column_dimensions[col_letter].width = date_column_width
         
         # 设置行高
-        row_height = self.config.get_row_height_points()
-        spacer_height = row_height * self.config.MONTH_SPACER_HEIGHT_RATIO
+        row_height = self.layout.row_height_points
+        spacer_height = self.layout.spacer_height_points
         for month in range(1, 13):
             row = month + (month - 1)
             self.worksheet.row_dimensions[row].height = row_height
@@ -80,8 +118,9 @@ class ExcelBuilder:
         if not self.worksheet:
             raise ValueError("工作簿未初始化")
         
-        # 创建临时目录
-        self.file_manager.create_temp_dir()
+        # 创建临时目录（内存模式下图像不落盘）
+        if self.cell_mode == "image" and not self.config.IN_MEMORY_IMAGES:
+            self.file_manager.create_temp_dir()
         
         # 定义样式
         weekend_fill = PatternFill(
@@ -102,8 +141,10 @@ class ExcelBuilder:
             bottom=Side(style='thin')
         )
         no_border = Border()
+        center_alignment = Alignment(horizontal='center', vertical='center')
         
         # 遍历所有月份
+        day_cells = []
         for month_data in calendar_data.months:
             # 遍历该月所有格子
             for cell_info in month_data.cells:
@@ -116,10 +157,13 @@ class ExcelBuilder:
                 # 日期格子
                 cell.fill = weekend_fill if cell_info.is_weekend else weekday_fill
                 cell.border = thin_border
-                cell.alignment = Alignment(horizontal='center', vertical='center')
+                cell.alignment = center_alignment
+                if self.cell_mode == "native":
+                    self._apply_native_content(cell, cell_info)
+                day_cells.append(cell_info)
 
-                # 生成格子图像
-                self._generate_and_insert_cell_image(cell, cell_info)
+        if self.cell_mode == "image":
+            self._insert_cell_images(day_cells)
 
         # 清理月份间隔行的边框（无网格线）
         for month in range(1, 12):
@@ -129,34 +173,106 @@ class ExcelBuilder:
                 spacer_cell.border = no_border
                 spacer_cell.fill = PatternFill(fill_type=None)
     
-    def _generate_and_insert_cell_image(self, cell, cell_info: CellInfo):
+    def _apply_native_content(self, cell, cell_info: CellInfo):
         """
-        为单个格子生成图像并插入到Excel
+        native 模式：用富文本与渐变填充近似格子图像
         
-        Args:
-            cell: Excel单元格
-            cell_info: 格子信息
+        日期、周几（1号另加月份标签）各占一行，右对齐并在垂直方向两端分布；
+        周几三角形用 45° 线性渐变的硬边色标近似，白色周几文字落在右下角的深色区域里。
         """
-        # 创建图像生成请求
-        request = ImageGenerationRequest(
+        geometry = self.image_service.get_geometry(cell_info.width_px, cell_info.height_px)
+        blocks = []
+        if cell_info.day == 1:
+            blocks.append(TextBlock(self._get_native_font("month", geometry.month_font_size),
+                                    f"{cell_info.month:02d} "))
+            blocks.append(TextBlock(self._get_native_font("month", geometry.month_english_font_size),
+                                    self.config.MONTH_ENGLISH_NAMES[cell_info.month - 1] + "\n"))
+        date_size = geometry.vector_date_font_size
+        if 1 <= cell_info.day <= len(geometry.date_font_sizes):
+            date_size = geometry.date_font_sizes[cell_info.day - 1]
+        blocks.append(TextBlock(self._get_native_font("date", date_size), f"{cell_info.day}\n"))
+        weekday_size = geometry.vector_weekday_font_size
+        if cell_info.weekday_char in self.config.WEEKDAY_NAMES and geometry.weekday_font_sizes:
+            weekday_size = geometry.weekday_font_sizes[self.config.WEEKDAY_NAMES.index(cell_info.weekday_char)]
+        blocks.append(TextBlock(self._get_native_font("weekday", weekday_size), cell_info.weekday_char))
+
+        cell.value = CellRichText(blocks)
+        cell.fill = self._get_native_fill(cell_info.is_weekend)
+        cell.alignment = self._native_alignment
+    
+    def _get_native_font(self, kind: str, size_px: int) -> InlineFont:
+        """富文本字体（像素字号换算为磅，按类型与字号复用）"""
+        key = (kind, size_px)
+        font = self._native_fonts.get(key)
+        if font is None:
+            color = self.config.COLOR_TEXT_WEEKDAY if kind == "weekday" else self.config.COLOR_TEXT_DATE
+            font = InlineFont(
+                rFont=self.config.FONT_FAMILY_NAME,
+                sz=round(self.config.pixels_to_points(max(1, size_px)), 1),
+                b=kind == "month",
+                color=self._argb(color),
+            )
+            self._native_fonts[key] = font
+        return font
+    
+    def _get_native_fill(self, is_weekend: bool) -> GradientFill:
+        """背景色到三角形颜色的硬边对角渐变（色标位置按三角形两条直角边的平均比例）"""
+        fill = self._native_fills.get(is_weekend)
+        if fill is None:
+            background = self.config.COLOR_WEEKEND_BG if is_weekend else self.config.COLOR_WEEKDAY_BG
+            triangle = self._argb(self.config.COLOR_TRIANGLE)
+            legs = (self.config.WEEKDAY_AREA_WIDTH_RATIO * self.config.TRIANGLE_WIDTH_RATIO
+                    + self.config.WEEKDAY_AREA_HEIGHT_RATIO * self.config.TRIANGLE_HEIGHT_RATIO)
+            # 色标位置不能重复，两色之间留极窄的过渡
+            edge = min(0.998, max(0.001, 1 - legs / 4))
+            fill = GradientFill(type='linear', degree=45, stop=(
+                Stop(background, 0), Stop(background, edge), Stop(triangle, edge + 0.001), Stop(triangle, 1),
+            ))
+            self._native_fills[is_weekend] = fill
+        return fill
+    
+    @staticmethod
+    def _argb(color) -> str:
+        """RGBA/RGB元组转Excel颜色（ARGB十六进制）"""
+        return "FF" + "".join(f"{value:02X}" for value in color[:3])
+    
+    def _insert_cell_images(self, day_cells):
+        """生成格子图像（可并行），按原顺序插入"""
+        requests = [self._build_image_request(cell_info) for cell_info in day_cells]
+        # default 档位的大小即编码结果本身；其他档位只在开启 PNG_BASELINE_STATS 时对同一图像额外编码一次
+        baseline_sizes = None
+        if self.render_pool.png_profile == "default" or self.config.PNG_BASELINE_STATS:
+            images, baseline_sizes = self.render_pool.render_with_baseline(requests)
+        else:
+            images = self.render_pool.render(requests)
+        self.encode_stats.add(((request.cell_width_px, request.cell_height_px) for request in requests),
+                              images, baseline_sizes)
+        for cell_info, png_bytes in zip(day_cells, images):
+            self._insert_cell_image(cell_info, png_bytes)
+    
+    def _build_image_request(self, cell_info: CellInfo) -> ImageGenerationRequest:
+        """根据格子信息创建图像生成请求（按 CELL_IMAGE_DPI 放大，图像锚定到格子时自动缩放）"""
+        image_scale = self.layout.cell_image_scale
+        return ImageGenerationRequest(
             month=cell_info.month,
             day=cell_info.day,
             weekday_char=cell_info.weekday_char,
-            cell_width_px=cell_info.width_px,
-            cell_height_px=cell_info.height_px,
+            cell_width_px=int(round(cell_info.width_px * image_scale)),
+            cell_height_px=int(round(cell_info.height_px * image_scale)),
             is_weekend=cell_info.is_weekend
         )
+    
+    def _insert_cell_image(self, cell_info: CellInfo, png_bytes: bytes):
+        """
+        将已渲染的格子图像插入到Excel
         
-        # 生成图像
-        img = self.image_service.create_image(request)
-        
-        # 保存图像
-        img_path = self.file_manager.get_temp_image_path(cell_info.month, cell_info.day)
-        img.save(img_path)
-        
+        Args:
+            cell_info: 格子信息
+            png_bytes: PNG图像字节
+        """
         # 插入到Excel
         try:
-            xl_img = XLImage(img_path)
+            xl_img = self._create_xl_image(cell_info, png_bytes)
             start = AnchorMarker(
                 col=cell_info.col - 1,
                 colOff=0,
@@ -174,6 +290,19 @@ class ExcelBuilder:
         except Exception as e:
             print(f"插入图像失败 ({cell_info.month}月{cell_info.day}日): {e}")
     
+    def _create_xl_image(self, cell_info: CellInfo, png_bytes: bytes) -> XLImage:
+        """根据配置创建openpyxl图片对象（临时文件 / 内存缓冲区 / 去重共享媒体）"""
+        if not self.config.IN_MEMORY_IMAGES:
+            # 保存图像
+            img_path = self.file_manager.get_temp_image_path(cell_info.month, cell_info.day)
+            with open(img_path, "wb") as f:
+                f.write(png_bytes)
+            return XLImage(img_path)
+        if self.config.DEDUP_EXCEL_MEDIA:
+            # 相同像素的格子共享同一个 xl/media 部件
+            return self.media_registry.create_image(png_bytes)
+        return XLImage(io.BytesIO(png_bytes))
+    
     def save(self, filename: str) -> bool:
         """
         保存工作簿
@@ -188,8 +317,14 @@ class ExcelBuilder:
             if not self.workbook:
                 raise ValueError("工作簿未初始化")
             
-            self.workbook.save(filename)
+            # 先写临时文件再原子替换，失败或并发读取时不会出现写了一半的文件
+            with atomic_output(filename) as tmp_path:
+                save_workbook(self.workbook, tmp_path)
             return True
         except Exception as e:
             print(f"保存文件失败: {e}")
             return False
+    
+    def cleanup_temp_files(self) -> bool:
+        """清理本构建器的临时工作区（仅非内存模式会创建）"""
+        return self.file_manager.cleanup_temp_files()
@@ -0,0 +1,110 @@
+"""
+流式Excel集成 - 基于openpyxl只写模式逐表输出，适合多年份的大工作簿
+"""
+
+from typing import Dict, List
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.drawing.image import Image as XLImage
+from openpyxl.styles import PatternFill, Alignment, Border, Side, NamedStyle
+
+from calendar_app.models.calendar_models import YearCalendarData, CellInfo
+from calendar_app.integration.excel_builder import ExcelBuilder
+from calendar_app.services.png_encoder import PngEncodeStats
+
+
+WEEKDAY_STYLE_NAME = "calendar_weekday"
+WEEKEND_STYLE_NAME = "calendar_weekend"
+
+
+class StreamingExcelBuilder(ExcelBuilder):
+    """
+    流式Excel工作簿构建器
+
+    行数据在写入时即刷到临时文件，样式以命名样式共享，格子图像共享去重后的媒体，
+    峰值内存不随工作表数量增长。
+    """
+
+    def create_workbook(self) -> Workbook:
+        """
+        创建只写模式工作簿
+
+        Returns:
+            Workbook: openpyxl工作簿对象（write_only=True）
+        """
+        self.workbook = Workbook(write_only=True)
+        self.worksheet = None
+        self.media_registry.clear()
+        self.encode_stats = PngEncodeStats()
+        self._register_styles()
+        return self.workbook
+
+    def _register_styles(self):
+        """注册共享的命名样式（每个工作簿一次）"""
+        thin_side = Side(style='thin')
+        border = Border(left=thin_side, right=thin_side, top=thin_side, bottom=thin_side)
+        alignment = Alignment(horizontal='center', vertical='center')
+        for name, color in (
+            (WEEKDAY_STYLE_NAME, self.config.COLOR_WEEKDAY_BG),
+            (WEEKEND_STYLE_NAME, self.config.COLOR_WEEKEND_BG),
+        ):
+            style = NamedStyle(name=name)
+            style.fill = PatternFill(start_color=color, end_color=color, fill_type='solid')
+            style.border = border
+            style.alignment = alignment
+            self.workbook.add_named_style(style)
+
+    def add_year_sheet(self, calendar_data: YearCalendarData, title: str = None):
+        """
+        添加一个年份工作表并立即写出
+
+        Args:
+            calendar_data: 日历数据对象
+            title: 工作表名（默认为年份）
+        """
+        if not self.workbook:
+            raise ValueError("工作簿未初始化")
+
+        self.worksheet = self.workbook.create_sheet(title or str(calendar_data.year))
+        self.setup_layout()
+        self.fill_cells(calendar_data)
+        # 提前关闭工作表：行数据已写入临时文件，只保留图片锚点等少量对象
+        self.worksheet.close()
+        return self.worksheet
+
+    def fill_cells(self, calendar_data: YearCalendarData):
+        """
+        按行顺序写出日历数据（只写模式下行只能追加，必须在 setup_layout 之后调用）
+
+        Args:
+            calendar_data: 日历数据对象
+        """
+        if not self.worksheet:
+            raise ValueError("工作簿未初始化")
+
+        rows: Dict[int, List[CellInfo]] = {}
+        day_cells = []
+        for month_data in calendar_data.months:
+            for cell_info in month_data.cells:
+                rows.setdefault(cell_info.row, []).append(cell_info)
+                day_cells.append(cell_info)
+
+        last_row = max(rows) if rows else 0
+        for row in range(1, last_row + 1):
+            row_cells = sorted(rows.get(row, []), key=lambda info: info.col)
+            values = [None] * (row_cells[-1].col if row_cells else 0)
+            for cell_info in row_cells:
+                cell = WriteOnlyCell(self.worksheet)
+                cell.style = WEEKEND_STYLE_NAME if cell_info.is_weekend else WEEKDAY_STYLE_NAME
+                if self.cell_mode == "native":
+                    self._apply_native_content(cell, cell_info)
+                values[cell_info.col - 1] = cell
+            self.worksheet.append(values)
+
+        if self.cell_mode == "image":
+            self._insert_cell_images(day_cells)
+
+    def _create_xl_image(self, cell_info: CellInfo, png_bytes: bytes) -> XLImage:
+        """流式模式下图像始终走内存去重，多张工作表共享同一份媒体"""
+        return self.media_registry.create_image(png_bytes)
@@ -0,0 +1,103 @@
+"""
+Excel媒体去重 - 相同的格子图像在 xl/media 中只写入一次
+"""
+
+import datetime
+import hashlib
+from typing import Dict, Tuple
+from zipfile import ZipFile, ZIP_DEFLATED
+
+from openpyxl.drawing.image import Image as XLImage
+from openpyxl.writer.excel import ExcelWriter
+
+
+class SharedMediaImage(XLImage):
+    """共享媒体部件的图片：多个绘图锚点通过关系引用同一个 xl/media 文件"""
+
+    def __init__(self, data: bytes, media_path: str, width: int, height: int):
+        # 不调用父类构造：尺寸已知，无需为每个格子重新解码PNG
+        self.ref = None
+        self.format = "png"
+        self.width = width
+        self.height = height
+        self._media_data = data
+        self._media_path = media_path
+
+    def _data(self) -> bytes:
+        return self._media_data
+
+    @property
+    def path(self) -> str:
+        return self._media_path
+
+
+class MediaRegistry:
+    """媒体登记表：按内容哈希分配共享的媒体路径"""
+
+    def __init__(self):
+        self._media: Dict[str, Tuple[str, bytes]] = {}
+        self.images_added = 0
+
+    def create_image(self, png_bytes: bytes) -> SharedMediaImage:
+        """
+        为PNG字节创建图片对象，相同内容复用同一媒体部件
+
+        Args:
+            png_bytes: PNG图像字节
+
+        Returns:
+            SharedMediaImage: 可直接 add_image 的图片对象
+        """
+        digest = hashlib.sha256(png_bytes).hexdigest()
+        media = self._media.get(digest)
+        if media is None:
+            media = (f"/xl/media/image{len(self._media) + 1}.png", png_bytes)
+            self._media[digest] = media
+        self.images_added += 1
+        # PNG 的 IHDR 块紧跟在8字节签名之后，宽高各占4字节（大端）
+        width = int.from_bytes(png_bytes[16:20], "big")
+        height = int.from_bytes(png_bytes[20:24], "big")
+        return SharedMediaImage(media[1], media[0], width, height)
+
+    @property
+    def unique_count(self) -> int:
+        """去重后的媒体数量"""
+        return len(self._media)
+
+    def clear(self):
+        """清空登记表（新建工作簿时调用）"""
+        self._media.clear()
+        self.images_added = 0
+
+
+class DedupExcelWriter(ExcelWriter):
+    """同一媒体路径只写入一次的 ExcelWriter"""
+
+    def _write_images(self):
+        written = set()
+        for img in self._images:
+            path = img.path[1:]
+            if path in written:
+                continue
+            written.add(path)
+            self._archive.writestr(path, img._data())
+
+
+def save_workbook(workbook, filename) -> bool:
+    """
+    保存工作簿（媒体去重版本，参数与 openpyxl.writer.excel.save_workbook 一致）
+
+    Args:
+        workbook: openpyxl工作簿
+        filename: 输出文件名或可写文件对象
+
+    Returns:
+        bool: 是否成功保存
+    """
+    if workbook.write_only and not workbook.worksheets:
+        workbook.create_sheet()
+    archive = ZipFile(filename, 'w', ZIP_DEFLATED, allowZip64=True)
+    workbook.properties.modified = datetime.datetime.now(tz=datetime.timezone.utc).replace(tzinfo=None)
+    writer = DedupExcelWriter(workbook, archive)
+    writer.save()
+    return True
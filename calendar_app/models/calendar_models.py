@@ -3,7 +3,7 @@
 """
 
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 
 @dataclass
@@ -60,3 +60,144 @@ class ImageGenerationRequest:
     cell_width_px: int  # 格子宽度
     cell_height_px: int  # 格子高度
     is_weekend: bool = False  # 是否周末
+
+
+@dataclass(frozen=True)
+class YearClass:
+    """年份类别：闰年与否 + 1月1日周几，决定了日历的全部格子布局"""
+    
+    is_leap: bool  # 是否闰年
+    jan1_weekday: int  # 1月1日周几 (0=周一, 6=周日)
+    
+    @property
+    def key(self) -> str:
+        """类别标识（共14种）"""
+        return f"{'leap' if self.is_leap else 'common'}-{self.jan1_weekday}"
+
+
+@dataclass
+class BatchJob:
+    """批量生成中的单个任务"""
+    
+    year: int  # 年份
+    format: str  # 输出格式（xlsx / png / pdf / dzi）
+    output_file: str  # 输出文件路径
+    status: str = "pending"  # pending / rendered / cached / skipped / failed
+    elapsed: float = 0.0  # 耗时（秒）
+    error: Optional[str] = None  # 失败原因
+
+
+@dataclass
+class BatchReport:
+    """批量生成结果汇总"""
+    
+    jobs: List[BatchJob]  # 所有任务
+    elapsed: float  # 总耗时（秒）
+    
+    @property
+    def succeeded(self) -> List[BatchJob]:
+        """成功的任务"""
+        return [job for job in self.jobs if job.status in ("rendered", "cached", "skipped")]
+    
+    @property
+    def failed(self) -> List[BatchJob]:
+        """失败的任务"""
+        return [job for job in self.jobs if job.status == "failed"]
+    
+    def count(self, status: str) -> int:
+        """指定状态（rendered / cached / skipped / failed）的任务数"""
+        return sum(1 for job in self.jobs if job.status == status)
+    
+    @property
+    def calendars_per_minute(self) -> float:
+        """吞吐量（每分钟实际渲染的日历文件数，不含复用缓存与已是最新而跳过的任务）"""
+        if self.elapsed <= 0:
+            return 0.0
+        return self.count("rendered") * 60 / self.elapsed
+
+
+@dataclass(frozen=True)
+class CellGeometry:
+    """某一格子像素尺寸下预先计算好的几何（不可变、可哈希）"""
+    
+    width: int  # 格子宽度（像素）
+    height: int  # 格子高度（像素）
+    margin: int  # 内容边距
+    
+    # 日期数字（右上角）：右对齐锚点与拟合区域
+    date_anchor: Tuple[int, int]  # (右边界x, 顶部y)
+    date_box: Tuple[int, int]  # 拟合最大宽高
+    date_target_area: float  # 拟合目标面积
+    
+    # 周几三角形（右下角）
+    triangle: Tuple[int, int, int, int]  # (left, right, top, bottom)
+    triangle_vertices: Tuple[Tuple[int, int], ...]  # 直角在右下角的三个顶点
+    weekday_anchor: Tuple[int, int]  # 周几文字中心点
+    weekday_box: Tuple[int, int]  # 拟合最大宽高
+    weekday_target_area: float  # 拟合目标面积
+    
+    # 月份标签（左上角）
+    month_anchor: Tuple[int, int]  # 数字月份左上角
+    month_english_anchor: Tuple[int, int]  # 英文月份左上角
+    month_font_size: int  # 数字月份字号
+    month_english_font_size: int  # 英文月份字号
+    
+    # 拟合字号（未找到字体时为空）
+    date_font_sizes: Tuple[int, ...] = ()  # 第 day-1 项为日期 day 的字号
+    weekday_font_sizes: Tuple[int, ...] = ()  # 与 WEEKDAY_NAMES 一一对应
+    
+    # 矢量坐标（SVG使用，不取整）
+    vector_margin: float = 0.0
+    vector_date_center: Tuple[float, float] = (0.0, 0.0)
+    vector_triangle: Tuple[float, float, float, float] = (0.0, 0.0, 0.0, 0.0)  # (left, right, top, bottom)
+    vector_date_font_size: int = 0  # 按比例计算的日期字号
+    vector_weekday_font_size: int = 0  # 按比例计算的周几字号
+
+
+@dataclass(frozen=True)
+class ResolvedLayout:
+    """
+    由配置一次性解析出的完整布局（不可变、可哈希，可直接作为缓存键）
+    
+    各服务从这里读取格子尺寸、行高、偏移与字号，不再在循环中重复换算配置。
+    """
+    
+    day_cell_width_px: int  # 日期格子宽度（像素）
+    day_cell_height_px: int  # 日期格子高度（像素）
+    spacer_height_px: int  # 月份间隔行高度（像素）
+    column_count: int  # 列数
+    row_heights: Tuple[int, ...]  # 各行高度（像素，月份行与间隔行交替）
+    row_offsets: Tuple[int, ...]  # 各行顶部y坐标
+    column_offsets: Tuple[int, ...]  # 各列左侧x坐标
+    total_width_px: int  # 整图宽度
+    total_height_px: int  # 整图高度
+    
+    date_column_width: float  # Excel列宽
+    row_height_points: float  # Excel行高（点）
+    spacer_height_points: float  # Excel间隔行高（点）
+    cell_image_scale: float  # Excel嵌入图像倍率
+    cell_image_size: Tuple[int, int]  # Excel嵌入图像尺寸（像素）
+    
+    render_scale: int  # 超采样倍率
+    text_scale: int  # 文字绘制所在画布的倍率
+    font_path: Optional[str]  # 实际使用的字体文件
+    font_index: int  # 字体索引
+    cells: Tuple[CellGeometry, ...]  # 预先解析的格子几何（各用到的尺寸）
+    
+    def get_cell(self, width: int, height: int) -> Optional[CellGeometry]:
+        """按像素尺寸查找预先解析的格子几何（未预先解析时返回None）"""
+        for geometry in self.cells:
+            if geometry.width == width and geometry.height == height:
+                return geometry
+        return None
+    
+    def get_month_row_index(self, month: int) -> int:
+        """月份所在行的下标（从0开始）"""
+        return (month - 1) * 2
+    
+    def get_cell_box(self, month: int, col: int) -> Tuple[int, int, int, int]:
+        """整图中某月某列格子的 (x0, y0, x1, y1)"""
+        row_index = self.get_month_row_index(month)
+        x = self.column_offsets[col - 1]
+        y = self.row_offsets[row_index]
+        return x, y, x + self.day_cell_width_px, y + self.row_heights[row_index]
@@ -0,0 +1,111 @@
+"""
+构建清单服务 - 记录每个输出文件的输入指纹，输入未变时跳过重建
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import List, Optional
+
+from calendar_app.config.calendar_config import CalendarConfig
+from calendar_app.config.config_dependencies import get_changed_stages, get_output_stages, iter_stage_fingerprints
+from calendar_app.services.render_cache import code_fingerprint, font_content_hash
+
+
+MANIFEST_VERSION = 1
+
+
+class BuildManifest:
+    """构建清单：按输出文件记录年份、阶段指纹、字体与代码指纹以及文件状态"""
+
+    def __init__(self, config: CalendarConfig = CalendarConfig):
+        self.config = config
+        self.root = None
+        if config.CACHE_DIR and config.INCREMENTAL_BUILD:
+            self.root = os.path.join(config.CACHE_DIR, "manifests")
+        self._inputs_base = None
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用增量构建"""
+        return self.root is not None
+
+    def _manifest_path(self, output_file: str) -> str:
+        digest = hashlib.sha256(os.path.abspath(output_file).encode("utf-8")).hexdigest()
+        return os.path.join(self.root, f"{digest}.json")
+
+    def _inputs(self, year: int, fmt: str) -> dict:
+        if self._inputs_base is None:
+            font_paths = [self.config.FONT_PATH] + list(self.config.FONT_FALLBACK_PATHS)
+            font_path = next((path for path in font_paths if path and os.path.exists(path)), None)
+            self._inputs_base = {
+                "version": MANIFEST_VERSION,
+                "font": font_content_hash(font_path),
+                "code": code_fingerprint(),
+            }
+        return dict(
+            self._inputs_base,
+            year=year,
+            format=fmt,
+            stages=iter_stage_fingerprints(get_output_stages(fmt), self.config),
+        )
+
+    def _load(self, output_file: str) -> Optional[dict]:
+        try:
+            with open(self._manifest_path(output_file), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _file_state(output_file: str) -> Optional[dict]:
+        try:
+            stat = os.stat(output_file)
+        except OSError:
+            return None
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def get_stale_stages(self, year: int, fmt: str, output_file: str) -> List[str]:
+        """
+        检查输出文件需要重建的阶段
+
+        Args:
+            year: 年份
+            fmt: 输出格式
+            output_file: 输出文件路径
+
+        Returns:
+            List[str]: 需要重建的阶段；为空表示输出已是最新，可直接跳过
+        """
+        inputs = self._inputs(year, fmt)
+        all_stages = list(inputs["stages"])
+        if not self.enabled:
+            return all_stages
+
+        manifest = self._load(output_file)
+        file_state = self._file_state(output_file)
+        if not manifest or not file_state or manifest.get("file") != file_state:
+            return all_stages
+        old_inputs = manifest.get("inputs", {})
+        if any(old_inputs.get(name) != inputs[name] for name in ("version", "font", "code", "year", "format")):
+            return all_stages
+        return get_changed_stages(old_inputs.get("stages", {}), inputs["stages"])
+
+    def record(self, year: int, fmt: str, output_file: str):
+        """输出文件生成后记录清单"""
+        if not self.enabled:
+            return
+        manifest = {
+            "output": os.path.abspath(output_file),
+            "inputs": self._inputs(year, fmt),
+            "file": self._file_state(output_file),
+        }
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self._manifest_path(output_file))
+        except OSError as e:
+            print(f"写入构建清单失败: {e}")
@@ -6,14 +6,16 @@ import calendar as calendar_module
 from typing import List
 
 from calendar_app.config.calendar_config import CalendarConfig
-from calendar_app.models.calendar_models import CellInfo, MonthData, YearCalendarData
+from calendar_app.models.calendar_models import CellInfo, MonthData, ResolvedLayout, YearCalendarData, YearClass
+from calendar_app.services.layout_resolver import resolve_layout
 
 
 class CalendarService:
     """日历数据生成服务"""
     
-    def __init__(self, config: CalendarConfig = CalendarConfig):
+    def __init__(self, config: CalendarConfig = CalendarConfig, layout: ResolvedLayout = None):
         self.config = config
+        self.layout = layout or resolve_layout(config)
     
     def generate_year_data(self, year: int) -> YearCalendarData:
         """
@@ -33,6 +35,21 @@ class CalendarService:
         
         return YearCalendarData(year=year, months=months)
     
+    def get_year_class(self, year: int) -> YearClass:
+        """
+        获取年份类别（年份数字本身不会画进格子，同类年份的输出完全一致）
+        
+        Args:
+            year: 年份
+            
+        Returns:
+            YearClass: 年份类别
+        """
+        return YearClass(
+            is_leap=calendar_module.isleap(year),
+            jan1_weekday=calendar_module.weekday(year, 1, 1),
+        )
+    
     def _generate_month_data(self, year: int, month: int) -> MonthData:
         """
         生成单个月份的数据
@@ -49,8 +66,8 @@ class CalendarService:
         
         cells = []
 
-        day_cell_width_px = self.config.get_day_cell_width_px()
-        day_cell_height_px = self.config.get_day_cell_height_px()
+        day_cell_width_px = self.layout.day_cell_width_px
+        day_cell_height_px = self.layout.day_cell_height_px
 
         # 日期格子
         for day in range(1, num_days + 1):
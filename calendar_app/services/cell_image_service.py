@@ -3,25 +3,33 @@
 """
 
 import io
-import os
+from dataclasses import replace
+from html import escape
+from typing import List
 
 from PIL import Image, ImageDraw, ImageFont
 
 from calendar_app.config.calendar_config import CalendarConfig
-from calendar_app.models.calendar_models import ImageGenerationRequest
+from calendar_app.models.calendar_models import CellGeometry, ImageGenerationRequest, ResolvedLayout
+from calendar_app.services.font_manager import FontCacheStats, get_font_manager
+from calendar_app.services.layout_resolver import resolve_cell_geometry, resolve_layout
+from calendar_app.services.optional_imports import load_cairosvg
 
-try:
-    import cairosvg
-except Exception:
-    cairosvg = None
+
+SVG_MAX_SURFACE_PX = 32767
 
 
 class CellImageService:
     """格子图像生成服务"""
     
-    def __init__(self, config: CalendarConfig = CalendarConfig):
+    def __init__(self, config: CalendarConfig = CalendarConfig, layout: ResolvedLayout = None):
         self.config = config
-        self.font_path = self._resolve_font_path()
+        self.layout = layout or resolve_layout(config)
+        self.font_path = self.layout.font_path
+        self.font_index = self.layout.font_index
+        self.font_manager = get_font_manager(self.config.FONT_CACHE_SIZE)
+        self._layer_cache = {}
+        self._extra_geometries = {}
     
     def _load_fonts(self):
         """加载字体"""
@@ -31,13 +39,18 @@ class CellImageService:
         except Exception as e:
             print(f"字体加载失败: {e}")
 
-    def _resolve_font_path(self):
-        """选择可用字体路径"""
-        paths = [self.config.FONT_PATH] + list(self.config.FONT_FALLBACK_PATHS)
-        for path in paths:
-            if path and os.path.exists(path):
-                return path
-        return None
+    def get_geometry(self, width: int, height: int) -> CellGeometry:
+        """获取格子几何（布局中未预先解析的尺寸按需计算并记住）"""
+        geometry = self.layout.get_cell(width, height)
+        if geometry is None:
+            geometry = self._extra_geometries.get((width, height))
+            if geometry is None:
+                geometry = resolve_cell_geometry(self.config, width, height, self.font_path, self.font_index)
+                self._extra_geometries[(width, height)] = geometry
+        return geometry
+
+    def _request_geometry(self, request: ImageGenerationRequest) -> CellGeometry:
+        return self.get_geometry(request.cell_width_px, request.cell_height_px)
     
     def create_image(self, request: ImageGenerationRequest) -> Image.Image:
         """
@@ -49,50 +62,162 @@ class CellImageService:
         Returns:
             Image.Image: PIL Image对象（RGBA模式）
         """
-        if cairosvg:
+        engine = self.config.RENDER_ENGINE
+        if engine == "composite":
+            return self._create_composite_image(request)
+        if engine in ("svg", "auto") and load_cairosvg():
             try:
                 return self._create_svg_image(request)
             except Exception as e:
                 print(f"SVG渲染失败，回退到PIL绘制: {e}")
         return self._create_pil_image(request)
 
+    def warm_up(self, cell_width_px: int = None, cell_height_px: int = None):
+        """
+        预热字体与图层缓存（工作进程启动时调用一次）
+        
+        Args:
+            cell_width_px: 格子宽度（默认按配置计算）
+            cell_height_px: 格子高度（默认按配置计算）
+        """
+        width = cell_width_px or self.layout.day_cell_width_px
+        height = cell_height_px or self.layout.day_cell_height_px
+        weekday_names = self.config.WEEKDAY_NAMES
+        for day in range(1, self.config.DAYS_PER_MONTH_MAX + 1):
+            request = ImageGenerationRequest(
+                month=1,
+                day=day,
+                weekday_char=weekday_names[(day - 1) % len(weekday_names)],
+                cell_width_px=width,
+                cell_height_px=height,
+            )
+            if self.config.RENDER_ENGINE != "composite":
+                self._fit_font_for_date(self._scale_request(request, self._get_render_scale()))
+                continue
+            self._get_layer("date", day, request)
+            if day <= len(weekday_names):
+                self._get_layer("weekday", request.weekday_char, request)
+            if day <= 12:
+                self._get_layer("month", day, replace(request, month=day, day=1))
+
+    def create_images(self, requests: List[ImageGenerationRequest]) -> List[Image.Image]:
+        """
+        批量创建格子图像
+        
+        SVG 后端会把同尺寸的格子横向排成一张SVG文档，只调用一次 cairosvg，再逐格裁剪。
+        
+        Args:
+            requests: 图像生成请求列表
+            
+        Returns:
+            List[Image.Image]: RGBA图像，顺序与请求一致
+        """
+        if self.uses_svg() and len(requests) > 1:
+            try:
+                return self._create_svg_strip_images(requests)
+            except Exception as e:
+                print(f"SVG批量渲染失败，回退到逐格渲染: {e}")
+        return [self.create_image(request) for request in requests]
+
+    def get_backend_name(self) -> str:
+        """实际使用的渲染后端（svg / composite / pil）"""
+        if self.uses_svg():
+            return "svg"
+        return "composite" if self.config.RENDER_ENGINE == "composite" else "pil"
+
+    def uses_svg(self) -> bool:
+        """当前配置是否使用SVG后端"""
+        return self.config.RENDER_ENGINE in ("svg", "auto") and load_cairosvg() is not None
+
     def _create_svg_image(self, request: ImageGenerationRequest) -> Image.Image:
         """使用SVG矢量绘制并渲染为PNG"""
         width = request.cell_width_px
         height = request.cell_height_px
+        svg = self.build_svg_document(width, height, self.build_svg_fragment(request))
+        return self.rasterize_svg(svg, width, height)
+
+    def _create_svg_strip_images(self, requests: List[ImageGenerationRequest]) -> List[Image.Image]:
+        """同尺寸格子合并为一张横条SVG渲染，再裁剪出各格子"""
+        results = [None] * len(requests)
+        groups = {}
+        for index, request in enumerate(requests):
+            groups.setdefault((request.cell_width_px, request.cell_height_px), []).append(index)
+
+        strips = []
+        for (width, height), indexes in groups.items():
+            # cairo 单个画布边长上限为 32767 像素，超出时拆成多条
+            per_strip = max(1, SVG_MAX_SURFACE_PX // width)
+            for start in range(0, len(indexes), per_strip):
+                strips.append((width, height, indexes[start:start + per_strip]))
+
+        for width, height, indexes in strips:
+            fragments = [
+                f'<g transform="translate({position * width},0)">{self.build_svg_fragment(requests[index])}</g>'
+                for position, index in enumerate(indexes)
+            ]
+            strip_width = width * len(indexes)
+            strip = self.rasterize_svg(
+                self.build_svg_document(strip_width, height, "\n".join(fragments)),
+                strip_width,
+                height,
+            )
+            for position, index in enumerate(indexes):
+                results[index] = strip.crop((position * width, 0, (position + 1) * width, height))
+        return results
 
-        date_font_size = self.config.get_date_font_size(height)
-        weekday_font_size = self.config.get_weekday_font_size(height)
-        month_font_size = self.config.get_month_label_font_size(height)
+    @staticmethod
+    def build_svg_document(width: float, height: float, body: str) -> str:
+        """包装为完整SVG文档"""
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'viewBox="0 0 {width} {height}">\n{body}\n</svg>'
+        )
 
-        date_area_width = width * self.config.DATE_AREA_WIDTH_RATIO
-        date_area_height = height * self.config.DATE_AREA_HEIGHT_RATIO
-        date_center_x = width - date_area_width / 2
-        date_center_y = date_area_height / 2
-        margin = min(width, height) * self.config.CONTENT_MARGIN_RATIO
+    @staticmethod
+    def rasterize_svg(svg: str, width: int, height: int) -> Image.Image:
+        """调用 cairosvg 将SVG文档栅格化为RGBA图像"""
+        png_bytes = load_cairosvg().svg2png(
+            bytestring=svg.encode("utf-8"),
+            output_width=width,
+            output_height=height,
+        )
+        img = Image.open(io.BytesIO(png_bytes))
+        return img.convert("RGBA")
+
+    def build_svg_fragment(self, request: ImageGenerationRequest) -> str:
+        """
+        生成单个格子的SVG元素（不含<svg>根元素，坐标以格子左上角为原点）
+        
+        Args:
+            request: 图像生成请求
+            
+        Returns:
+            str: SVG元素文本
+        """
+        geometry = self._request_geometry(request)
+
+        date_font_size = geometry.vector_date_font_size
+        weekday_font_size = geometry.vector_weekday_font_size
+        month_font_size = geometry.month_font_size
+
+        date_center_x, date_center_y = geometry.vector_date_center
+        margin = geometry.vector_margin
         month_baseline = margin
 
-        triangle_width = width * self.config.WEEKDAY_AREA_WIDTH_RATIO * self.config.TRIANGLE_WIDTH_RATIO
-        triangle_height = height * self.config.WEEKDAY_AREA_HEIGHT_RATIO * self.config.TRIANGLE_HEIGHT_RATIO
-        triangle_margin = min(width, height) * self.config.TRIANGLE_MARGIN_RATIO
-        triangle_right = width - triangle_margin
-        triangle_bottom = height - triangle_margin
-        triangle_left = triangle_right - triangle_width
-        triangle_top = triangle_bottom - triangle_height
+        triangle_left, triangle_right, triangle_top, triangle_bottom = geometry.vector_triangle
+        triangle_height = triangle_bottom - triangle_top
 
         date_text = str(request.day)
-        weekday_text = request.weekday_char
+        weekday_text = escape(request.weekday_char, quote=False)
         month_text = f"{request.month:02d}" if request.day == 1 else ""
-        month_en_text = self._get_month_english(request.month) if request.day == 1 else ""
+        month_en_text = escape(self._get_month_english(request.month), quote=False) if request.day == 1 else ""
 
         text_color = self._rgb_color(self.config.COLOR_TEXT_DATE)
         triangle_color = self._rgb_color(self.config.COLOR_TRIANGLE)
         weekday_text_color = self._rgb_color(self.config.COLOR_TEXT_WEEKDAY)
-        line_width = self.config.LINE_WIDTH
 
-        font_family = self.config.FONT_FAMILY_NAME or "sans-serif"
-        svg = f"""<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">
-  <g shape-rendering="geometricPrecision">
+        font_family = escape(self.config.FONT_FAMILY_NAME or "sans-serif", quote=False)
+        return f"""  <g shape-rendering="geometricPrecision">
     <polygon points="{triangle_right},{triangle_bottom} {triangle_left},{triangle_bottom} {triangle_right},{triangle_top}"
       fill="{triangle_color}" />
   </g>
@@ -103,24 +228,116 @@ class CellImageService:
   <text x="{margin}" y="{month_baseline + month_font_size * 1.05}" text-anchor="start" dominant-baseline="hanging"
     font-family="{font_family}, sans-serif" font-size="{month_font_size * self.config.MONTH_LABEL_ENGLISH_SIZE_RATIO}" font-weight="900" fill="{text_color}">{month_en_text}</text>
   <text x="{triangle_right - triangle_height * 0.38}" y="{triangle_bottom - triangle_height * 0.38}" text-anchor="middle" dominant-baseline="middle"
-    font-family="{font_family}, sans-serif" font-size="{weekday_font_size}" fill="{weekday_text_color}">{weekday_text}</text>
-</svg>"""
+    font-family="{font_family}, sans-serif" font-size="{weekday_font_size}" fill="{weekday_text_color}">{weekday_text}</text>"""
 
-        png_bytes = cairosvg.svg2png(
-            bytestring=svg.encode("utf-8"),
-            output_width=width,
-            output_height=height,
+    def _create_pil_image(self, request: ImageGenerationRequest) -> Image.Image:
+        """PIL绘制回退方案：按 RENDER_SCALE 超采样绘制，再缩小到请求尺寸"""
+        scale = self._get_render_scale()
+        img = self._render_pil(self._scale_request(request, scale), scale)
+        return self._downsample(img, request)
+
+    def _create_composite_image(self, request: ImageGenerationRequest) -> Image.Image:
+        """
+        图层合成方案：日期数字、周几三角、月份标签各自只绘制一次，之后按格子叠加
+
+        同一格子尺寸下最多 31 + 7 + 12 个图层，365 个格子只需叠加缓存图层。
+        """
+        img = Image.new(
+            'RGBA',
+            (request.cell_width_px, request.cell_height_px),
+            (255, 255, 255, 0),
         )
-        img = Image.open(io.BytesIO(png_bytes))
-        return img.convert("RGBA")
+        layers = [("date", request.day)]
+        if request.day == 1:
+            layers.append(("month", request.month))
+        layers.append(("weekday", request.weekday_char))
+        placed = []
+        for kind, value in layers:
+            layer, offset = self._get_layer(kind, value, request)
+            if layer is None:
+                continue
+            box = (offset[0], offset[1], offset[0] + layer.width, offset[1] + layer.height)
+            if any(self._boxes_overlap(box, other) for other in placed):
+                img.alpha_composite(layer, dest=offset)
+            else:
+                # 落在全透明区域上，合成结果就是图层本身，直接贴入
+                img.paste(layer, offset)
+            placed.append(box)
+        return img
 
-    def _create_pil_image(self, request: ImageGenerationRequest) -> Image.Image:
-        """PIL绘制回退方案"""
-        scale = max(1, int(self.config.RENDER_SCALE))
-        if scale == 1:
-            return self._render_pil(request, scale)
+    @staticmethod
+    def _boxes_overlap(a, b) -> bool:
+        return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+    def _get_layer(self, kind: str, value, request: ImageGenerationRequest):
+        """
+        获取（必要时绘制）单个可复用图层（尺寸与请求一致）
 
-        high_res_request = ImageGenerationRequest(
+        Returns:
+            tuple: (裁剪到非透明区域的图层, 在格子中的左上角坐标)；图层为空时返回 (None, (0, 0))
+        """
+        key = (kind, value, self._request_geometry(request))
+        cached = self._layer_cache.get(key)
+        if cached is not None:
+            return cached
+
+        scale = self.layout.render_scale
+        # 文字由FreeType直接抗锯齿，关闭文字超采样时按目标尺寸直接绘制
+        text_scale = self.layout.text_scale
+        if kind == "date":
+            layer = self._draw_layer(request, text_scale, lambda draw, req: self._draw_date(
+                draw, req, self._fit_font_for_date(req)))
+        elif kind == "month":
+            layer = self._draw_layer(request, text_scale, lambda draw, req: self._draw_month_label(
+                draw, req, self._get_month_label_font(req), stroke_scale=text_scale / scale))
+        else:
+            # 三角形斜边需要超采样抗锯齿；周几文字视配置在缩小前或缩小后绘制
+            if text_scale == scale:
+                layer = self._draw_layer(request, scale, lambda draw, req: (
+                    self._draw_triangle(draw, req), self._draw_weekday_text(draw, req)))
+            else:
+                layer = self._draw_layer(request, scale, self._draw_triangle)
+                self._draw_weekday_text(ImageDraw.Draw(layer), request)
+
+        bbox = layer.getchannel("A").getbbox()
+        cached = (layer.crop(bbox), bbox[:2]) if bbox else (None, (0, 0))
+        self._layer_cache[key] = cached
+        return cached
+
+    def _draw_layer(self, request: ImageGenerationRequest, scale: int, painter) -> Image.Image:
+        """在 scale 倍尺寸的透明画布上绘制，再缩小到请求尺寸"""
+        scaled = self._scale_request(request, scale)
+        layer = Image.new(
+            'RGBA',
+            (scaled.cell_width_px, scaled.cell_height_px),
+            (255, 255, 255, 0),
+        )
+        painter(ImageDraw.Draw(layer), scaled)
+        return self._downsample(layer, request)
+
+    def _downsample(self, img: Image.Image, request: ImageGenerationRequest) -> Image.Image:
+        """将超采样图像缩小到请求尺寸"""
+        size = (request.cell_width_px, request.cell_height_px)
+        if img.size == size:
+            return img
+        return img.resize(size, self._get_resample_filter())
+
+    def _get_resample_filter(self):
+        return getattr(Image.Resampling, str(self.config.RESAMPLE_FILTER).upper())
+
+    def clear_layer_cache(self):
+        """清空合成图层缓存"""
+        self._layer_cache.clear()
+
+    def _get_render_scale(self) -> int:
+        return self.layout.render_scale
+
+    @staticmethod
+    def _scale_request(request: ImageGenerationRequest, scale: int) -> ImageGenerationRequest:
+        """按渲染倍率放大请求尺寸"""
+        if scale == 1:
+            return request
+        return ImageGenerationRequest(
             month=request.month,
             day=request.day,
             weekday_char=request.weekday_char,
@@ -128,7 +345,6 @@ class CellImageService:
             cell_height_px=request.cell_height_px * scale,
             is_weekend=request.is_weekend,
         )
-        return self._render_pil(high_res_request, scale)
 
     def _render_pil(self, request: ImageGenerationRequest, scale: int) -> Image.Image:
         img = Image.new(
@@ -152,91 +368,42 @@ class CellImageService:
         """从RGBA/RGB元组转换为SVG颜色"""
         return f"rgb({color[0]}, {color[1]}, {color[2]})"
 
-    def _get_triangle_bounds(self, request: ImageGenerationRequest, margin: int):
-        triangle_width = int(request.cell_width_px * self.config.WEEKDAY_AREA_WIDTH_RATIO * self.config.TRIANGLE_WIDTH_RATIO)
-        triangle_height = int(request.cell_height_px * self.config.WEEKDAY_AREA_HEIGHT_RATIO * self.config.TRIANGLE_HEIGHT_RATIO)
-
-        triangle_right = request.cell_width_px - margin
-        triangle_left = triangle_right - triangle_width
-        triangle_bottom = request.cell_height_px - margin
-        triangle_top = triangle_bottom - triangle_height
-        triangle_center_x = (triangle_left + triangle_right) // 2
-        return triangle_left, triangle_right, triangle_top, triangle_bottom, triangle_center_x
-
     def _fit_font_for_date(self, request: ImageGenerationRequest) -> ImageFont.FreeTypeFont:
-        date_text = str(request.day)
-        margin = int(min(request.cell_width_px, request.cell_height_px) * self.config.CONTENT_MARGIN_RATIO)
-
-        date_area_width = int(request.cell_width_px * self.config.DATE_AREA_WIDTH_RATIO) - margin
-        date_area_height = int(request.cell_height_px * self.config.DATE_AREA_HEIGHT_RATIO) - margin
-
-        max_width = max(1, date_area_width)
-        max_height = max(1, date_area_height)
-
-        cell_area = request.cell_width_px * request.cell_height_px
-        target_area = min(cell_area * self.config.DATE_TEXT_AREA_RATIO, max_width * max_height)
-
-        return self._fit_font(date_text, max_width, max_height, target_area)
-
-    def _fit_font_for_weekday(self, request: ImageGenerationRequest,
-                              triangle_left: int, triangle_right: int,
-                              triangle_top: int, triangle_bottom: int) -> ImageFont.FreeTypeFont:
-        text = request.weekday_char
-        inner_margin = max(1, int(min(request.cell_width_px, request.cell_height_px) * self.config.CONTENT_MARGIN_RATIO * 0.6))
-        triangle_width = max(1, (triangle_right - triangle_left))
-        triangle_height = max(1, (triangle_bottom - triangle_top))
-
-        max_width = int(triangle_width * self.config.WEEKDAY_TRIANGLE_TEXT_WIDTH_RATIO)
-        max_height = int(triangle_height * self.config.WEEKDAY_TRIANGLE_TEXT_HEIGHT_RATIO)
-        max_width = max(1, max_width - inner_margin * 2)
-        max_height = max(1, max_height - inner_margin * 2)
-
-        cell_area = request.cell_width_px * request.cell_height_px
-        max_area = max_width * max_height
-        target_area = min(cell_area * self.config.WEEKDAY_TEXT_AREA_RATIO, max_area)
-
-        return self._fit_font(text, max_width, max_height, target_area)
+        geometry = self._request_geometry(request)
+        if 1 <= request.day <= len(geometry.date_font_sizes):
+            return self._get_font(geometry.date_font_sizes[request.day - 1])
+        return self._fit_font(str(request.day), *geometry.date_box, geometry.date_target_area)
+
+    def _fit_font_for_weekday(self, request: ImageGenerationRequest) -> ImageFont.FreeTypeFont:
+        geometry = self._request_geometry(request)
+        if geometry.weekday_font_sizes and request.weekday_char in self.config.WEEKDAY_NAMES:
+            index = self.config.WEEKDAY_NAMES.index(request.weekday_char)
+            return self._get_font(geometry.weekday_font_sizes[index])
+        return self._fit_font(request.weekday_char, *geometry.weekday_box, geometry.weekday_target_area)
+
+    def _get_font(self, size: int) -> ImageFont.FreeTypeFont:
+        if not self.font_path:
+            return ImageFont.load_default()
+        return self.font_manager.get_font(self.font_path, size, self.font_index)
 
     def _fit_font(self, text: str, max_width: int, max_height: int, target_area: float) -> ImageFont.FreeTypeFont:
         if not self.font_path:
             return ImageFont.load_default()
 
-        size_low = 4
-        size_high = max(8, max_height)
-        best_size = size_low
-
-        probe_img = Image.new("RGB", (1, 1))
-        probe_draw = ImageDraw.Draw(probe_img)
-
-        while size_low <= size_high:
-            size_mid = (size_low + size_high) // 2
-            font = ImageFont.truetype(self.font_path, size_mid)
-            bbox = probe_draw.textbbox((0, 0), text, font=font)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
-            area = text_width * text_height
-
-            fits = text_width <= max_width and text_height <= max_height and area <= target_area
-            if fits:
-                best_size = size_mid
-                size_low = size_mid + 1
-            else:
-                size_high = size_mid - 1
+        size = self.font_manager.fit_font_size(
+            self.font_path, text, max_width, max_height, target_area, self.font_index
+        )
+        return self.font_manager.get_font(self.font_path, size, self.font_index)
 
-        return ImageFont.truetype(self.font_path, best_size)
+    def get_font_cache_stats(self) -> FontCacheStats:
+        """获取字体缓存命中统计（进程内所有服务共享）"""
+        return self.font_manager.stats
 
     def _get_month_label_font(self, request: ImageGenerationRequest) -> ImageFont.FreeTypeFont:
-        size = self.config.get_month_label_font_size(request.cell_height_px)
-        if not self.font_path:
-            return ImageFont.load_default()
-        return ImageFont.truetype(self.font_path, size)
+        return self._get_font(self._request_geometry(request).month_font_size)
 
     def _get_month_english_font(self, request: ImageGenerationRequest) -> ImageFont.FreeTypeFont:
-        base_size = self.config.get_month_label_font_size(request.cell_height_px)
-        size = max(6, int(base_size * self.config.MONTH_LABEL_ENGLISH_SIZE_RATIO))
-        if not self.font_path:
-            return ImageFont.load_default()
-        return ImageFont.truetype(self.font_path, size)
+        return self._get_font(self._request_geometry(request).month_english_font_size)
 
     def _get_month_english(self, month: int) -> str:
         if 1 <= month <= 12:
@@ -262,9 +429,8 @@ class CellImageService:
         date_text_width = date_bbox[2] - date_bbox[0]
         date_text_height = date_bbox[3] - date_bbox[1]
 
-        margin = int(min(request.cell_width_px, request.cell_height_px) * self.config.CONTENT_MARGIN_RATIO)
-        date_x = request.cell_width_px - margin - date_text_width
-        date_y = margin
+        anchor_right, date_y = self._request_geometry(request).date_anchor
+        date_x = anchor_right - date_text_width
 
         # 绘制
         draw.text((date_x, date_y), date_text, 
@@ -272,13 +438,14 @@ class CellImageService:
 
     def _draw_month_label(self, draw: ImageDraw.ImageDraw,
                           request: ImageGenerationRequest,
-                          font: ImageFont.FreeTypeFont):
+                          font: ImageFont.FreeTypeFont,
+                          stroke_scale: float = 1.0):
         month_text = f"{request.month:02d}"
-        margin = int(min(request.cell_width_px, request.cell_height_px) * self.config.CONTENT_MARGIN_RATIO)
+        geometry = self._request_geometry(request)
         english_text = self._get_month_english(request.month)
-        stroke_width = max(1, int(self.config.MONTH_LABEL_STROKE_WIDTH))
+        stroke_width = self._scale_stroke(self.config.MONTH_LABEL_STROKE_WIDTH, stroke_scale)
         draw.text(
-            (margin, margin),
+            geometry.month_anchor,
             month_text,
             fill=self.config.COLOR_TEXT_DATE,
             font=font,
@@ -286,16 +453,22 @@ class CellImageService:
             stroke_fill=self.config.COLOR_TEXT_DATE,
         )
         english_font = self._get_month_english_font(request)
-        english_y = margin + int(font.size * 1.05)
         draw.text(
-            (margin, english_y),
+            geometry.month_english_anchor,
             english_text,
             fill=self.config.COLOR_TEXT_DATE,
             font=english_font,
-            stroke_width=max(1, int(self.config.MONTH_LABEL_ENGLISH_STROKE_WIDTH)),
+            stroke_width=self._scale_stroke(self.config.MONTH_LABEL_ENGLISH_STROKE_WIDTH, stroke_scale),
             stroke_fill=self.config.COLOR_TEXT_DATE,
         )
     
+    @staticmethod
+    def _scale_stroke(width: float, stroke_scale: float) -> int:
+        """描边宽度按超采样画布定义；直接按目标尺寸绘制时等比缩小（可为0）"""
+        if stroke_scale >= 1:
+            return max(1, int(width))
+        return int(width * stroke_scale + 0.5)
+    
     def _draw_weekday_with_triangle(self, draw: ImageDraw.ImageDraw,
                                     request: ImageGenerationRequest,
                                     line_width: int):
@@ -307,28 +480,26 @@ class CellImageService:
             request: 请求对象
             font: 字体对象
         """
-        triangle_margin = int(min(request.cell_width_px, request.cell_height_px) * self.config.TRIANGLE_MARGIN_RATIO)
-        triangle_left, triangle_right, triangle_top, triangle_bottom, _triangle_center_x = self._get_triangle_bounds(
-            request, triangle_margin
-        )
-        triangle_height = triangle_bottom - triangle_top
+        self._draw_triangle(draw, request)
+        self._draw_weekday_text(draw, request)
 
-        # 绘制直角三角形（直角在右下角）
+    def _draw_triangle(self, draw: ImageDraw.ImageDraw, request: ImageGenerationRequest):
+        """绘制直角三角形（直角在右下角）"""
         draw.polygon(
-            [
-                (triangle_right, triangle_bottom),
-                (triangle_left, triangle_bottom),
-                (triangle_right, triangle_top),
-            ],
+            list(self._request_geometry(request).triangle_vertices),
             fill=self.config.COLOR_TRIANGLE,
         )
-        
-        weekday_font = self._fit_font_for_weekday(request, triangle_left, triangle_right, triangle_top, triangle_bottom)
+
+    def _draw_weekday_text(self, draw: ImageDraw.ImageDraw, request: ImageGenerationRequest):
+        """在三角形内绘制周几文字"""
+        center_x, center_y = self._request_geometry(request).weekday_anchor
+
+        weekday_font = self._fit_font_for_weekday(request)
         weekday_bbox = draw.textbbox((0, 0), request.weekday_char, font=weekday_font)
         weekday_text_width = weekday_bbox[2] - weekday_bbox[0]
         weekday_text_height = weekday_bbox[3] - weekday_bbox[1]
-        weekday_x = triangle_right - int(triangle_height * 0.38) - weekday_text_width // 2
-        weekday_y = triangle_bottom - int(triangle_height * 0.38) - weekday_text_height // 2
+        weekday_x = center_x - weekday_text_width // 2
+        weekday_y = center_y - weekday_text_height // 2
 
         draw.text((weekday_x, weekday_y), request.weekday_char,
                  fill=self.config.COLOR_TEXT_WEEKDAY, font=weekday_font)
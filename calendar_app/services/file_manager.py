@@ -1,36 +1,260 @@
 """
 文件管理服务 - 处理临时文件和资源清理
+
+每次运行在临时根目录下创建独有的工作区（目录名带进程号），多个生成任务可以在同一台机器上并行，
+互不删除对方的文件；工作区先以清扫时忽略的名字创建并对其中的锁文件加 flock，再改名到正式位置，
+运行期间一直持有该锁。进程正常退出时清理本进程的工作区，异常退出残留的工作区（锁已随进程释放）
+由之后的运行清扫。不按进程号判断存活，临时根目录经绑定挂载或 NFS 在不同 PID 命名空间的机器/容器间
+共享时也不会误删。
+输出文件通过 atomic_output 先写临时文件再原子替换，读者不会看到写了一半的文件；
+进程崩溃残留的临时文件在下次写同一目标时按存在时间清扫。
 """
 
+import atexit
 import os
 import shutil
-from typing import Optional
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager, suppress
+from typing import Dict, Optional
 
 from calendar_app.config.calendar_config import CalendarConfig
 
+try:
+    import fcntl
+except ImportError:  # 非POSIX平台：工作区不加锁，只按存在时间清扫
+    fcntl = None
+
+
+TEMP_LOCATIONS = ("local", "system", "tmpfs")  # TEMP_LOCATION 可选值
+TMPFS_DIRS = ("/dev/shm",)  # tmpfs 候选目录（按顺序取第一个可写的）
+TEMP_RUN_PREFIX = "calendar_run_"  # 工作区目录名前缀（后接进程号）
+TEMP_PENDING_PREFIX = ".calendar_pending_"  # 尚未加锁的工作区名前缀（清扫时只按存在时间处理）
+TEMP_LOCK_NAME = ".lock"  # 工作区内的锁文件（所属运行持有 flock）
+STALE_TEMP_DIR_AGE = 24 * 3600  # 无法加锁判断时（未加锁、无锁文件或非POSIX平台）以及输出临时文件，超过该秒数才清扫
+
+# 本进程创建且尚未清理的工作区 -> 持有 flock 的锁文件（进程退出时兜底清理）
+_active_temp_dirs: Dict[str, Optional[object]] = {}
+_active_temp_dirs_lock = threading.Lock()
+
+
+def _cleanup_active_temp_dirs():
+    with _active_temp_dirs_lock:
+        entries = list(_active_temp_dirs.items())
+        _active_temp_dirs.clear()
+    for path, lock_file in entries:
+        shutil.rmtree(path, ignore_errors=True)
+        if lock_file is not None:
+            lock_file.close()
+
+
+atexit.register(_cleanup_active_temp_dirs)
+
+
+def _lock_temp_dir(path: str):
+    """在工作区内创建锁文件并加排他锁（非POSIX平台返回None）"""
+    if fcntl is None:
+        return None
+    lock_file = open(os.path.join(path, TEMP_LOCK_NAME), "w")
+    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    return lock_file
+
+
+def _is_older_than(path: str, seconds: float) -> bool:
+    try:
+        return time.time() - os.stat(path).st_mtime > seconds
+    except OSError:
+        return False
+
+
+def _remove_if_old(path: str) -> bool:
+    """删除超过 STALE_TEMP_DIR_AGE 未修改的文件或目录"""
+    if not _is_older_than(path, STALE_TEMP_DIR_AGE):
+        return False
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        with suppress(OSError):
+            os.remove(path)
+    return True
+
+
+def _remove_if_stale(path: str) -> bool:
+    """
+    工作区的所属运行已结束时删除它
+
+    正式名字下的工作区创建时已加锁，能拿到锁文件的 flock 说明持有者已退出
+    （锁随进程释放，与进程号和 PID 命名空间无关）；没有锁文件（非POSIX平台创建）时只清扫足够旧的工作区。
+    """
+    if fcntl is None:
+        return _remove_if_old(path)
+    try:
+        lock_file = open(os.path.join(path, TEMP_LOCK_NAME), "r+")
+    except FileNotFoundError:
+        return _remove_if_old(path)
+    except OSError:
+        return False
+    with lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False  # 所属运行仍在进行
+        shutil.rmtree(path, ignore_errors=True)
+    return True
+
+
+def cleanup_stale_temp_dirs(root: str) -> int:
+    """
+    清扫已结束运行残留的工作区（崩溃或被强制结束时来不及清理）
+
+    Args:
+        root: 临时根目录
+
+    Returns:
+        int: 清理的目录数
+    """
+    removed = 0
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return 0
+    for name in names:
+        path = os.path.join(root, name)
+        if not os.path.isdir(path):
+            continue
+        if name.startswith(TEMP_RUN_PREFIX) and _remove_if_stale(path):
+            removed += 1
+        elif name.startswith(TEMP_PENDING_PREFIX) and _remove_if_old(path):
+            removed += 1
+    return removed
+
+
+def get_output_temp_path(path: str, suffix: str = "") -> str:
+    """
+    目标路径同目录下本进程独有的临时路径（以点号开头，带进程号与随机串）
+
+    Args:
+        path: 目标文件或目录路径
+        suffix: 附加在 .tmp 之后的后缀（如保留原扩展名）
+
+    Returns:
+        str: 临时路径
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, f".{name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp{suffix}")
+
+
+def cleanup_stale_output_temps(path: str) -> int:
+    """
+    清扫目标路径旁崩溃残留的临时文件或目录（get_output_temp_path 生成的名字）
+
+    写入中的临时文件会不断更新修改时间，只删除超过 STALE_TEMP_DIR_AGE 未修改的。
+
+    Args:
+        path: 目标文件或目录路径
+
+    Returns:
+        int: 清理的数量
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    prefix = f".{name}."
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return 0
+    removed = 0
+    for entry in names:
+        if entry.startswith(prefix) and ".tmp" in entry[len(prefix):]:
+            if _remove_if_old(os.path.join(directory, entry)):
+                removed += 1
+    return removed
+
+
+@contextmanager
+def atomic_output(path: str):
+    """
+    原子写出输出文件：先写到同目录下的临时文件，成功后用 os.replace 替换目标文件
+
+    失败时删除临时文件，目标文件保持原样。临时文件名保留原扩展名（便于按扩展名判断格式），
+    并以点号开头、带进程号与随机串，并发写同一目标时互不干扰，最后完成的一次生效；
+    开始前先清扫该目标旁崩溃残留的临时文件。
+
+    Args:
+        path: 目标文件路径
+
+    Yields:
+        str: 应写入的临时文件路径
+    """
+    cleanup_stale_output_temps(path)
+    tmp_path = get_output_temp_path(path, os.path.splitext(path)[1])
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    except BaseException:
+        with suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
 
 class FileManager:
     """文件管理服务"""
     
     def __init__(self, config: CalendarConfig = CalendarConfig):
         self.config = config
-        self.temp_dir = config.TEMP_DIR
+        self.temp_dir: Optional[str] = None  # 本次运行的工作区（create_temp_dir 创建）
+    
+    def get_temp_root(self) -> str:
+        """
+        获取临时根目录（按 TEMP_LOCATION）
+        
+        Returns:
+            str: local 为 TEMP_DIR，system 为系统临时目录（遵循 TMPDIR），
+                 tmpfs 为 /dev/shm（不可用时回退到系统临时目录）
+        """
+        location = str(self.config.TEMP_LOCATION).lower()
+        if location not in TEMP_LOCATIONS:
+            raise ValueError(f"不支持的临时目录位置: {self.config.TEMP_LOCATION}")
+        if location == "local" and self.config.TEMP_DIR:
+            return self.config.TEMP_DIR
+        if location == "tmpfs":
+            for directory in TMPFS_DIRS:
+                if os.path.isdir(directory) and os.access(directory, os.W_OK):
+                    return directory
+        return tempfile.gettempdir()
     
     def create_temp_dir(self) -> str:
         """
-        创建临时目录
+        创建本次运行独有的工作区（同一对象再次调用时先清理上一个工作区）
         
         Returns:
             str: 临时目录路径
         """
-        if os.path.exists(self.temp_dir):
-            shutil.rmtree(self.temp_dir)
-        os.makedirs(self.temp_dir, exist_ok=True)
+        self.cleanup_temp_files()
+        root = self.get_temp_root()
+        os.makedirs(root, exist_ok=True)
+        cleanup_stale_temp_dirs(root)
+        # 先以清扫时忽略的名字创建并加锁，再改名到正式位置：清扫者看到的正式工作区都已加锁
+        pending_dir = tempfile.mkdtemp(prefix=f"{TEMP_PENDING_PREFIX}{os.getpid()}_", dir=root)
+        temp_dir = os.path.join(root, TEMP_RUN_PREFIX + os.path.basename(pending_dir)[len(TEMP_PENDING_PREFIX):])
+        lock_file = None
+        try:
+            lock_file = _lock_temp_dir(pending_dir)
+            os.rename(pending_dir, temp_dir)
+        except OSError:
+            if lock_file is not None:
+                lock_file.close()
+            shutil.rmtree(pending_dir, ignore_errors=True)
+            raise
+        with _active_temp_dirs_lock:
+            _active_temp_dirs[temp_dir] = lock_file
+        self.temp_dir = temp_dir
         return self.temp_dir
     
     def get_temp_image_path(self, month: int, day: int) -> str:
         """
-        获取临时图像文件路径
+        获取临时图像文件路径（工作区尚未创建时自动创建）
         
         Args:
             month: 月份
@@ -39,23 +263,33 @@ class FileManager:
         Returns:
             str: 文件路径
         """
+        if self.temp_dir is None:
+            self.create_temp_dir()
         filename = f"day_{month:02d}_{day:02d}.png"
         return os.path.join(self.temp_dir, filename)
     
     def cleanup_temp_files(self) -> bool:
         """
-        清理临时文件
+        清理本次运行的工作区（不影响其他运行）
         
         Returns:
             bool: 是否成功清理
         """
-        try:
-            if os.path.exists(self.temp_dir):
-                shutil.rmtree(self.temp_dir)
+        temp_dir, self.temp_dir = self.temp_dir, None
+        if temp_dir is None:
             return True
+        try:
+            if os.path.exists(temp_dir):
+                shutil.rmtree(temp_dir)
         except Exception as e:
+            # 保留登记，进程退出时再尝试清理
             print(f"清理临时文件失败: {e}")
             return False
+        with _active_temp_dirs_lock:
+            lock_file = _active_temp_dirs.pop(temp_dir, None)
+        if lock_file is not None:
+            lock_file.close()
+        return True
     
     def get_output_filename(self, year: int) -> str:
         """
@@ -68,3 +302,52 @@ class FileManager:
             str: 输出文件名
         """
         return self.config.OUTPUT_FILENAME_PATTERN.format(year=year)
+    
+    def get_output_image_filename(self, year: int) -> str:
+        """
+        获取大图输出文件名
+        
+        Args:
+            year: 年份
+            
+        Returns:
+            str: 输出文件名
+        """
+        return self.config.OUTPUT_IMAGE_PATTERN.format(year=year)
+    
+    def get_output_pdf_filename(self, year: int) -> str:
+        """
+        获取PDF输出文件名
+        
+        Args:
+            year: 年份
+            
+        Returns:
+            str: 输出文件名
+        """
+        return self.config.OUTPUT_PDF_PATTERN.format(year=year)
+    
+    def get_output_tiles_filename(self, year: int) -> str:
+        """
+        获取 Deep Zoom 描述文件名
+        
+        Args:
+            year: 年份
+            
+        Returns:
+            str: 输出文件名
+        """
+        return self.config.OUTPUT_TILES_PATTERN.format(year=year)
+    
+    def get_multi_year_filename(self, start_year: int, end_year: int) -> str:
+        """
+        获取多年份工作簿文件名
+        
+        Args:
+            start_year: 起始年份
+            end_year: 结束年份
+            
+        Returns:
+            str: 输出文件名
+        """
+        return self.config.OUTPUT_MULTI_YEAR_PATTERN.format(start=start_year, end=end_year)
@@ -0,0 +1,183 @@
+"""
+字体管理服务 - 进程级字体缓存与字号拟合记忆表
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from PIL import Image, ImageDraw, ImageFont
+
+
+@dataclass
+class FontCacheStats:
+    """字体缓存命中统计"""
+
+    font_hits: int = 0  # 字体对象命中次数
+    font_misses: int = 0  # 字体对象未命中（实际加载字体文件）次数
+    fit_hits: int = 0  # 字号拟合命中次数
+    fit_misses: int = 0  # 字号拟合未命中（实际二分搜索）次数
+
+    @property
+    def font_hit_rate(self) -> float:
+        """字体对象命中率"""
+        total = self.font_hits + self.font_misses
+        return self.font_hits / total if total else 0.0
+
+    @property
+    def fit_hit_rate(self) -> float:
+        """字号拟合命中率"""
+        total = self.fit_hits + self.fit_misses
+        return self.fit_hits / total if total else 0.0
+
+    def as_dict(self) -> dict:
+        """转换为字典（便于打印和序列化）"""
+        return {
+            "font_hits": self.font_hits,
+            "font_misses": self.font_misses,
+            "fit_hits": self.fit_hits,
+            "fit_misses": self.fit_misses,
+        }
+
+
+class FontManager:
+    """字体管理器 - 有界LRU字体缓存 + 字号拟合记忆表"""
+
+    def __init__(self, max_fonts: int = 128, max_fits: int = 4096):
+        """
+        初始化字体管理器
+
+        Args:
+            max_fonts: 缓存的字体对象上限，键为 (路径, 字号, 字体索引)
+            max_fits: 字号拟合结果上限，键为 (路径, 文本, 最大宽, 最大高, 目标面积)
+        """
+        self.max_fonts = max(1, int(max_fonts))
+        self.max_fits = max(1, int(max_fits))
+        self.stats = FontCacheStats()
+        self._fonts = OrderedDict()
+        self._fits = OrderedDict()
+        self._lock = threading.RLock()
+        self._probe_draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+
+    def get_font(self, path: Optional[str], size: int, index: int = 0) -> ImageFont.FreeTypeFont:
+        """
+        获取字体对象（命中缓存时不再解析字体文件）
+
+        Args:
+            path: 字体文件路径（为None时返回PIL默认字体）
+            size: 字号
+            index: .ttc 字体集合中的索引
+
+        Returns:
+            ImageFont.FreeTypeFont: 字体对象
+        """
+        if not path:
+            return ImageFont.load_default()
+
+        key = (path, int(size), int(index))
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is not None:
+                self._fonts.move_to_end(key)
+                self.stats.font_hits += 1
+                return font
+
+            self.stats.font_misses += 1
+            font = ImageFont.truetype(path, int(size), index=int(index))
+            self._fonts[key] = font
+            if len(self._fonts) > self.max_fonts:
+                self._fonts.popitem(last=False)
+            return font
+
+    def fit_font_size(self, path: Optional[str], text: str, max_width: int, max_height: int,
+                      target_area: float, index: int = 0) -> int:
+        """
+        计算满足宽、高与面积约束的最大字号（结果记忆化）
+
+        Args:
+            path: 字体文件路径
+            text: 待绘制文本
+            max_width: 最大宽度（像素）
+            max_height: 最大高度（像素）
+            target_area: 文字外框最大面积（像素²）
+            index: .ttc 字体集合中的索引
+
+        Returns:
+            int: 字号
+        """
+        key = (path, int(index), text, int(max_width), int(max_height), float(target_area))
+        with self._lock:
+            size = self._fits.get(key)
+            if size is not None:
+                self._fits.move_to_end(key)
+                self.stats.fit_hits += 1
+                return size
+
+            self.stats.fit_misses += 1
+            size = self._search_font_size(path, text, max_width, max_height, target_area, index)
+            self._fits[key] = size
+            if len(self._fits) > self.max_fits:
+                self._fits.popitem(last=False)
+            return size
+
+    def _search_font_size(self, path: Optional[str], text: str, max_width: int, max_height: int,
+                          target_area: float, index: int) -> int:
+        """二分搜索最大可用字号"""
+        size_low = 4
+        size_high = max(8, max_height)
+        best_size = size_low
+
+        while size_low <= size_high:
+            size_mid = (size_low + size_high) // 2
+            font = self.get_font(path, size_mid, index)
+            bbox = self._probe_draw.textbbox((0, 0), text, font=font)
+            text_width = bbox[2] - bbox[0]
+            text_height = bbox[3] - bbox[1]
+            area = text_width * text_height
+
+            fits = text_width <= max_width and text_height <= max_height and area <= target_area
+            if fits:
+                best_size = size_mid
+                size_low = size_mid + 1
+            else:
+                size_high = size_mid - 1
+
+        return best_size
+
+    def reset_stats(self):
+        """清零命中统计"""
+        with self._lock:
+            self.stats = FontCacheStats()
+
+    def clear(self):
+        """清空所有缓存"""
+        with self._lock:
+            self._fonts.clear()
+            self._fits.clear()
+
+
+# 按进程ID区分的共享实例：fork出的子进程不会继承父进程的字体对象
+_managers: Dict[int, FontManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_font_manager(max_fonts: int = 128) -> FontManager:
+    """
+    获取当前进程共享的字体管理器
+
+    Args:
+        max_fonts: 首次创建时的字体缓存上限
+
+    Returns:
+        FontManager: 当前进程的字体管理器
+    """
+    pid = os.getpid()
+    with _managers_lock:
+        manager = _managers.get(pid)
+        if manager is None:
+            _managers.clear()
+            manager = FontManager(max_fonts=max_fonts)
+            _managers[pid] = manager
+        return manager
@@ -3,72 +3,232 @@
 """
 
 import calendar as calendar_module
-from typing import Dict, Tuple, List
+from typing import Dict, Iterable, Optional, Tuple
 
 from PIL import Image, ImageDraw
 
 from calendar_app.config.calendar_config import CalendarConfig
-from calendar_app.models.calendar_models import YearCalendarData, CellInfo, ImageGenerationRequest
-from calendar_app.services.cell_image_service import CellImageService
+from calendar_app.models.calendar_models import YearCalendarData, CellInfo, ImageGenerationRequest, ResolvedLayout
+from calendar_app.services.file_manager import atomic_output
+from calendar_app.services.layout_resolver import resolve_layout
+from calendar_app.services.png_stream_writer import PngStreamWriter
+from calendar_app.services.render_pool import RenderPool
 
 
 class FullImageExporter:
     """年日历大图导出服务"""
 
-    def __init__(self, config: CalendarConfig = CalendarConfig):
+    def __init__(self, config: CalendarConfig = CalendarConfig,
+                 render_pool: Optional[RenderPool] = None, workers: Optional[int] = None):
         self.config = config
-        self.image_service = CellImageService(config)
+        self.render_pool = render_pool or RenderPool(config, workers)
+        self.image_service = self.render_pool.image_service
+        self.layout = self.render_pool.layout
+        # 整年大图可按 FULL_IMAGE_SCALE 放大（海报打印），单独解析一份布局
+        if config.FULL_IMAGE_SCALE != 1:
+            self.layout = resolve_layout(config, config.FULL_IMAGE_SCALE)
 
     def render_year_image(self, calendar_data: YearCalendarData, output_file: str) -> str:
-        """导出一张完整年日历图片"""
+        """导出一张完整年日历图片（先写临时文件再原子替换）"""
+        with atomic_output(output_file) as tmp_path:
+            self._render_year_image(calendar_data, tmp_path)
+        return output_file
+
+    def _render_year_image(self, calendar_data: YearCalendarData, output_file: str) -> str:
         day_map = self._build_day_map(calendar_data)
 
-        col_count = self.config.DAYS_PER_MONTH_MAX
-        row_heights = self._get_row_heights()
-        total_width = col_count * self.config.get_day_cell_width_px()
-        total_height = sum(row_heights)
+        if self._should_stream(output_file):
+            return self._render_streaming(calendar_data, day_map, output_file)
+
+        if self.image_service.uses_svg():
+            try:
+                img = self._render_svg_year_image(calendar_data, day_map)
+                img.save(output_file)
+                return output_file
+            except Exception as e:
+                print(f"SVG整图渲染失败，回退到逐格渲染: {e}")
+
+        layout = self.layout
+        img = Image.new("RGB", (layout.total_width_px, layout.total_height_px), (255, 255, 255))
+        cell_images = self._render_cell_images(calendar_data, day_map)
+        for month in range(1, 13):
+            band = self.render_month_band(calendar_data, month, day_map, cell_images)
+            img.paste(band, (0, self.get_month_band_box(month)[0]))
 
-        img = Image.new("RGB", (total_width, total_height), (255, 255, 255))
-        draw = ImageDraw.Draw(img)
+        img.save(output_file)
+        return output_file
+
+    def _should_stream(self, output_file: str) -> bool:
+        """整图像素数超过阈值时改为按条带流式写出（仅支持PNG）"""
+        threshold = self.config.FULL_IMAGE_STREAM_THRESHOLD_PX
+        if threshold is None:
+            return False
+        pixels = self.layout.total_width_px * self.layout.total_height_px
+        if threshold and pixels <= threshold:
+            return False
+        if not output_file.lower().endswith(".png"):
+            print(f"流式导出仅支持PNG，{output_file} 将整图渲染（{pixels} 像素）")
+            return False
+        return True
+
+    def _render_streaming(self, calendar_data: YearCalendarData,
+                          day_map: Dict[Tuple[int, int], CellInfo], output_file: str) -> str:
+        """
+        逐月渲染条带并写入PNG，内存峰值只与单个条带有关
+
+        每个条带为一个月份行加其后的间隔行；格子图像也按月渲染，用完即释放。
+        output_file 为 atomic_output 提供的临时文件，失败时由其删除。
+        """
+        layout = self.layout
+        with open(output_file, "wb") as f:
+            writer = PngStreamWriter(f, layout.total_width_px, layout.total_height_px)
+            for month in range(1, 13):
+                writer.write_band(self.render_month_band(calendar_data, month, day_map))
+            writer.close()
+        return output_file
+
+    def get_month_band_box(self, month: int) -> Tuple[int, int]:
+        """月份条带（月份行 + 其后的间隔行）在整图中的 (顶部y, 底部y)"""
+        row_index = self.layout.get_month_row_index(month)
+        top = self.layout.row_offsets[row_index]
+        return top, top + sum(self.layout.row_heights[row_index:row_index + 2])
+
+    def render_month_band(self, calendar_data: YearCalendarData, month: int,
+                          day_map: Optional[Dict[Tuple[int, int], CellInfo]] = None,
+                          cell_images: Optional[Dict[Tuple[int, int], Image.Image]] = None) -> Image.Image:
+        """
+        绘制一个月份条带，坐标以条带左上角为原点
+
+        Args:
+            calendar_data: 日历数据
+            month: 月份
+            day_map: (月, 日) -> 格子信息（可选）
+            cell_images: 已渲染的格子图像（可选，缺省时只渲染该月格子）
+
+        Returns:
+            Image.Image: RGB条带图像
+        """
+        layout = self.layout
+        day_map = day_map or self._build_day_map(calendar_data)
+        if cell_images is None:
+            cell_images = self._render_cell_images(calendar_data, day_map, months=(month,))
+        row_height = layout.row_heights[layout.get_month_row_index(month)]
+        band_top, band_bottom = self.get_month_band_box(month)
+        band_height = band_bottom - band_top
+        cell_width = layout.day_cell_width_px
+
+        band = Image.new("RGB", (layout.total_width_px, band_height), (255, 255, 255))
+        draw = ImageDraw.Draw(band)
 
         weekend_color = self._hex_to_rgb(self.config.COLOR_WEEKEND_BG)
         weekday_color = self._hex_to_rgb(self.config.COLOR_WEEKDAY_BG)
         border_color = (0, 0, 0)
-
-        y = 0
-        for row_index, row_height in enumerate(row_heights, start=1):
-            is_month_row = row_index % 2 == 1
-            if is_month_row:
-                month = (row_index + 1) // 2
-                days_in_month = calendar_module.monthrange(calendar_data.year, month)[1]
-                for col in range(1, col_count + 1):
-                    x = (col - 1) * self.config.get_day_cell_width_px()
-                    if col <= days_in_month:
-                        cell_info = day_map[(month, col)]
-                        bg_color = weekend_color if cell_info.is_weekend else weekday_color
-                        draw.rectangle([x, y, x + self.config.get_day_cell_width_px(), y + row_height], fill=bg_color)
-                        request = ImageGenerationRequest(
-                            month=month,
-                            day=col,
-                            weekday_char=cell_info.weekday_char,
-                            cell_width_px=self.config.get_day_cell_width_px(),
-                            cell_height_px=row_height,
-                            is_weekend=cell_info.is_weekend,
-                        )
-                        cell_img = self.image_service.create_image(request)
-                        img.paste(cell_img, (x, y), cell_img)
-                    else:
-                        draw.rectangle([x, y, x + self.config.get_day_cell_width_px(), y + row_height], fill=weekday_color)
-
-                    draw.rectangle(
-                        [x, y, x + self.config.get_day_cell_width_px(), y + row_height],
-                        outline=border_color,
-                        width=1,
+        border_width = self._get_border_width()
+
+        days_in_month = calendar_module.monthrange(calendar_data.year, month)[1]
+        # 整行先铺工作日底色，只对周末格子补色
+        draw.rectangle([0, 0, layout.total_width_px, row_height], fill=weekday_color)
+        for col in range(1, days_in_month + 1):
+            if day_map[(month, col)].is_weekend:
+                x = layout.column_offsets[col - 1]
+                draw.rectangle([x, 0, x + cell_width - 1, row_height], fill=weekend_color)
+        for col in range(1, days_in_month + 1):
+            cell_img = cell_images[(month, col)]
+            band.paste(cell_img, (layout.column_offsets[col - 1], 0), cell_img)
+
+        # 格线一次画完：上下两条横线 + 每个格子分界处一条竖线（与逐格描边的结果相同）
+        draw.rectangle([0, 0, layout.total_width_px, border_width - 1], fill=border_color)
+        draw.rectangle([0, row_height - border_width + 1, layout.total_width_px, row_height], fill=border_color)
+        for boundary in layout.column_offsets + (layout.total_width_px,):
+            draw.rectangle([boundary - border_width + 1, 0, boundary + border_width - 1, row_height],
+                           fill=border_color)
+        return band
+
+    def _get_border_width(self) -> int:
+        """格子边框宽度（随整图倍率加粗）"""
+        return max(1, int(round(self.config.FULL_IMAGE_SCALE)))
+
+    def build_year_svg(self, calendar_data: YearCalendarData,
+                       day_map: Dict[Tuple[int, int], CellInfo] = None,
+                       layout: Optional[ResolvedLayout] = None, border_width: Optional[float] = None) -> str:
+        """
+        生成整年日历的单个SVG文档（背景、格子内容与边框）
+
+        Args:
+            calendar_data: 日历数据
+            day_map: (月, 日) -> 格子信息（可选）
+            layout: 使用的布局（可选，默认为整图布局；PDF等矢量输出传入原始倍率布局）
+            border_width: 边框宽度（可选，默认随整图倍率）
+
+        Returns:
+            str: SVG文档文本
+        """
+        day_map = day_map or self._build_day_map(calendar_data)
+        layout = layout or self.layout
+        cell_width = layout.day_cell_width_px
+        total_width = layout.total_width_px
+        total_height = layout.total_height_px
+
+        weekend_color = "#" + self._hex_to_svg(self.config.COLOR_WEEKEND_BG)
+        weekday_color = "#" + self._hex_to_svg(self.config.COLOR_WEEKDAY_BG)
+        border_width = border_width or self._get_border_width()
+
+        parts = [f'<rect x="0" y="0" width="{total_width}" height="{total_height}" fill="#FFFFFF" />']
+        for month in range(1, 13):
+            row_index = layout.get_month_row_index(month)
+            y = layout.row_offsets[row_index]
+            row_height = layout.row_heights[row_index]
+            for col in range(1, layout.column_count + 1):
+                x = layout.column_offsets[col - 1]
+                cell_info = day_map.get((month, col))
+                bg_color = weekend_color if cell_info and cell_info.is_weekend else weekday_color
+                parts.append(f'<rect x="{x}" y="{y}" width="{cell_width}" height="{row_height}" fill="{bg_color}" />')
+                if cell_info:
+                    request = ImageGenerationRequest(
+                        month=month,
+                        day=col,
+                        weekday_char=cell_info.weekday_char,
+                        cell_width_px=cell_width,
+                        cell_height_px=row_height,
+                        is_weekend=cell_info.is_weekend,
                     )
-            y += row_height
-
-        img.save(output_file)
-        return output_file
+                    fragment = self.image_service.build_svg_fragment(request)
+                    parts.append(f'<g transform="translate({x},{y})">\n{fragment}\n</g>')
+                parts.append(
+                    f'<rect x="{x + border_width / 2}" y="{y + border_width / 2}" width="{cell_width}" height="{row_height}" '
+                    f'fill="none" stroke="#000000" stroke-width="{border_width}" />'
+                )
+
+        return self.image_service.build_svg_document(total_width, total_height, "\n".join(parts))
+
+    def _render_svg_year_image(self, calendar_data: YearCalendarData,
+                               day_map: Dict[Tuple[int, int], CellInfo]) -> Image.Image:
+        """整年只生成一个SVG文档并栅格化一次"""
+        svg = self.build_year_svg(calendar_data, day_map)
+        return self.image_service.rasterize_svg(
+            svg, self.layout.total_width_px, self.layout.total_height_px
+        ).convert("RGB")
+
+    def _render_cell_images(self, calendar_data: YearCalendarData,
+                            day_map: Dict[Tuple[int, int], CellInfo],
+                            months: Optional[Iterable[int]] = None) -> Dict[Tuple[int, int], Image.Image]:
+        """批量渲染日期格子图像（可并行，可只渲染指定月份）"""
+        months = set(months) if months is not None else None
+        keys = []
+        requests = []
+        for (month, day), cell_info in day_map.items():
+            if months is not None and month not in months:
+                continue
+            keys.append((month, day))
+            requests.append(ImageGenerationRequest(
+                month=month,
+                day=day,
+                weekday_char=cell_info.weekday_char,
+                cell_width_px=self.layout.day_cell_width_px,
+                cell_height_px=self.layout.row_heights[self.layout.get_month_row_index(month)],
+                is_weekend=cell_info.is_weekend,
+            ))
+        return dict(zip(keys, self.render_pool.render_images(requests)))
 
     def _build_day_map(self, calendar_data: YearCalendarData) -> Dict[Tuple[int, int], CellInfo]:
         day_map = {}
@@ -78,15 +238,9 @@ class FullImageExporter:
                     day_map[(cell.month, cell.day)] = cell
         return day_map
 
-    def _get_row_heights(self) -> List[int]:
-        row_height = self.config.get_day_cell_height_px()
-        spacer_height = int(round(row_height * self.config.MONTH_SPACER_HEIGHT_RATIO))
-        heights = []
-        for month in range(1, 13):
-            heights.append(row_height)
-            if month < 12:
-                heights.append(spacer_height)
-        return heights
+    @staticmethod
+    def _hex_to_svg(argb: str) -> str:
+        return argb[2:] if len(argb) == 8 else argb
 
     @staticmethod
     def _hex_to_rgb(argb: str) -> Tuple[int, int, int]:
@@ -0,0 +1,234 @@
+"""
+布局解析服务 - 由配置一次性计算出不可变的 ResolvedLayout
+"""
+
+import os
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from calendar_app.config.calendar_config import CalendarConfig
+from calendar_app.models.calendar_models import CellGeometry, ResolvedLayout
+from calendar_app.services.font_manager import get_font_manager
+
+
+# 进程内已解析的布局，键为 (配置指纹, 像素倍率)
+_layouts: Dict[Tuple[str, float], ResolvedLayout] = {}
+_layouts_lock = threading.Lock()
+
+
+def resolve_font_path(config: CalendarConfig = CalendarConfig) -> Optional[str]:
+    """选择可用字体路径"""
+    paths = [config.FONT_PATH] + list(config.FONT_FALLBACK_PATHS)
+    for path in paths:
+        if path and os.path.exists(path):
+            return path
+    return None
+
+
+def resolve_cell_geometry(config: CalendarConfig, width: int, height: int,
+                          font_path: Optional[str] = None, font_index: int = 0) -> CellGeometry:
+    """
+    计算单个格子尺寸下的全部几何与拟合字号
+
+    Args:
+        config: 配置对象
+        width: 格子宽度（像素）
+        height: 格子高度（像素）
+        font_path: 字体文件（为空时不拟合字号）
+        font_index: 字体索引
+
+    Returns:
+        CellGeometry: 格子几何
+    """
+    short_side = min(width, height)
+    cell_area = width * height
+
+    # 日期数字
+    margin = int(short_side * config.CONTENT_MARGIN_RATIO)
+    date_max_width = max(1, int(width * config.DATE_AREA_WIDTH_RATIO) - margin)
+    date_max_height = max(1, int(height * config.DATE_AREA_HEIGHT_RATIO) - margin)
+    date_target_area = min(cell_area * config.DATE_TEXT_AREA_RATIO, date_max_width * date_max_height)
+
+    # 周几三角形
+    triangle_width = int(width * config.WEEKDAY_AREA_WIDTH_RATIO * config.TRIANGLE_WIDTH_RATIO)
+    triangle_height = int(height * config.WEEKDAY_AREA_HEIGHT_RATIO * config.TRIANGLE_HEIGHT_RATIO)
+    triangle_margin = int(short_side * config.TRIANGLE_MARGIN_RATIO)
+    triangle_right = width - triangle_margin
+    triangle_left = triangle_right - triangle_width
+    triangle_bottom = height - triangle_margin
+    triangle_top = triangle_bottom - triangle_height
+
+    inner_margin = max(1, int(short_side * config.CONTENT_MARGIN_RATIO * 0.6))
+    weekday_max_width = int(max(1, triangle_right - triangle_left) * config.WEEKDAY_TRIANGLE_TEXT_WIDTH_RATIO)
+    weekday_max_height = int(max(1, triangle_bottom - triangle_top) * config.WEEKDAY_TRIANGLE_TEXT_HEIGHT_RATIO)
+    weekday_max_width = max(1, weekday_max_width - inner_margin * 2)
+    weekday_max_height = max(1, weekday_max_height - inner_margin * 2)
+    weekday_target_area = min(cell_area * config.WEEKDAY_TEXT_AREA_RATIO, weekday_max_width * weekday_max_height)
+    weekday_offset = int((triangle_bottom - triangle_top) * 0.38)
+
+    # 月份标签
+    month_font_size = config.get_month_label_font_size(height)
+    month_english_font_size = max(6, int(month_font_size * config.MONTH_LABEL_ENGLISH_SIZE_RATIO))
+
+    date_font_sizes = ()
+    weekday_font_sizes = ()
+    if font_path:
+        font_manager = get_font_manager(config.FONT_CACHE_SIZE)
+        date_font_sizes = tuple(
+            font_manager.fit_font_size(font_path, str(day), date_max_width, date_max_height,
+                                       date_target_area, font_index)
+            for day in range(1, config.DAYS_PER_MONTH_MAX + 1)
+        )
+        weekday_font_sizes = tuple(
+            font_manager.fit_font_size(font_path, name, weekday_max_width, weekday_max_height,
+                                       weekday_target_area, font_index)
+            for name in config.WEEKDAY_NAMES
+        )
+
+    # 矢量坐标不取整
+    vector_margin = short_side * config.CONTENT_MARGIN_RATIO
+    vector_triangle_margin = short_side * config.TRIANGLE_MARGIN_RATIO
+    vector_triangle_right = width - vector_triangle_margin
+    vector_triangle_bottom = height - vector_triangle_margin
+
+    return CellGeometry(
+        width=width,
+        height=height,
+        margin=margin,
+        date_anchor=(width - margin, margin),
+        date_box=(date_max_width, date_max_height),
+        date_target_area=date_target_area,
+        triangle=(triangle_left, triangle_right, triangle_top, triangle_bottom),
+        triangle_vertices=(
+            (triangle_right, triangle_bottom),
+            (triangle_left, triangle_bottom),
+            (triangle_right, triangle_top),
+        ),
+        weekday_anchor=(triangle_right - weekday_offset, triangle_bottom - weekday_offset),
+        weekday_box=(weekday_max_width, weekday_max_height),
+        weekday_target_area=weekday_target_area,
+        month_anchor=(margin, margin),
+        month_english_anchor=(margin, margin + int(month_font_size * 1.05)),
+        month_font_size=month_font_size,
+        month_english_font_size=month_english_font_size,
+        date_font_sizes=date_font_sizes,
+        weekday_font_sizes=weekday_font_sizes,
+        vector_margin=vector_margin,
+        vector_date_center=(
+            width - width * config.DATE_AREA_WIDTH_RATIO / 2,
+            height * config.DATE_AREA_HEIGHT_RATIO / 2,
+        ),
+        vector_triangle=(
+            vector_triangle_right - width * config.WEEKDAY_AREA_WIDTH_RATIO * config.TRIANGLE_WIDTH_RATIO,
+            vector_triangle_right,
+            vector_triangle_bottom - height * config.WEEKDAY_AREA_HEIGHT_RATIO * config.TRIANGLE_HEIGHT_RATIO,
+            vector_triangle_bottom,
+        ),
+        vector_date_font_size=config.get_date_font_size(height),
+        vector_weekday_font_size=config.get_weekday_font_size(height),
+    )
+
+
+def _get_row_heights(cell_height_px: int, spacer_height_px: int) -> Tuple[int, ...]:
+    heights = []
+    for month in range(1, 13):
+        heights.append(cell_height_px)
+        if month < 12:
+            heights.append(spacer_height_px)
+    return tuple(heights)
+
+
+def _offsets(sizes: Iterable[int]) -> Tuple[int, ...]:
+    offsets = []
+    position = 0
+    for size in sizes:
+        offsets.append(position)
+        position += size
+    return tuple(offsets)
+
+
+def build_layout(config: CalendarConfig = CalendarConfig, pixel_scale: float = 1) -> ResolvedLayout:
+    """
+    由配置计算完整布局（不使用缓存）
+
+    Args:
+        config: 配置对象
+        pixel_scale: 格子像素倍率（整年大图按 FULL_IMAGE_SCALE 放大时使用）
+
+    Returns:
+        ResolvedLayout: 解析后的布局
+    """
+    cell_width = int(round(config.get_day_cell_width_px() * pixel_scale))
+    cell_height = int(round(config.get_day_cell_height_px() * pixel_scale))
+    spacer_height = int(round(cell_height * config.MONTH_SPACER_HEIGHT_RATIO))
+    row_heights = _get_row_heights(cell_height, spacer_height)
+    column_count = config.DAYS_PER_MONTH_MAX
+
+    image_scale = config.get_cell_image_scale()
+    image_size = (int(round(cell_width * image_scale)), int(round(cell_height * image_scale)))
+
+    render_scale = max(1, int(config.RENDER_SCALE))
+    # svg / pil 引擎整格一起超采样，只有图层合成引擎能单独关闭文字超采样
+    if not config.SUPERSAMPLE_TEXT and config.RENDER_ENGINE != "composite":
+        raise ValueError(f"SUPERSAMPLE_TEXT=False 仅支持 composite 渲染引擎（当前为 {config.RENDER_ENGINE}）")
+    text_scale = render_scale if config.SUPERSAMPLE_TEXT else 1
+
+    font_path = resolve_font_path(config)
+    font_index = int(getattr(config, "FONT_INDEX", 0))
+
+    # 预先解析用到的尺寸：页面格子与Excel嵌入图像（放大的整图布局只需格子），各自的原始与超采样画布
+    base_sizes = [(cell_width, cell_height)]
+    if pixel_scale == 1:
+        base_sizes.append(image_size)
+    sizes = []
+    for base_width, base_height in base_sizes:
+        for scale in sorted({1, render_scale}):
+            size = (base_width * scale, base_height * scale)
+            if size not in sizes:
+                sizes.append(size)
+    cells = tuple(
+        resolve_cell_geometry(config, width, height, font_path, font_index)
+        for width, height in sizes
+    )
+
+    return ResolvedLayout(
+        day_cell_width_px=cell_width,
+        day_cell_height_px=cell_height,
+        spacer_height_px=spacer_height,
+        column_count=column_count,
+        row_heights=row_heights,
+        row_offsets=_offsets(row_heights),
+        column_offsets=_offsets([cell_width] * column_count),
+        total_width_px=cell_width * column_count,
+        total_height_px=sum(row_heights),
+        date_column_width=config.get_date_column_width(),
+        row_height_points=config.get_row_height_points(),
+        spacer_height_points=config.get_row_height_points() * config.MONTH_SPACER_HEIGHT_RATIO,
+        cell_image_scale=image_scale,
+        cell_image_size=image_size,
+        render_scale=render_scale,
+        text_scale=text_scale,
+        font_path=font_path,
+        font_index=font_index,
+        cells=cells,
+    )
+
+
+def resolve_layout(config: CalendarConfig = CalendarConfig, pixel_scale: float = 1) -> ResolvedLayout:
+    """
+    获取配置对应的布局（每个进程每份配置、每种倍率只计算一次）
+
+    Args:
+        config: 配置对象
+        pixel_scale: 格子像素倍率
+
+    Returns:
+        ResolvedLayout: 解析后的布局
+    """
+    key = (config.fingerprint(), float(pixel_scale))
+    with _layouts_lock:
+        layout = _layouts.get(key)
+        if layout is None:
+            layout = build_layout(config, pixel_scale)
+            _layouts[key] = layout
+        return layout
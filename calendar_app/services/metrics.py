@@ -0,0 +1,263 @@
+"""
+运行指标服务 - 阶段耗时、格子渲染延迟分布、缓存命中率与内存峰值
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # 非POSIX平台：不统计RSS峰值
+    resource = None
+
+
+# 延迟直方图桶上界（毫秒），最后一个桶收纳更慢的样本
+LATENCY_BUCKETS_MS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def get_peak_rss_bytes() -> Optional[int]:
+    """当前进程的RSS峰值（字节，进程生命周期内的最大值）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以KB为单位，macOS 以字节为单位
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def counter_delta(before, after) -> Dict[str, float]:
+    """
+    两次计数快照之差（数据类或字典），并为每组 xxx_hits / xxx_misses 补充 xxx_hit_rate
+
+    Args:
+        before: 运行前的计数
+        after: 运行后的计数
+
+    Returns:
+        Dict[str, float]: 差值与命中率
+    """
+    before = before if isinstance(before, dict) else asdict(before)
+    after = after if isinstance(after, dict) else asdict(after)
+    delta = {name: value - before.get(name, 0) for name, value in after.items()}
+    for name in list(delta):
+        if name.endswith("hits"):
+            prefix = name[:-len("hits")]
+            total = delta[name] + delta.get(prefix + "misses", 0)
+            delta[prefix + "hit_rate"] = delta[name] / total if total else 0.0
+    return delta
+
+
+@dataclass
+class LatencyHistogram:
+    """延迟直方图（按 LATENCY_BUCKETS_MS 分桶，另记总数、总和与最值）"""
+
+    counts: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1))
+    count: int = 0  # 样本数
+    total: float = 0.0  # 总耗时（秒）
+    min: Optional[float] = None  # 最小耗时（秒）
+    max: Optional[float] = None  # 最大耗时（秒）
+
+    def record(self, seconds: float):
+        """记录一个样本"""
+        milliseconds = seconds * 1000
+        index = len(LATENCY_BUCKETS_MS)
+        for position, bound in enumerate(LATENCY_BUCKETS_MS):
+            if milliseconds <= bound:
+                index = position
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def merge(self, other: "LatencyHistogram"):
+        """合并另一个直方图（如工作进程返回的结果）"""
+        for index, value in enumerate(other.counts):
+            self.counts[index] += value
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    @property
+    def mean(self) -> float:
+        """平均耗时（秒）"""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """
+        估算分位数（取样本所在桶的上界，最后一个桶取最大值）
+
+        Args:
+            fraction: 分位（0-1）
+
+        Returns:
+            Optional[float]: 耗时（秒），无样本时为None
+        """
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for index, value in enumerate(self.counts):
+            seen += value
+            if value and seen >= target:
+                if index < len(LATENCY_BUCKETS_MS):
+                    return min(LATENCY_BUCKETS_MS[index] / 1000, self.max)
+                return self.max
+        return self.max
+
+    def as_dict(self) -> dict:
+        """转换为字典（便于打印和序列化）"""
+        labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "total_s": self.total,
+            "mean_ms": self.mean * 1000,
+            "min_ms": None if self.min is None else self.min * 1000,
+            "max_ms": None if self.max is None else self.max * 1000,
+            "p50_ms": self._to_ms(self.percentile(0.5)),
+            "p95_ms": self._to_ms(self.percentile(0.95)),
+            "buckets": {label: value for label, value in zip(labels, self.counts) if value},
+        }
+
+    @staticmethod
+    def _to_ms(seconds: Optional[float]) -> Optional[float]:
+        return None if seconds is None else seconds * 1000
+
+
+@dataclass
+class StageMetrics:
+    """单个阶段的耗时"""
+
+    name: str  # 阶段名
+    wall: float = 0.0  # 墙钟时间（秒）
+    cpu: float = 0.0  # 本进程CPU时间（秒，不含渲染工作进程）
+
+
+@dataclass
+class RunMetrics:
+    """一次生成的运行指标"""
+
+    year: Optional[int] = None  # 年份
+    format: str = "xlsx"  # 输出格式
+    output_file: Optional[str] = None  # 输出文件
+    status: str = "pending"  # rendered / cached / skipped / failed
+    error: Optional[str] = None  # 失败原因（异常类型与信息）
+    started_at: float = 0.0  # 开始时间（Unix时间戳）
+    wall: float = 0.0  # 总墙钟时间（秒）
+    cpu: float = 0.0  # 本进程总CPU时间（秒）
+    stages: List[StageMetrics] = field(default_factory=list)  # 各阶段耗时（按执行顺序）
+    cell_latency: LatencyHistogram = field(default_factory=LatencyHistogram)  # 格子渲染延迟（缓存未命中的格子）
+    render_cache: Dict[str, float] = field(default_factory=dict)  # 渲染缓存命中统计（本次运行）
+    font_cache: Dict[str, float] = field(default_factory=dict)  # 字体缓存命中统计（本进程本次运行）
+    peak_rss_bytes: Optional[int] = None  # 进程RSS峰值（进程生命周期内）
+    traced_peak_bytes: Optional[int] = None  # tracemalloc 统计的Python分配峰值（未启用时为None）
+
+    @property
+    def success(self) -> bool:
+        """是否成功（含复用缓存与跳过）"""
+        return self.status in ("rendered", "cached", "skipped")
+
+    def get_stage(self, name: str) -> Optional[StageMetrics]:
+        """按名称查找阶段"""
+        for stage in self.stages:
+            if stage.name == name:
+                return stage
+        return None
+
+    def as_dict(self) -> dict:
+        """转换为字典（便于打印和序列化）"""
+        return {
+            "year": self.year,
+            "format": self.format,
+            "output_file": self.output_file,
+            "status": self.status,
+            "error": self.error,
+            "started_at": self.started_at,
+            "wall_s": self.wall,
+            "cpu_s": self.cpu,
+            "stages": [
+                {"name": stage.name, "wall_s": stage.wall, "cpu_s": stage.cpu}
+                for stage in self.stages
+            ],
+            "cell_latency": self.cell_latency.as_dict(),
+            "render_cache": self.render_cache,
+            "font_cache": self.font_cache,
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "traced_peak_bytes": self.traced_peak_bytes,
+        }
+
+    def write_jsonl(self, path: str):
+        """以一行JSON追加写入文件"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.as_dict(), ensure_ascii=False, sort_keys=True) + "\n")
+
+
+class MetricsRecorder:
+    """
+    运行指标记录器
+
+    用法：start() 后以 stage(name) 包住各阶段，最后 finish() 汇总内存峰值与总耗时。
+    """
+
+    def __init__(self, metrics: RunMetrics, trace_memory: bool = False):
+        """
+        初始化记录器
+
+        Args:
+            metrics: 写入的指标对象
+            trace_memory: 是否启用 tracemalloc（有一定开销，默认关闭）
+        """
+        self.metrics = metrics
+        self.trace_memory = trace_memory
+        self._started_tracing = False
+        self._wall_start = 0.0
+        self._cpu_start = 0.0
+
+    def start(self):
+        """开始计时（启用内存跟踪时同时开始 tracemalloc）"""
+        self.metrics.started_at = time.time()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        if self.trace_memory:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                self._started_tracing = True
+
+    @contextmanager
+    def stage(self, name: str):
+        """记录一个阶段的墙钟时间与CPU时间（异常时也会记录）"""
+        stage = StageMetrics(name)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield stage
+        finally:
+            stage.wall = time.perf_counter() - wall_start
+            stage.cpu = time.process_time() - cpu_start
+            self.metrics.stages.append(stage)
+
+    def finish(self) -> RunMetrics:
+        """结束计时并汇总内存峰值"""
+        self.metrics.wall = time.perf_counter() - self._wall_start
+        self.metrics.cpu = time.process_time() - self._cpu_start
+        self.metrics.peak_rss_bytes = get_peak_rss_bytes()
+        if self.trace_memory and tracemalloc.is_tracing():
+            self.metrics.traced_peak_bytes = tracemalloc.get_traced_memory()[1]
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+        return self.metrics
@@ -0,0 +1,23 @@
+"""
+可选依赖按需加载 - 只在实际选用对应后端时才导入，缩短启动时间
+"""
+
+import functools
+
+
+@functools.lru_cache(maxsize=None)
+def load_cairosvg():
+    """
+    导入 cairosvg（每个进程只尝试一次）
+
+    cairosvg 会连带加载 cairocffi 与 cairo 动态库，导入耗时明显，
+    因此只在 SVG 渲染引擎或 PDF 导出实际用到时才调用。
+
+    Returns:
+        module: cairosvg 模块；未安装或缺少 cairo 动态库时为 None
+    """
+    try:
+        import cairosvg
+    except Exception:
+        return None
+    return cairosvg
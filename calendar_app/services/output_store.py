@@ -0,0 +1,133 @@
+"""
+成品缓存服务 - 按年份类别复用已生成的 xlsx / png / pdf 文件
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+from calendar_app.config.calendar_config import CalendarConfig
+from calendar_app.config.config_dependencies import get_output_fingerprint
+from calendar_app.models.calendar_models import YearClass
+from calendar_app.services.file_manager import atomic_output
+from calendar_app.services.render_cache import code_fingerprint, font_content_hash
+
+
+STORE_VERSION = 1  # 成品缓存格式版本（缓存布局变化时递增）
+
+
+def get_output_key(kind: str, config: CalendarConfig = CalendarConfig) -> str:
+    """
+    计算成品缓存键（OutputStore 与 HTTP 响应缓存共用）
+
+    只按该格式实际依赖的配置项区分，改动无关配置（如并发数、文件名模式）不会使缓存失效；
+    同时包含字体文件内容与程序代码指纹，替换同路径字体或升级代码后不会复用旧成品。
+
+    Args:
+        kind: 成品类型（xlsx / png / pdf）
+        config: 配置对象
+
+    Returns:
+        str: 16位十六进制摘要
+    """
+    font_paths = [config.FONT_PATH] + list(config.FONT_FALLBACK_PATHS)
+    font_path = next((path for path in font_paths if path and os.path.exists(path)), None)
+    payload = json.dumps({
+        "version": STORE_VERSION,
+        "config": get_output_fingerprint(kind, config),
+        "font": font_content_hash(font_path),
+        "code": code_fingerprint(),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class OutputStore:
+    """成品缓存：同一配置下，同类年份（共14种）只需生成一次"""
+
+    SUPPORTED_KINDS = ("xlsx", "png", "pdf")  # 单文件成品（瓦片目录等不缓存）
+
+    def __init__(self, config: CalendarConfig = CalendarConfig):
+        self.config = config
+        self.root = None
+        if config.CACHE_DIR:
+            self.root = os.path.join(config.CACHE_DIR, "outputs")
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用磁盘缓存"""
+        return self.root is not None
+
+    def get_path(self, year_class: YearClass, kind: str) -> Optional[str]:
+        """
+        获取缓存文件路径
+
+        Args:
+            year_class: 年份类别
+            kind: 成品类型（xlsx / png / pdf）
+
+        Returns:
+            Optional[str]: 缓存路径（未启用时为None）
+        """
+        if not self.enabled or kind not in self.SUPPORTED_KINDS:
+            return None
+        return os.path.join(self.root, get_output_key(kind, self.config), f"{year_class.key}.{kind}")
+
+    def load(self, year_class: YearClass, kind: str) -> Optional[bytes]:
+        """读取缓存内容，未命中时返回None"""
+        path = self.get_path(year_class, kind)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def restore(self, year_class: YearClass, kind: str, output_file: str) -> bool:
+        """
+        将缓存内容复制到输出文件
+
+        Returns:
+            bool: 是否命中缓存
+        """
+        path = self.get_path(year_class, kind)
+        if not path or not os.path.exists(path):
+            return False
+        try:
+            with atomic_output(output_file) as tmp_path:
+                shutil.copyfile(path, tmp_path)
+            return True
+        except OSError as e:
+            print(f"读取缓存失败: {e}")
+            return False
+
+    def save(self, year_class: YearClass, kind: str, data: bytes) -> bool:
+        """写入缓存内容（先写临时文件再原子替换，避免并发读到半个文件）"""
+        path = self.get_path(year_class, kind)
+        if not path:
+            return False
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            return True
+        except OSError as e:
+            print(f"写入缓存失败: {e}")
+            return False
+
+    def save_file(self, year_class: YearClass, kind: str, source_file: str) -> bool:
+        """将已生成的输出文件写入缓存"""
+        if not self.get_path(year_class, kind):
+            return False
+        with open(source_file, "rb") as f:
+            return self.save(year_class, kind, f.read())
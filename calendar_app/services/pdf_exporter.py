@@ -0,0 +1,107 @@
+"""
+PDF导出服务 - 整年日历排在一页纸上，输出矢量文字、三角形与矩形
+"""
+
+from typing import Optional, Tuple
+
+from calendar_app.config.calendar_config import CalendarConfig
+from calendar_app.models.calendar_models import YearCalendarData
+from calendar_app.services.file_manager import atomic_output
+from calendar_app.services.full_image_exporter import FullImageExporter
+from calendar_app.services.optional_imports import load_cairosvg
+from calendar_app.services.render_pool import RenderPool
+
+
+class PdfExporter:
+    """
+    矢量PDF导出服务
+
+    复用整年SVG文档（与 SVG 渲染引擎同一套格子几何），缩放后居中放到
+    PAPER_SIZE / ORIENTATION 指定的页面上，再由 cairosvg 一次转换为PDF。
+    文字保持为文字，字体由 cairo 按实际用到的字形子集嵌入。
+    """
+
+    def __init__(self, config: CalendarConfig = CalendarConfig,
+                 render_pool: Optional[RenderPool] = None, workers: Optional[int] = None,
+                 image_exporter: Optional[FullImageExporter] = None):
+        """
+        初始化导出服务
+
+        Args:
+            config: 配置对象
+            render_pool: 共享的渲染池（可选）
+            workers: 渲染进程数（可选）
+            image_exporter: 共享的大图导出服务（可选，用于生成整年SVG）
+        """
+        self.config = config
+        self.image_exporter = image_exporter or FullImageExporter(config, render_pool, workers)
+        # 矢量输出与整图放大倍率无关，使用原始倍率布局
+        self.layout = self.image_exporter.render_pool.layout
+
+    @staticmethod
+    def is_available() -> bool:
+        """是否可以导出PDF（需要 cairosvg 及 cairo 动态库）"""
+        return load_cairosvg() is not None
+
+    def export(self, calendar_data: YearCalendarData, output_file: str) -> str:
+        """
+        导出单页PDF
+
+        Args:
+            calendar_data: 日历数据
+            output_file: PDF文件路径
+
+        Returns:
+            str: PDF文件路径
+        """
+        if not self.is_available():
+            raise RuntimeError("导出PDF需要 cairosvg（及系统 cairo 库）")
+        svg = self.build_page_svg(calendar_data)
+        with atomic_output(output_file) as tmp_path:
+            load_cairosvg().svg2pdf(bytestring=svg.encode("utf-8"), write_to=tmp_path)
+        return output_file
+
+    def build_page_svg(self, calendar_data: YearCalendarData) -> str:
+        """
+        生成整页SVG（单位为毫米，日历按比例缩放后在页边距内居中）
+
+        Args:
+            calendar_data: 日历数据
+
+        Returns:
+            str: SVG文档文本
+        """
+        page_width, page_height = self.config.get_page_size_mm()
+        left, top, width, height = self.get_content_box_mm()
+        total_width = self.layout.total_width_px
+        total_height = self.layout.total_height_px
+        scale = min(width / total_width, height / total_height)
+        offset_x = left + (width - total_width * scale) / 2
+        offset_y = top + (height - total_height * scale) / 2
+
+        year_svg = self.image_exporter.build_year_svg(calendar_data, layout=self.layout, border_width=1)
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{page_width}mm" height="{page_height}mm" '
+            f'viewBox="0 0 {page_width} {page_height}">\n'
+            f'<g transform="translate({offset_x:.4f},{offset_y:.4f}) scale({scale:.6f})">\n'
+            f'{self._strip_svg_root(year_svg)}\n'
+            '</g>\n</svg>'
+        )
+
+    def get_content_box_mm(self) -> Tuple[float, float, float, float]:
+        """页边距以内的可用区域 (左, 上, 宽, 高)，单位毫米"""
+        page_width, page_height = self.config.get_page_size_mm()
+        left = self.config.MARGIN_LEFT * 10
+        top = self.config.MARGIN_TOP * 10
+        width = page_width - left - self.config.MARGIN_RIGHT * 10
+        height = page_height - top - self.config.MARGIN_BOTTOM * 10
+        if width <= 0 or height <= 0:
+            raise ValueError("页边距超过纸张大小")
+        return left, top, width, height
+
+    @staticmethod
+    def _strip_svg_root(svg: str) -> str:
+        """去掉 <svg> 根元素，只保留内部元素"""
+        start = svg.index(">", svg.index("<svg")) + 1
+        end = svg.rindex("</svg>")
+        return svg[start:end].strip("\n")
@@ -0,0 +1,90 @@
+"""
+PNG编码服务 - 格子图像编码档位（无损RGBA / 调色板量化）与体积统计
+"""
+
+import io
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from PIL import Image
+
+
+# 编码档位：colors 为调色板颜色数（None 为保持RGBA），其余参数传给 Image.save
+PNG_PROFILES: Dict[str, Dict] = {
+    "default": {"colors": None},  # RGBA + zlib 默认级别，像素无损
+    "fast": {"colors": 256, "compress_level": 1},  # 调色板 + tRNS，最快的 zlib 级别
+    "small": {"colors": 256, "optimize": True},  # 调色板 + tRNS，zlib 9 并搜索最优压缩
+}
+
+
+def get_png_profile(name: str) -> Dict:
+    """获取编码档位参数"""
+    if name not in PNG_PROFILES:
+        raise ValueError(f"未知的PNG编码档位: {name}（可选 {', '.join(PNG_PROFILES)}）")
+    return PNG_PROFILES[name]
+
+
+def encode_png(img: Image.Image, profile: str = "default") -> bytes:
+    """
+    将图像编码为PNG字节
+
+    调色板档位把RGBA图像量化为最多256色的索引图（透明度写入 tRNS 块）。
+    格子图像只有文字黑、三角形黑、白色周几与各级抗锯齿透明度，量化误差很小。
+
+    Args:
+        img: 图像
+        profile: 编码档位（default / fast / small）
+
+    Returns:
+        bytes: PNG字节
+    """
+    options = dict(get_png_profile(profile))
+    colors = options.pop("colors")
+    if colors and img.mode == "RGBA":
+        img = img.quantize(colors, method=Image.Quantize.FASTOCTREE)
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG", **options)
+    return buffer.getvalue()
+
+
+@dataclass
+class PngEncodeStats:
+    """PNG编码体积统计（节省量只对已知 default 档位大小的图像，相对其RGBA PNG计算；原始像素按每像素4字节计）"""
+
+    images: int = 0  # 编码的图像数
+    raw_bytes: int = 0  # 原始RGBA像素字节数
+    encoded_bytes: int = 0  # 实际档位编码后字节数
+    baseline_images: int = 0  # 已知 default 档位大小的图像数
+    baseline_bytes: int = 0  # 这些图像 default 档位编码后字节数
+    compared_bytes: int = 0  # 这些图像实际档位编码后字节数
+
+    @property
+    def saved_bytes(self) -> int:
+        """相对 default 档位节省的字节数"""
+        return self.baseline_bytes - self.compared_bytes
+
+    @property
+    def ratio(self) -> float:
+        """编码后大小占 default 档位大小的比例"""
+        return self.compared_bytes / self.baseline_bytes if self.baseline_bytes else 0.0
+
+    def add(self, sizes: Iterable[tuple], encoded: Iterable[bytes],
+            baseline_sizes: Optional[Iterable[Optional[int]]] = None):
+        """
+        累加一批编码结果
+
+        Args:
+            sizes: 各图像 (宽, 高)
+            encoded: 各图像PNG字节
+            baseline_sizes: 各图像 default 档位PNG大小（未统计时为None，单个图像未知时为None）
+        """
+        encoded = list(encoded)
+        baseline_sizes = [None] * len(encoded) if baseline_sizes is None else list(baseline_sizes)
+        for (width, height), data, baseline_size in zip(sizes, encoded, baseline_sizes):
+            self.images += 1
+            self.raw_bytes += width * height * 4
+            self.encoded_bytes += len(data)
+            if baseline_size is not None:
+                self.baseline_images += 1
+                self.baseline_bytes += baseline_size
+                self.compared_bytes += len(data)
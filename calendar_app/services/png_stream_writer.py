@@ -0,0 +1,125 @@
+"""
+PNG流式写出 - 按条带逐段编码，内存只占用一个条带
+"""
+
+import struct
+import zlib
+from typing import BinaryIO, Optional
+
+from PIL import Image, ImageChops
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_FILTER_UP = 2  # 每行减去上一行，纯色区域与横向格线压缩效果好
+IDAT_CHUNK_BYTES = 1 << 20  # 压缩数据攒满该大小后写出一个 IDAT 块
+FILTER_BLOCK_ROWS = 64  # 条带内每次滤波、压缩的行数（限制中间缓冲区大小）
+
+
+class PngStreamWriter:
+    """
+    增量PNG编码器（8位RGB）
+
+    先写文件头，再按从上到下的顺序写入若干条带，最后写 IEND。
+    每个条带用 Up 滤波后送入同一个 zlib 压缩流，压缩结果分块写成 IDAT。
+    """
+
+    def __init__(self, stream: BinaryIO, width: int, height: int, compress_level: int = 6):
+        """
+        初始化编码器并写出文件头
+
+        Args:
+            stream: 可写的二进制文件对象
+            width: 图像宽度
+            height: 图像总高度
+            compress_level: zlib 压缩级别（0-9）
+        """
+        self.stream = stream
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self._compressor = zlib.compressobj(compress_level)
+        self._pending = []
+        self._pending_bytes = 0
+        self._previous_row: Optional[Image.Image] = None
+        self._closed = False
+
+        self.stream.write(PNG_SIGNATURE)
+        # 位深8、颜色类型2（RGB）、压缩0、滤波0、不隔行
+        self._write_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def write_band(self, band: Image.Image):
+        """
+        写入一个条带（宽度须与图像一致）
+
+        Args:
+            band: RGB图像
+        """
+        if self._closed:
+            raise ValueError("PNG已写完")
+        if band.mode != "RGB":
+            band = band.convert("RGB")
+        if band.width != self.width:
+            raise ValueError(f"条带宽度 {band.width} 与图像宽度 {self.width} 不一致")
+        if self.rows_written + band.height > self.height:
+            raise ValueError("写入行数超过图像高度")
+        for top in range(0, band.height, FILTER_BLOCK_ROWS):
+            bottom = min(band.height, top + FILTER_BLOCK_ROWS)
+            self._write_rows(band.crop((0, top, self.width, bottom)))
+
+    def _write_rows(self, block: Image.Image):
+        # Up 滤波：当前行 - 上一行（逐字节模256）；首行的上一行视为全0
+        above = Image.new("RGB", block.size, (0, 0, 0))
+        if self._previous_row is not None:
+            above.paste(self._previous_row, (0, 0))
+        if block.height > 1:
+            above.paste(block.crop((0, 0, self.width, block.height - 1)), (0, 1))
+        filtered = ImageChops.subtract_modulo(block, above).tobytes()
+        self._previous_row = block.crop((0, block.height - 1, self.width, block.height))
+
+        stride = self.width * 3
+        filter_byte = bytes([PNG_FILTER_UP])
+        raw = b"".join(
+            filter_byte + filtered[offset:offset + stride]
+            for offset in range(0, len(filtered), stride)
+        )
+        self._queue(self._compressor.compress(raw))
+        self.rows_written += block.height
+
+    def close(self):
+        """结束压缩流并写出 IEND"""
+        if self._closed:
+            return
+        if self.rows_written != self.height:
+            raise ValueError(f"只写入了 {self.rows_written}/{self.height} 行")
+        self._queue(self._compressor.flush())
+        self._flush_idat()
+        self._write_chunk(b"IEND", b"")
+        self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+
+    def _queue(self, data: bytes):
+        if not data:
+            return
+        self._pending.append(data)
+        self._pending_bytes += len(data)
+        if self._pending_bytes >= IDAT_CHUNK_BYTES:
+            self._flush_idat()
+
+    def _flush_idat(self):
+        if not self._pending:
+            return
+        self._write_chunk(b"IDAT", b"".join(self._pending))
+        self._pending = []
+        self._pending_bytes = 0
+
+    def _write_chunk(self, chunk_type: bytes, data: bytes):
+        self.stream.write(struct.pack(">I", len(data)))
+        self.stream.write(chunk_type)
+        self.stream.write(data)
+        self.stream.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(chunk_type)) & 0xFFFFFFFF))
@@ -0,0 +1,239 @@
+"""
+格子渲染缓存服务 - 跨运行复用已渲染的格子PNG（按内容寻址，LRU淘汰）
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from dataclasses import asdict, dataclass, replace
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from calendar_app.config.calendar_config import CalendarConfig
+from calendar_app.config.config_dependencies import STAGE_CELL_RASTER, get_stage_fingerprint
+from calendar_app.models.calendar_models import ImageGenerationRequest
+
+try:
+    import fcntl
+except ImportError:  # 非POSIX平台：淘汰时不加跨进程锁
+    fcntl = None
+
+
+RENDER_CACHE_VERSION = 1  # 缓存格式与渲染方式版本（缓存布局变化时递增）
+
+# 字体文件内容哈希：键为 (路径, 修改时间, 大小)，文件变动后自动重新计算
+_font_hashes: Dict[Tuple[str, float, int], str] = {}
+_font_hashes_lock = threading.Lock()
+
+
+def font_content_hash(path: Optional[str]) -> str:
+    """计算字体文件内容哈希（进程内记忆）"""
+    if not path or not os.path.exists(path):
+        return "default"
+    stat = os.stat(path)
+    key = (path, stat.st_mtime, stat.st_size)
+    with _font_hashes_lock:
+        digest = _font_hashes.get(key)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+            _font_hashes[key] = digest
+        return digest
+
+
+@lru_cache(maxsize=None)
+def code_fingerprint() -> str:
+    """程序代码指纹（代码变动后渲染缓存、成品缓存与构建清单都视为过期；进程内只计算一次，与已加载的代码一致）"""
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sha = hashlib.sha256()
+    for directory, _dirs, files in sorted(os.walk(package_root)):
+        for name in sorted(files):
+            if name.endswith(".py"):
+                stat = os.stat(os.path.join(directory, name))
+                sha.update(f"{os.path.relpath(os.path.join(directory, name), package_root)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return sha.hexdigest()
+
+
+@dataclass
+class RenderCacheStats:
+    """渲染缓存命中统计"""
+
+    hits: int = 0  # 命中次数
+    misses: int = 0  # 未命中次数
+    writes: int = 0  # 写入次数
+    evictions: int = 0  # 淘汰文件数
+
+    @property
+    def hit_rate(self) -> float:
+        """命中率"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class RenderCache:
+    """
+    磁盘格子渲染缓存
+
+    键为 请求字段 + 影响绘制的配置值 + 字体文件内容哈希 + 渲染后端 + 缓存版本与代码指纹 的哈希
+    （升级后像素可能变化，旧条目不再命中，由LRU淘汰）；
+    写入采用临时文件 + 原子替换，多进程并发读写安全；总大小超限时按访问时间淘汰。
+    """
+
+    def __init__(self, config: CalendarConfig = CalendarConfig, backend: str = ""):
+        self.config = config
+        self.backend = backend
+        self.root = None
+        if config.CACHE_DIR and config.RENDER_CACHE_MAX_BYTES:
+            self.root = os.path.join(config.CACHE_DIR, "cells")
+        self.max_bytes = int(config.RENDER_CACHE_MAX_BYTES or 0)
+        self.stats = RenderCacheStats()
+        self._base_key = None
+        self._written_bytes = 0
+        self._lock = threading.Lock()  # 保护统计与写入量（批量生成时多个任务线程共用）
+
+    @property
+    def enabled(self) -> bool:
+        """是否启用磁盘缓存"""
+        return self.root is not None
+
+    def get_stats(self) -> RenderCacheStats:
+        """获取命中统计的快照"""
+        with self._lock:
+            return replace(self.stats)
+
+    def make_key(self, request: ImageGenerationRequest, profile: str = "default") -> str:
+        """
+        计算请求的缓存键
+
+        Args:
+            request: 图像生成请求
+            profile: PNG编码档位
+
+        Returns:
+            str: sha256 十六进制摘要
+        """
+        if self._base_key is None:
+            font_paths = [self.config.FONT_PATH] + list(self.config.FONT_FALLBACK_PATHS)
+            font_path = next((path for path in font_paths if path and os.path.exists(path)), None)
+            self._base_key = json.dumps({
+                "version": RENDER_CACHE_VERSION,
+                "code": code_fingerprint(),
+                "config": get_stage_fingerprint(STAGE_CELL_RASTER, self.config),
+                "font": font_content_hash(font_path),
+                "backend": self.backend,
+            }, sort_keys=True)
+        # 月份只在1号格子上绘制，周末标记只影响Excel背景，不参与缓存键
+        fields = asdict(request)
+        fields.pop("is_weekend", None)
+        if request.day != 1:
+            fields["month"] = None
+        if profile != "default":
+            fields["png_profile"] = profile
+        payload = self._base_key + json.dumps(fields, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.png")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """读取缓存，命中时刷新访问时间"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.stats.misses += 1
+            return None
+        with self._lock:
+            self.stats.hits += 1
+        return data
+
+    def get_size(self, key: str) -> Optional[int]:
+        """查看缓存条目大小（不读取内容，不计入命中统计），不存在时返回None"""
+        if not self.enabled:
+            return None
+        try:
+            return os.path.getsize(self._path(key))
+        except OSError:
+            return None
+
+    def put(self, key: str, data: bytes):
+        """写入缓存（原子替换）"""
+        if not self.enabled:
+            return
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        except OSError as e:
+            print(f"写入渲染缓存失败: {e}")
+            return
+        with self._lock:
+            self.stats.writes += 1
+            self._written_bytes += len(data)
+            # 本进程写入量超过上限的十分之一时检查一次总大小
+            should_evict = self._written_bytes * 10 >= self.max_bytes
+            if should_evict:
+                self._written_bytes = 0
+        if should_evict:
+            self.evict()
+
+    def evict(self):
+        """总大小超限时，按最近访问时间从旧到新删除，直到降到上限的90%"""
+        if not self.enabled or not os.path.isdir(self.root):
+            return
+        lock_file = None
+        try:
+            if fcntl is not None:
+                lock_file = open(os.path.join(self.root, ".evict.lock"), "w")
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return  # 其他进程正在淘汰
+            entries = []
+            total = 0
+            for directory, _dirs, files in os.walk(self.root):
+                for name in files:
+                    if not name.endswith(".png"):
+                        continue
+                    path = os.path.join(directory, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+            if total <= self.max_bytes:
+                return
+            target = self.max_bytes * 0.9
+            for _mtime, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    with self._lock:
+                        self.stats.evictions += 1
+                except OSError:
+                    pass
+                total -= size
+        finally:
+            if lock_file is not None:
+                lock_file.close()
@@ -0,0 +1,304 @@
+"""
+并行渲染服务 - 使用进程池并行生成格子图像
+"""
+
+import io
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+from PIL import Image
+
+from calendar_app.config.calendar_config import CalendarConfig
+from calendar_app.models.calendar_models import ImageGenerationRequest, ResolvedLayout
+from calendar_app.services.cell_image_service import CellImageService
+from calendar_app.services.layout_resolver import resolve_layout
+from calendar_app.services.metrics import LatencyHistogram
+from calendar_app.services.png_encoder import encode_png, get_png_profile
+from calendar_app.services.render_cache import RenderCache
+
+
+# 工作进程内的格子图像服务（每个进程初始化一次）
+_worker_service: Optional[CellImageService] = None
+
+
+def get_config_payload(config: CalendarConfig):
+    """传给工作进程的配置：配置类可按引用序列化时直接传类，否则（如动态创建的子类）传配置快照"""
+    try:
+        pickle.dumps(config)
+        return config
+    except Exception:
+        return config.snapshot()
+
+
+def load_config_payload(config_payload) -> CalendarConfig:
+    """在工作进程中还原 get_config_payload 的结果"""
+    if isinstance(config_payload, dict):
+        return CalendarConfig.from_snapshot(config_payload)
+    return config_payload
+
+
+def _init_worker(config_payload, layout: ResolvedLayout):
+    """工作进程初始化：重建配置，直接使用主进程解析好的布局并预热字体"""
+    global _worker_service
+    _worker_service = CellImageService(load_config_payload(config_payload), layout)
+    _worker_service.warm_up()
+
+
+def encode_images(images: List[Image.Image], profile: str = "default",
+                  baseline: bool = False) -> Tuple[List[bytes], Optional[List[bytes]]]:
+    """
+    按编码档位编码一批图像
+
+    Args:
+        images: 图像
+        profile: PNG编码档位
+        baseline: 是否同时给出同一图像的 default 档位编码（用于统计节省量，default 档位时不重复编码）
+
+    Returns:
+        Tuple[List[bytes], Optional[List[bytes]]]: 档位编码与 default 档位编码（baseline 为 False 时为None）
+    """
+    encoded = [encode_png(img, profile) for img in images]
+    if not baseline:
+        return encoded, None
+    if profile == "default":
+        return encoded, encoded
+    return encoded, [encode_png(img, "default") for img in images]
+
+
+def _render_batch(requests: List[ImageGenerationRequest], profile: str = "default",
+                  baseline: bool = False) -> Tuple[List[bytes], Optional[List[bytes]], LatencyHistogram]:
+    """在工作进程中渲染一批格子并按编码档位编码为PNG（同时返回 default 档位编码与各格渲染耗时）"""
+    images, latency = create_images_timed(_worker_service, requests)
+    return encode_images(images, profile, baseline) + (latency,)
+
+
+def _ping() -> int:
+    """空任务（用于提前拉起工作进程）"""
+    return os.getpid()
+
+
+def create_images_timed(service: CellImageService,
+                        requests: List[ImageGenerationRequest]) -> Tuple[List[Image.Image], LatencyHistogram]:
+    """
+    渲染一批格子并记录每格耗时
+
+    逐格渲染的后端按格计时；SVG 后端整批合并渲染，批次耗时按格均摊。
+
+    Returns:
+        Tuple[List[Image.Image], LatencyHistogram]: 图像（顺序与请求一致）与耗时直方图
+    """
+    latency = LatencyHistogram()
+    if service.uses_svg() and len(requests) > 1:
+        start = time.perf_counter()
+        images = service.create_images(requests)
+        share = (time.perf_counter() - start) / len(requests)
+        for _ in requests:
+            latency.record(share)
+        return images, latency
+
+    images = []
+    for request in requests:
+        start = time.perf_counter()
+        images.append(service.create_image(request))
+        latency.record(time.perf_counter() - start)
+    return images, latency
+
+
+def resolve_worker_count(workers: Optional[int] = None, config: CalendarConfig = CalendarConfig) -> int:
+    """
+    解析工作进程数
+
+    Args:
+        workers: 显式指定的进程数（None 时使用配置，配置也为 None 时按CPU核数）
+
+    Returns:
+        int: 进程数（至少为1）
+    """
+    if workers is None:
+        workers = config.RENDER_WORKERS
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+class RenderPool:
+    """格子渲染池：workers=1 时在当前进程串行渲染，否则分发到进程池"""
+
+    def __init__(self, config: CalendarConfig = CalendarConfig, workers: Optional[int] = None,
+                 layout: Optional[ResolvedLayout] = None):
+        self.config = config
+        self.workers = resolve_worker_count(workers, config)
+        self.layout = layout or resolve_layout(config)
+        self.image_service = CellImageService(config, self.layout)
+        self.render_cache = RenderCache(config, backend=self.image_service.get_backend_name())
+        self.png_profile = str(config.CELL_PNG_PROFILE)
+        get_png_profile(self.png_profile)
+        self._executor = None
+        # 多个任务线程共享同一个渲染池时，串行路径共用字体对象，需要互斥
+        self._local_lock = threading.Lock()
+        self._executor_lock = threading.Lock()
+        self._latency_sinks: List[LatencyHistogram] = []
+        self._latency_lock = threading.Lock()
+
+    @property
+    def parallel(self) -> bool:
+        """是否使用进程池"""
+        return self.workers > 1
+
+    def render(self, requests: List[ImageGenerationRequest], profile: Optional[str] = None) -> List[bytes]:
+        """
+        批量渲染格子图像
+
+        Args:
+            requests: 图像生成请求列表
+            profile: PNG编码档位（默认使用配置 CELL_PNG_PROFILE）
+
+        Returns:
+            List[bytes]: PNG字节，顺序与请求一致
+        """
+        return self._render(requests, profile or self.png_profile)[0]
+
+    def render_with_baseline(self, requests: List[ImageGenerationRequest],
+                             profile: Optional[str] = None) -> Tuple[List[bytes], List[Optional[int]]]:
+        """
+        批量渲染格子图像，同时给出各格 default 档位PNG的大小（统计编码节省量用）
+
+        未命中缓存的格子对同一张图像再编码一次 default 档位（不重新渲染）并一起写入缓存；
+        命中缓存的格子只查看 default 档位缓存条目的大小，没有该条目时为None。
+
+        Returns:
+            Tuple[List[bytes], List[Optional[int]]]: PNG字节与 default 档位大小，顺序与请求一致
+        """
+        return self._render(requests, profile or self.png_profile, baseline=True)
+
+    def _render(self, requests: List[ImageGenerationRequest], profile: str,
+                baseline: bool = False) -> Tuple[List[bytes], Optional[List[Optional[int]]]]:
+        """经过磁盘缓存渲染；baseline 为 True 时同时返回 default 档位大小"""
+        if not self.render_cache.enabled:
+            results, baseline_data = self._render_uncached(requests, profile, baseline)
+            return results, [len(data) for data in baseline_data] if baseline else None
+
+        keys = [self.render_cache.make_key(request, profile) for request in requests]
+        results = [self.render_cache.get(key) for key in keys]
+        sizes = None
+        if baseline:
+            sizes = [None] * len(requests)
+            for index, data in enumerate(results):
+                if data is not None:
+                    sizes[index] = len(data) if profile == "default" else self.render_cache.get_size(
+                        self.render_cache.make_key(requests[index], "default"))
+        missing = [index for index, data in enumerate(results) if data is None]
+        if missing:
+            rendered, rendered_baseline = self._render_uncached(
+                [requests[index] for index in missing], profile, baseline)
+            for position, index in enumerate(missing):
+                results[index] = rendered[position]
+                self.render_cache.put(keys[index], rendered[position])
+                if baseline:
+                    sizes[index] = len(rendered_baseline[position])
+                    if profile != "default":
+                        self.render_cache.put(self.render_cache.make_key(requests[index], "default"),
+                                              rendered_baseline[position])
+        return results, sizes
+
+    def _render_uncached(self, requests: List[ImageGenerationRequest], profile: str = "default",
+                         baseline: bool = False) -> Tuple[List[bytes], Optional[List[bytes]]]:
+        """渲染格子（不经过磁盘缓存），返回档位编码与 default 档位编码（baseline 为 False 时为None）"""
+        if not requests:
+            return [], [] if baseline else None
+        if not self.parallel or len(requests) <= 1:
+            with self._local_lock:
+                images, latency = create_images_timed(self.image_service, requests)
+            self._record_latency(latency)
+            return encode_images(images, profile, baseline)
+
+        # 按批分发：每批在工作进程内可合并渲染（如SVG横条），结果按原顺序拼接
+        executor = self._get_executor()
+        batch_size = max(1, len(requests) // (self.workers * 4))
+        batches = [requests[start:start + batch_size] for start in range(0, len(requests), batch_size)]
+        results = []
+        baseline_results = [] if baseline else None
+        for batch_result, batch_baseline, latency in executor.map(
+                _render_batch, batches, [profile] * len(batches), [baseline] * len(batches)):
+            results.extend(batch_result)
+            if baseline:
+                baseline_results.extend(batch_baseline)
+            self._record_latency(latency)
+        return results, baseline_results
+
+    def _record_latency(self, latency: LatencyHistogram):
+        with self._latency_lock:
+            for sink in self._latency_sinks:
+                sink.merge(latency)
+
+    @contextmanager
+    def collect_latency(self):
+        """
+        收集期间内实际渲染（缓存未命中）的格子耗时
+
+        多个任务并发共用渲染池时，各收集器都会收到期间内所有任务的样本。
+
+        Yields:
+            LatencyHistogram: 耗时直方图
+        """
+        sink = LatencyHistogram()
+        with self._latency_lock:
+            self._latency_sinks.append(sink)
+        try:
+            yield sink
+        finally:
+            with self._latency_lock:
+                self._latency_sinks.remove(sink)
+
+    def render_images(self, requests: List[ImageGenerationRequest]) -> List[Image.Image]:
+        """
+        批量渲染格子图像（返回PIL图像，始终无损编码，不受 CELL_PNG_PROFILE 影响）
+
+        Args:
+            requests: 图像生成请求列表
+
+        Returns:
+            List[Image.Image]: RGBA图像，顺序与请求一致
+        """
+        if not self.render_cache.enabled and (not self.parallel or len(requests) <= 1):
+            with self._local_lock:
+                images, latency = create_images_timed(self.image_service, requests)
+            self._record_latency(latency)
+            return images
+        return [Image.open(io.BytesIO(data)).convert("RGBA") for data in self.render(requests, "default")]
+
+    def warm_up(self):
+        """预热当前进程的字体与图层缓存；并行时同时拉起全部工作进程（各自完成初始化）"""
+        with self._local_lock:
+            self.image_service.warm_up()
+        if self.parallel:
+            executor = self._get_executor()
+            for future in [executor.submit(_ping) for _ in range(self.workers)]:
+                future.result()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_init_worker,
+                    initargs=(get_config_payload(self.config), self.layout),
+                )
+            return self._executor
+
+    def close(self):
+        """关闭进程池"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
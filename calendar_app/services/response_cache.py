@@ -0,0 +1,97 @@
+"""
+响应缓存服务 - HTTP服务的内存LRU缓存（按字节上限）与磁盘成品缓存，附带 ETag
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from calendar_app.config.calendar_config import CalendarConfig
+from calendar_app.models.calendar_models import YearClass
+from calendar_app.services.output_store import OutputStore, get_output_key
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    """缓存的成品内容"""
+
+    data: bytes  # 文件内容
+    etag: str  # 强 ETag（内容 sha256，带引号）
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CachedResponse":
+        """根据内容生成（同时计算 ETag）"""
+        return cls(data, f'"{hashlib.sha256(data).hexdigest()[:32]}"')
+
+
+@dataclass
+class ResponseCacheStats:
+    """响应缓存命中统计"""
+
+    memory_hits: int = 0  # 内存命中次数
+    disk_hits: int = 0  # 磁盘命中次数
+    misses: int = 0  # 未命中（需要渲染）次数
+    evictions: int = 0  # 内存淘汰次数
+
+
+class ResponseCache:
+    """
+    响应缓存
+
+    同类年份（闰年与否 + 1月1日周几）的成品字节完全一致，缓存键为
+    (成品缓存键, 年份类别, 格式)，不同年份的同类请求共享缓存与 ETag。
+    磁盘层直接复用成品缓存 OutputStore（CACHE_DIR/outputs），渲染进程生成时已写入。
+    """
+
+    def __init__(self, config: CalendarConfig = CalendarConfig, output_store: Optional[OutputStore] = None):
+        self.config = config
+        self.max_bytes = max(0, int(config.RESPONSE_CACHE_MAX_BYTES or 0))
+        self.output_store = output_store or OutputStore(config)
+        self.stats = ResponseCacheStats()
+        self.size_bytes = 0
+        self._entries: "OrderedDict[Tuple[str, str, str], CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def make_key(self, year_class: YearClass, fmt: str) -> Tuple[str, str, str]:
+        """缓存键（与磁盘成品缓存同一个键，字体内容或代码变化后不会返回旧内容与 ETag）"""
+        return get_output_key(fmt, self.config), year_class.key, fmt
+
+    def get(self, key: Tuple[str, str, str]) -> Optional[CachedResponse]:
+        """读取内存缓存，未命中时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats.memory_hits += 1
+            return entry
+
+    def load(self, year_class: YearClass, fmt: str) -> Optional[CachedResponse]:
+        """读取磁盘缓存（有磁盘读写，调用方应放到线程中执行），未命中时返回None"""
+        data = self.output_store.load(year_class, fmt)
+        with self._lock:
+            if data is None:
+                self.stats.misses += 1
+                return None
+            self.stats.disk_hits += 1
+        return CachedResponse.from_bytes(data)
+
+    def put(self, key: Tuple[str, str, str], entry: CachedResponse):
+        """写入内存缓存（超过上限时按最近最少使用淘汰，单个超过上限的成品不缓存）"""
+        size = len(entry.data)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= len(previous.data)
+            self._entries[key] = entry
+            self.size_bytes += size
+            while self.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= len(evicted.data)
+                self.stats.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,243 @@
+"""
+Deep Zoom 瓦片导出服务 - 直接从格子渲染生成 DZI 瓦片金字塔，不生成整张大图
+"""
+
+import math
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from calendar_app.config.calendar_config import CalendarConfig
+from calendar_app.models.calendar_models import YearCalendarData
+from calendar_app.services.file_manager import atomic_output, cleanup_stale_output_temps, get_output_temp_path
+from calendar_app.services.full_image_exporter import FullImageExporter
+from calendar_app.services.render_pool import RenderPool, resolve_worker_count
+
+
+DZI_NAMESPACE = "http://schemas.microsoft.com/deepzoom/2008"
+
+
+class DeepZoomExporter:
+    """
+    Deep Zoom 瓦片金字塔导出服务
+
+    最高层按瓦片行自上而下绘制横条（横条由月份条带拼出），切成瓦片后并行编码；
+    其余各层按瓦片行从上一层的瓦片读回横条，缩小一半后切分。任何时候都不会创建整图画布。
+    """
+
+    def __init__(self, config: CalendarConfig = CalendarConfig,
+                 render_pool: Optional[RenderPool] = None, workers: Optional[int] = None,
+                 image_exporter: Optional[FullImageExporter] = None):
+        """
+        初始化导出服务
+
+        Args:
+            config: 配置对象
+            render_pool: 共享的渲染池（可选）
+            workers: 瓦片编码线程数（默认同渲染进程数）
+            image_exporter: 共享的大图导出服务（可选，用于绘制月份条带）
+        """
+        self.config = config
+        self.image_exporter = image_exporter or FullImageExporter(config, render_pool, workers)
+        self.layout = self.image_exporter.layout
+        self.tile_size = int(config.TILE_SIZE)
+        self.overlap = int(config.TILE_OVERLAP)
+        self.tile_format = str(config.TILE_FORMAT).lower()
+        self.workers = resolve_worker_count(workers, config)
+
+    def export(self, calendar_data: YearCalendarData, output_file: str) -> str:
+        """
+        导出 DZI 描述文件与瓦片目录（<名称>_files/<层级>/<列>_<行>.<格式>）
+
+        Args:
+            calendar_data: 日历数据
+            output_file: .dzi 文件路径
+
+        Returns:
+            str: .dzi 文件路径
+        """
+        files_dir = self.get_files_dir(output_file)
+        # 瓦片先写到同目录下本次运行独有的目录，完整后再换到正式位置，并发导出互不破坏
+        cleanup_stale_output_temps(files_dir)
+        building_dir = get_output_temp_path(files_dir)
+        os.makedirs(building_dir)
+        try:
+            max_level = self.get_max_level()
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                self._write_base_level(calendar_data, building_dir, max_level, executor)
+                for level in range(max_level - 1, -1, -1):
+                    self._write_downsampled_level(building_dir, level, executor)
+            self._replace_dir(building_dir, files_dir)
+        except BaseException:
+            shutil.rmtree(building_dir, ignore_errors=True)
+            raise
+
+        # 描述文件最后原子写出，存在即表示瓦片完整
+        with atomic_output(output_file) as tmp_path:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.build_descriptor())
+        return output_file
+
+    @staticmethod
+    def _replace_dir(source_dir: str, target_dir: str):
+        """用 source_dir 替换 target_dir（旧目录先改名移开再删除，替换本身只有两次 rename）"""
+        stale_dir = None
+        if os.path.isdir(target_dir):
+            stale_dir = f"{source_dir}.old"
+            os.rename(target_dir, stale_dir)
+        os.rename(source_dir, target_dir)
+        if stale_dir:
+            shutil.rmtree(stale_dir, ignore_errors=True)
+
+    @staticmethod
+    def get_files_dir(output_file: str) -> str:
+        """瓦片目录（与 .dzi 同名加 _files 后缀）"""
+        return os.path.splitext(output_file)[0] + "_files"
+
+    def build_descriptor(self) -> str:
+        """生成 .dzi 描述文件内容"""
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            f'<Image xmlns="{DZI_NAMESPACE}" Format="{self.tile_format}" '
+            f'Overlap="{self.overlap}" TileSize="{self.tile_size}">\n'
+            f'  <Size Width="{self.layout.total_width_px}" Height="{self.layout.total_height_px}"/>\n'
+            '</Image>\n'
+        )
+
+    def get_max_level(self) -> int:
+        """最高层级（该层为原始分辨率，第0层为1x1像素）"""
+        longest = max(self.layout.total_width_px, self.layout.total_height_px)
+        return max(0, math.ceil(math.log2(longest)))
+
+    def get_level_size(self, level: int) -> Tuple[int, int]:
+        """某层级的图像尺寸"""
+        factor = 2 ** (self.get_max_level() - level)
+        return (
+            max(1, math.ceil(self.layout.total_width_px / factor)),
+            max(1, math.ceil(self.layout.total_height_px / factor)),
+        )
+
+    def get_tile_grid(self, level: int) -> Tuple[int, int]:
+        """某层级的瓦片列数与行数"""
+        width, height = self.get_level_size(level)
+        return math.ceil(width / self.tile_size), math.ceil(height / self.tile_size)
+
+    def get_tile_box(self, level: int, col: int, row: int) -> Tuple[int, int, int, int]:
+        """瓦片在该层级中的 (x0, y0, x1, y1)，含重叠"""
+        width, height = self.get_level_size(level)
+        x0 = col * self.tile_size - (self.overlap if col > 0 else 0)
+        y0 = row * self.tile_size - (self.overlap if row > 0 else 0)
+        x1 = min(width, (col + 1) * self.tile_size + self.overlap)
+        y1 = min(height, (row + 1) * self.tile_size + self.overlap)
+        return x0, y0, x1, y1
+
+    def _tile_path(self, files_dir: str, level: int, col: int, row: int) -> str:
+        return os.path.join(files_dir, str(level), f"{col}_{row}.{self.tile_format}")
+
+    def _write_base_level(self, calendar_data: YearCalendarData, files_dir: str,
+                          level: int, executor: ThreadPoolExecutor):
+        """
+        逐瓦片行绘制原始分辨率横条，切分后交给线程池编码
+
+        提交一行瓦片后先等上一行编码完成再绘制下一条横条：编码与绘制重叠进行，
+        同时内存中最多只有两行瓦片，编码跟不上时不会堆积全部横条。
+        """
+        os.makedirs(os.path.join(files_dir, str(level)), exist_ok=True)
+        cols, rows = self.get_tile_grid(level)
+        bands: Dict[int, Tuple[int, Image.Image]] = {}
+        pending = []
+        for row in range(rows):
+            _x0, y0, _x1, y1 = self.get_tile_box(level, 0, row)
+            strip = self._render_strip(calendar_data, y0, y1, bands)
+            row_futures = []
+            for col in range(cols):
+                x0, _y0, x1, _y1 = self.get_tile_box(level, col, row)
+                tile = strip.crop((x0, 0, x1, y1 - y0))
+                row_futures.append(executor.submit(self._save_tile, tile, self._tile_path(files_dir, level, col, row)))
+            del strip
+            for future in pending:
+                future.result()
+            pending = row_futures
+        for future in pending:
+            future.result()
+
+    def _render_strip(self, calendar_data: YearCalendarData, top: int, bottom: int,
+                      bands: Dict[int, Tuple[int, Image.Image]]) -> Image.Image:
+        """
+        绘制整图中 [top, bottom) 的横条
+
+        月份条带按需绘制并保留到横条越过它为止，每个条带只绘制一次。
+        """
+        strip = Image.new("RGB", (self.layout.total_width_px, bottom - top), (255, 255, 255))
+        for month in range(1, 13):
+            band_top, band_bottom = self.image_exporter.get_month_band_box(month)
+            if band_bottom <= top:
+                bands.pop(month, None)
+                continue
+            if band_top >= bottom:
+                break
+            if month not in bands:
+                bands[month] = (band_top, self.image_exporter.render_month_band(calendar_data, month))
+            strip.paste(bands[month][1], (0, band_top - top))
+        return strip
+
+    def _write_downsampled_level(self, files_dir: str, level: int, executor: ThreadPoolExecutor):
+        """由上一层（更高分辨率）的瓦片缩小得到本层瓦片（各瓦片行并行）"""
+        os.makedirs(os.path.join(files_dir, str(level)), exist_ok=True)
+        _cols, rows = self.get_tile_grid(level)
+        futures = [
+            executor.submit(self._write_downsampled_row, files_dir, level, row)
+            for row in range(rows)
+        ]
+        for future in futures:
+            future.result()
+
+    def _write_downsampled_row(self, files_dir: str, level: int, row: int):
+        """读回上一层对应的横条，整体缩小一半后切成本层一行瓦片"""
+        width, _height = self.get_level_size(level)
+        source_width, source_height = self.get_level_size(level + 1)
+        cols, _rows = self.get_tile_grid(level)
+        _x0, y0, _x1, y1 = self.get_tile_box(level, 0, row)
+        source = self._read_region(files_dir, level + 1, (0, 2 * y0, source_width, min(source_height, 2 * y1)))
+        strip = source.resize((width, y1 - y0), self._get_resample_filter())
+        for col in range(cols):
+            x0, _y0, x1, _y1 = self.get_tile_box(level, col, row)
+            self._save_tile(strip.crop((x0, 0, x1, y1 - y0)), self._tile_path(files_dir, level, col, row))
+
+    def _read_region(self, files_dir: str, level: int, box: Tuple[int, int, int, int]) -> Image.Image:
+        """从某层级已写出的瓦片中拼出指定区域（每块取瓦片的非重叠部分）"""
+        x0, y0, x1, y1 = box
+        region = Image.new("RGB", (x1 - x0, y1 - y0), (255, 255, 255))
+        for row in self._tile_span(y0, y1):
+            for col in self._tile_span(x0, x1):
+                core = (
+                    max(x0, col * self.tile_size),
+                    max(y0, row * self.tile_size),
+                    min(x1, (col + 1) * self.tile_size),
+                    min(y1, (row + 1) * self.tile_size),
+                )
+                if core[0] >= core[2] or core[1] >= core[3]:
+                    continue
+                tile_x0, tile_y0, _tile_x1, _tile_y1 = self.get_tile_box(level, col, row)
+                with Image.open(self._tile_path(files_dir, level, col, row)) as tile:
+                    piece = tile.convert("RGB").crop((
+                        core[0] - tile_x0, core[1] - tile_y0,
+                        core[2] - tile_x0, core[3] - tile_y0,
+                    ))
+                region.paste(piece, (core[0] - x0, core[1] - y0))
+        return region
+
+    def _tile_span(self, start: int, end: int) -> List[int]:
+        return list(range(start // self.tile_size, (end - 1) // self.tile_size + 1))
+
+    def _save_tile(self, tile: Image.Image, path: str):
+        if self.tile_format in ("jpg", "jpeg"):
+            tile.save(path, format="JPEG", quality=90)
+        else:
+            tile.save(path, format="PNG")
+
+    def _get_resample_filter(self):
+        return getattr(Image.Resampling, str(self.config.RESAMPLE_FILTER).upper())
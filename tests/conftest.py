@@ -0,0 +1,58 @@
+"""
+测试公共配置 - 选择可用字体并生成小型测试配置
+"""
+
+import glob
+import os
+from typing import Optional
+
+import pytest
+
+from calendar_app.config.calendar_config import CalendarConfig
+
+
+# 系统字体目录（找不到配置中的字体时按顺序取第一个可用的 .ttf）
+SYSTEM_FONT_PATTERNS = (
+    "/usr/share/fonts/**/*.ttf",
+    "/usr/local/share/fonts/**/*.ttf",
+    "/Library/Fonts/*.ttf",
+    "/System/Library/Fonts/*.ttf",
+    "C:/Windows/Fonts/*.ttf",
+)
+
+
+def find_test_font() -> Optional[str]:
+    """
+    选择测试用字体
+
+    优先使用环境变量 CALENDAR_TEST_FONT，其次为配置中的字体，再次为系统字体；
+    都不可用时返回None（渲染使用PIL默认字体，各引擎之间的比较依然有效）
+    """
+    candidates = [os.environ.get("CALENDAR_TEST_FONT"), CalendarConfig.FONT_PATH]
+    candidates += list(CalendarConfig.FONT_FALLBACK_PATHS)
+    for pattern in SYSTEM_FONT_PATTERNS:
+        candidates += sorted(glob.glob(pattern, recursive=True))
+    return next((path for path in candidates if path and os.path.exists(path)), None)
+
+
+@pytest.fixture(scope="session")
+def font_path() -> Optional[str]:
+    return find_test_font()
+
+
+@pytest.fixture
+def make_config(tmp_path, font_path):
+    """生成测试配置（缓存与临时目录放在 tmp_path 下，单进程渲染）"""
+
+    def factory(**overrides):
+        values = {
+            "FONT_PATH": font_path,
+            "FONT_FALLBACK_PATHS": [],
+            "CACHE_DIR": str(tmp_path / "cache"),
+            "TEMP_DIR": str(tmp_path / "temp"),
+            "RENDER_WORKERS": 1,
+        }
+        values.update(overrides)
+        return CalendarConfig.with_overrides(values)
+
+    return factory
@@ -0,0 +1,23 @@
+"""
+批量生成汇总测试 - 吞吐量只统计实际渲染的任务
+"""
+
+from calendar_app.models.calendar_models import BatchJob, BatchReport
+
+
+def test_throughput_counts_rendered_jobs_only():
+    jobs = [
+        BatchJob(year=2026, format="png", output_file="a.png", status="rendered"),
+        BatchJob(year=2027, format="png", output_file="b.png", status="cached"),
+        BatchJob(year=2028, format="png", output_file="c.png", status="skipped"),
+        BatchJob(year=2029, format="png", output_file="d.png", status="failed"),
+    ]
+    report = BatchReport(jobs=jobs, elapsed=30.0)
+    assert len(report.succeeded) == 3
+    assert [report.count(status) for status in ("rendered", "cached", "skipped", "failed")] == [1, 1, 1, 1]
+    assert report.calendars_per_minute == 2.0
+
+
+def test_up_to_date_rerun_has_no_throughput():
+    jobs = [BatchJob(year=2026, format="xlsx", output_file="a.xlsx", status="skipped")]
+    assert BatchReport(jobs=jobs, elapsed=0.01).calendars_per_minute == 0.0
@@ -0,0 +1,72 @@
+"""
+增量构建测试 - 配置项到阶段的依赖与构建清单的过期判断
+"""
+
+import os
+
+from calendar_app.config.config_dependencies import (
+    STAGE_CELL_RASTER, STAGE_EXCEL_STYLE, STAGE_FULL_IMAGE, get_output_stages, get_unclassified_keys,
+)
+from calendar_app.services import build_manifest
+from calendar_app.services.build_manifest import BuildManifest
+
+
+def _record_output(config, tmp_path, fmt="xlsx"):
+    output_file = str(tmp_path / f"calendar.{fmt}")
+    with open(output_file, "wb") as f:
+        f.write(b"output")
+    BuildManifest(config).record(2026, fmt, output_file)
+    return output_file
+
+
+def test_every_config_key_is_classified():
+    assert get_unclassified_keys() == []
+
+
+def test_unchanged_inputs_are_up_to_date(make_config, tmp_path):
+    config = make_config()
+    output_file = _record_output(config, tmp_path)
+    assert BuildManifest(config).get_stale_stages(2026, "xlsx", output_file) == []
+    # 只改运行方式相关的配置不触发重建
+    assert BuildManifest(make_config(RENDER_WORKERS=8)).get_stale_stages(2026, "xlsx", output_file) == []
+
+
+def test_changed_config_invalidates_only_dependent_stages(make_config, tmp_path):
+    output_file = _record_output(make_config(), tmp_path)
+    stale = BuildManifest(make_config(COLOR_WEEKEND_BG="FFFFEEEE")).get_stale_stages(2026, "xlsx", output_file)
+    assert STAGE_EXCEL_STYLE in stale
+    assert STAGE_CELL_RASTER not in stale
+    stale = BuildManifest(make_config(RENDER_SCALE=2)).get_stale_stages(2026, "xlsx", output_file)
+    assert STAGE_CELL_RASTER in stale
+    assert STAGE_FULL_IMAGE not in get_output_stages("xlsx")
+
+
+def test_font_code_year_or_file_changes_rebuild_everything(make_config, tmp_path, monkeypatch):
+    font = tmp_path / "font.ttf"
+    font.write_bytes(b"font-a")
+    os.utime(font, (1_700_000_000, 1_700_000_000))
+    config = make_config(FONT_PATH=str(font))
+    output_file = _record_output(config, tmp_path)
+    all_stages = list(get_output_stages("xlsx"))
+
+    assert BuildManifest(config).get_stale_stages(2027, "xlsx", output_file) == all_stages
+
+    font.write_bytes(b"font-b")
+    os.utime(font, (1_700_000_100, 1_700_000_100))
+    assert BuildManifest(config).get_stale_stages(2026, "xlsx", output_file) == all_stages
+
+    output_file = _record_output(config, tmp_path)
+    monkeypatch.setattr(build_manifest, "code_fingerprint", lambda: "upgraded")
+    assert BuildManifest(config).get_stale_stages(2026, "xlsx", output_file) == all_stages
+    monkeypatch.undo()
+
+    # 输出文件被改动或删除后也要重建
+    with open(output_file, "ab") as f:
+        f.write(b"edited")
+    assert BuildManifest(config).get_stale_stages(2026, "xlsx", output_file) == all_stages
+
+
+def test_disabled_without_cache_or_incremental_build(make_config, tmp_path):
+    output_file = _record_output(make_config(), tmp_path)
+    assert not BuildManifest(make_config(INCREMENTAL_BUILD=False)).enabled
+    assert BuildManifest(make_config(CACHE_DIR=None)).get_stale_stages(2026, "xlsx", output_file)
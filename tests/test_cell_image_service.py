@@ -0,0 +1,55 @@
+"""
+图层合成引擎测试 - 与PIL逐格绘制的像素一致性
+"""
+
+import pytest
+from PIL import Image, ImageChops
+
+from calendar_app.models.calendar_models import ImageGenerationRequest
+from calendar_app.services.cell_image_service import CellImageService
+
+
+PIXEL_TOLERANCE = 2  # 预乘透明度后每个通道允许的最大差值
+
+
+def _max_premultiplied_difference(first: Image.Image, second: Image.Image) -> int:
+    """预乘透明度后的最大通道差（全透明像素的颜色不参与比较）"""
+    difference = ImageChops.difference(first.convert("RGBa"), second.convert("RGBa"))
+    return max(high for _low, high in difference.getextrema())
+
+
+def _sample_requests(config):
+    """一周七天（含周末）与带月份标签的1号格子"""
+    width, height = config.get_day_cell_width_px(), config.get_day_cell_height_px()
+    return [
+        ImageGenerationRequest(month=3, day=day, weekday_char=config.WEEKDAY_NAMES[day % 7],
+                               cell_width_px=width, cell_height_px=height, is_weekend=day % 7 >= 5)
+        for day in range(1, 8)
+    ] + [ImageGenerationRequest(month=12, day=31, weekday_char=config.WEEKDAY_NAMES[0],
+                                cell_width_px=width * 2, cell_height_px=height * 2)]
+
+
+@pytest.mark.parametrize("render_scale", [1, 4])
+def test_composite_matches_pil(make_config, render_scale):
+    composite_config = make_config(RENDER_ENGINE="composite", RENDER_SCALE=render_scale)
+    pil_config = make_config(RENDER_ENGINE="pil", RENDER_SCALE=render_scale)
+    composite = CellImageService(composite_config)
+    pil = CellImageService(pil_config)
+
+    for request in _sample_requests(composite_config):
+        composite_image = composite.create_image(request)
+        pil_image = pil.create_image(request)
+        assert composite_image.size == pil_image.size == (request.cell_width_px, request.cell_height_px)
+        assert _max_premultiplied_difference(composite_image, pil_image) <= PIXEL_TOLERANCE, request
+
+
+def test_layers_are_rendered_once_and_reused(make_config):
+    config = make_config(RENDER_ENGINE="composite")
+    service = CellImageService(config)
+    requests = _sample_requests(config)
+    first = [service.create_image(request).tobytes() for request in requests]
+    layer_count = len(service._layer_cache)
+    assert layer_count > 0
+    # 同样的格子再渲染一遍只复用已缓存的图层
+    assert [service.create_image(request).tobytes() for request in requests] == first
+    assert len(service._layer_cache) == layer_count
@@ -0,0 +1,90 @@
+"""
+文件管理测试 - 工作区加锁与清扫、输出原子写出与残留临时文件清扫
+"""
+
+import os
+import time
+
+import pytest
+
+from calendar_app.services import file_manager
+from calendar_app.services.file_manager import (
+    STALE_TEMP_DIR_AGE, TEMP_LOCK_NAME, TEMP_PENDING_PREFIX, TEMP_RUN_PREFIX,
+    FileManager, atomic_output, cleanup_stale_output_temps, cleanup_stale_temp_dirs, get_output_temp_path,
+)
+
+
+def _age(path, seconds=STALE_TEMP_DIR_AGE + 60):
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+@pytest.mark.skipif(file_manager.fcntl is None, reason="需要 fcntl.flock")
+def test_live_workspace_is_locked_before_it_becomes_visible(make_config):
+    config = make_config()
+    manager = FileManager(config)
+    workspace = manager.create_temp_dir()
+    root = os.path.dirname(workspace)
+    assert os.path.basename(workspace).startswith(TEMP_RUN_PREFIX)
+    assert os.path.exists(os.path.join(workspace, TEMP_LOCK_NAME))
+    assert not [name for name in os.listdir(root) if name.startswith(TEMP_PENDING_PREFIX)]
+
+    # 进程号对清扫没有意义：即使很旧，只要锁仍被持有就不删除
+    _age(workspace)
+    assert cleanup_stale_temp_dirs(root) == 0
+    assert os.path.isdir(workspace)
+
+    assert manager.cleanup_temp_files()
+    assert not os.path.exists(workspace)
+
+
+@pytest.mark.skipif(file_manager.fcntl is None, reason="需要 fcntl.flock")
+def test_sweep_removes_only_released_or_old_workspaces(tmp_path):
+    root = tmp_path / "temp"
+    dead = root / f"{TEMP_RUN_PREFIX}1_dead"
+    dead.mkdir(parents=True)
+    (dead / TEMP_LOCK_NAME).write_text("")
+    young_pending = root / f"{TEMP_PENDING_PREFIX}2_young"
+    young_pending.mkdir()
+    old_pending = root / f"{TEMP_PENDING_PREFIX}3_old"
+    old_pending.mkdir()
+    _age(old_pending)
+    unlocked = root / f"{TEMP_RUN_PREFIX}4_unlocked"
+    unlocked.mkdir()
+
+    assert cleanup_stale_temp_dirs(str(root)) == 2
+    assert sorted(os.listdir(root)) == sorted([young_pending.name, unlocked.name])
+
+
+def test_atomic_output_keeps_target_on_failure(tmp_path):
+    target = tmp_path / "calendar.xlsx"
+    target.write_text("old")
+    with pytest.raises(RuntimeError):
+        with atomic_output(str(target)) as tmp_file:
+            assert tmp_file.endswith(".xlsx")
+            with open(tmp_file, "w") as f:
+                f.write("partial")
+            raise RuntimeError("boom")
+    assert target.read_text() == "old"
+    assert os.listdir(tmp_path) == ["calendar.xlsx"]
+
+
+def test_crash_leftovers_are_swept_on_next_write(tmp_path):
+    target = tmp_path / "calendar.png"
+    old_leftover = get_output_temp_path(str(target), ".png")
+    with open(old_leftover, "w") as f:
+        f.write("crashed")
+    _age(old_leftover)
+    old_building_dir = get_output_temp_path(str(tmp_path / "calendar_files"))
+    os.makedirs(old_building_dir)
+    _age(old_building_dir)
+    in_progress = get_output_temp_path(str(target), ".png")
+    with open(in_progress, "w") as f:
+        f.write("writing")
+
+    assert cleanup_stale_output_temps(str(tmp_path / "calendar_files")) == 1
+    with atomic_output(str(target)) as tmp_file:
+        with open(tmp_file, "w") as f:
+            f.write("new")
+    assert target.read_text() == "new"
+    assert sorted(os.listdir(tmp_path)) == sorted(["calendar.png", os.path.basename(in_progress)])
@@ -0,0 +1,31 @@
+"""
+整年大图导出测试 - 按月份条带流式写出的PNG与整图渲染一致
+"""
+
+from PIL import Image, ImageChops
+
+from calendar_app.services.calendar_service import CalendarService
+from calendar_app.services.full_image_exporter import FullImageExporter
+
+
+def test_streaming_png_matches_in_memory(make_config, tmp_path):
+    config = make_config(CACHE_DIR=None, RENDER_SCALE=1)
+    calendar_data = CalendarService(config).generate_year_data(2024)
+    outputs = {}
+    for name, threshold in (("memory", None), ("stream", 0)):
+        exporter = FullImageExporter(make_config(CACHE_DIR=None, RENDER_SCALE=1,
+                                                 FULL_IMAGE_STREAM_THRESHOLD_PX=threshold), workers=1)
+        outputs[name] = exporter.render_year_image(calendar_data, str(tmp_path / f"{name}.png"))
+
+    with Image.open(outputs["memory"]) as memory, Image.open(outputs["stream"]) as stream:
+        assert memory.size == stream.size
+        assert ImageChops.difference(memory.convert("RGBA"), stream.convert("RGBA")).getbbox() is None
+    # 原子写出不留下临时文件
+    assert sorted(path.name for path in tmp_path.iterdir() if path.is_file()) == ["memory.png", "stream.png"]
+
+
+def test_threshold_selects_streaming(make_config):
+    exporter = FullImageExporter(make_config(CACHE_DIR=None, FULL_IMAGE_STREAM_THRESHOLD_PX=1), workers=1)
+    assert exporter._should_stream("year.png")
+    assert not exporter._should_stream("year.jpg")
+    assert not FullImageExporter(make_config(CACHE_DIR=None), workers=1)._should_stream("year.png")
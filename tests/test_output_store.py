@@ -0,0 +1,66 @@
+"""
+成品缓存测试 - 年份类别与缓存键（配置、字体内容变化时不复用旧成品）
+"""
+
+import os
+
+from calendar_app.services import output_store
+from calendar_app.services.calendar_service import CalendarService
+from calendar_app.services.output_store import OutputStore
+from calendar_app.services.response_cache import ResponseCache
+
+
+def _write_font(path, data: bytes, mtime: int):
+    path.write_bytes(data)
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def test_same_year_class_shares_path(make_config):
+    config = make_config()
+    service = CalendarService(config)
+    store = OutputStore(config)
+    # 2015 与 2026 都是平年且1月1日为周四，2024 为闰年
+    assert service.get_year_class(2015) == service.get_year_class(2026)
+    assert store.get_path(service.get_year_class(2015), "png") == store.get_path(service.get_year_class(2026), "png")
+    assert store.get_path(service.get_year_class(2024), "png") != store.get_path(service.get_year_class(2026), "png")
+
+
+def test_key_ignores_non_output_settings(make_config):
+    year_class = CalendarService().get_year_class(2026)
+    path = OutputStore(make_config()).get_path(year_class, "png")
+    assert OutputStore(make_config(RENDER_WORKERS=8, BATCH_MAX_JOBS=2)).get_path(year_class, "png") == path
+    assert OutputStore(make_config(COLOR_WEEKEND_BG="FFFFEEEE")).get_path(year_class, "png") != path
+
+
+def test_key_changes_when_font_content_changes(make_config, tmp_path):
+    """同一路径的字体被替换后，成品缓存与HTTP响应缓存都不能命中旧内容"""
+    font = _write_font(tmp_path / "font.ttf", b"font-a", 1_700_000_000)
+    config = make_config(FONT_PATH=font)
+    year_class = CalendarService().get_year_class(2026)
+    store = OutputStore(config)
+    assert store.save(year_class, "png", b"png rendered with font-a")
+    old_key = ResponseCache(config, store).make_key(year_class, "png")
+
+    _write_font(tmp_path / "font.ttf", b"font-b", 1_700_000_100)
+    assert store.load(year_class, "png") is None
+    assert not store.restore(year_class, "png", str(tmp_path / "out.png"))
+    assert ResponseCache(config, store).make_key(year_class, "png") != old_key
+
+
+def test_key_changes_with_code_version(make_config, monkeypatch):
+    """升级代码后不复用旧版本生成的成品"""
+    config = make_config()
+    year_class = CalendarService().get_year_class(2026)
+    store = OutputStore(config)
+    assert store.save(year_class, "xlsx", b"xlsx from the previous release")
+    monkeypatch.setattr(output_store, "code_fingerprint", lambda: "upgraded")
+    assert store.load(year_class, "xlsx") is None
+
+
+def test_response_cache_shares_store_key(make_config):
+    config = make_config()
+    year_class = CalendarService(config).get_year_class(2026)
+    store = OutputStore(config)
+    key = ResponseCache(config, store).make_key(year_class, "pdf")
+    assert os.path.basename(os.path.dirname(store.get_path(year_class, "pdf"))) == key[0]
@@ -0,0 +1,58 @@
+"""
+格子渲染缓存测试 - 缓存键随字体内容、代码版本与绘制配置变化
+"""
+
+import os
+
+from calendar_app.models.calendar_models import ImageGenerationRequest
+from calendar_app.services import render_cache
+from calendar_app.services.render_cache import RenderCache
+
+
+REQUEST = ImageGenerationRequest(month=1, day=5, weekday_char="一", cell_width_px=80, cell_height_px=60)
+
+
+def test_round_trip_and_stats(make_config):
+    cache = RenderCache(make_config(), backend="composite")
+    key = cache.make_key(REQUEST)
+    assert cache.get(key) is None
+    cache.put(key, b"cell")
+    assert cache.get(key) == b"cell"
+    assert cache.get_size(key) == 4
+    stats = cache.get_stats()
+    assert (stats.hits, stats.misses, stats.writes) == (1, 1, 1)
+
+
+def test_key_ignores_month_except_on_first_day(make_config):
+    cache = RenderCache(make_config(), backend="composite")
+    assert cache.make_key(REQUEST) == cache.make_key(ImageGenerationRequest(
+        month=7, day=5, weekday_char="一", cell_width_px=80, cell_height_px=60, is_weekend=True))
+    first = ImageGenerationRequest(month=1, day=1, weekday_char="一", cell_width_px=80, cell_height_px=60)
+    assert cache.make_key(first) != cache.make_key(ImageGenerationRequest(
+        month=2, day=1, weekday_char="一", cell_width_px=80, cell_height_px=60))
+
+
+def test_key_changes_with_code_version(make_config, monkeypatch):
+    """升级后（代码指纹或缓存版本变化）不再命中旧的格子图像"""
+    config = make_config()
+    old_key = RenderCache(config, backend="composite").make_key(REQUEST)
+    monkeypatch.setattr(render_cache, "code_fingerprint", lambda: "upgraded")
+    assert RenderCache(config, backend="composite").make_key(REQUEST) != old_key
+    monkeypatch.undo()
+    monkeypatch.setattr(render_cache, "RENDER_CACHE_VERSION", render_cache.RENDER_CACHE_VERSION + 1)
+    assert RenderCache(config, backend="composite").make_key(REQUEST) != old_key
+
+
+def test_key_changes_with_font_content_and_drawing_config(make_config, tmp_path):
+    font = tmp_path / "font.ttf"
+    font.write_bytes(b"font-a")
+    os.utime(font, (1_700_000_000, 1_700_000_000))
+    config = make_config(FONT_PATH=str(font))
+    key = RenderCache(config, backend="pil").make_key(REQUEST)
+
+    font.write_bytes(b"font-b")
+    os.utime(font, (1_700_000_100, 1_700_000_100))
+    assert RenderCache(config, backend="pil").make_key(REQUEST) != key
+    assert RenderCache(config, backend="composite").make_key(REQUEST) != RenderCache(config, backend="pil").make_key(REQUEST)
+    assert (RenderCache(make_config(RENDER_SCALE=2), backend="pil").make_key(REQUEST)
+            != RenderCache(make_config(RENDER_SCALE=3), backend="pil").make_key(REQUEST))
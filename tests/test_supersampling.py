@@ -0,0 +1,35 @@
+"""
+超采样测试 - RENDER_SCALE 放大绘制后缩小回目标尺寸，SUPERSAMPLE_TEXT 只对图层合成引擎生效
+"""
+
+import pytest
+from PIL import ImageChops
+
+from calendar_app.models.calendar_models import ImageGenerationRequest
+from calendar_app.services.cell_image_service import CellImageService
+from calendar_app.services.layout_resolver import build_layout
+
+
+@pytest.mark.parametrize("engine", ["composite", "pil"])
+def test_supersampled_cells_are_downsampled_to_target_size(make_config, engine):
+    config = make_config(RENDER_ENGINE=engine, RENDER_SCALE=1)
+    request = ImageGenerationRequest(month=1, day=1, weekday_char=config.WEEKDAY_NAMES[3],
+                                     cell_width_px=config.get_day_cell_width_px(),
+                                     cell_height_px=config.get_day_cell_height_px())
+    plain = CellImageService(config).create_image(request)
+    supersampled = CellImageService(make_config(RENDER_ENGINE=engine, RENDER_SCALE=4)).create_image(request)
+    assert plain.size == supersampled.size == (request.cell_width_px, request.cell_height_px)
+    # 超采样确实生效（抗锯齿后的像素与直接绘制不同）
+    assert ImageChops.difference(plain, supersampled).getbbox() is not None
+
+
+def test_text_scale_follows_supersample_text(make_config):
+    assert build_layout(make_config(RENDER_SCALE=4)).text_scale == 4
+    layout = build_layout(make_config(RENDER_ENGINE="composite", RENDER_SCALE=4, SUPERSAMPLE_TEXT=False))
+    assert (layout.render_scale, layout.text_scale) == (4, 1)
+
+
+@pytest.mark.parametrize("engine", ["pil", "svg", "auto"])
+def test_supersample_text_false_requires_composite(make_config, engine):
+    with pytest.raises(ValueError, match="SUPERSAMPLE_TEXT"):
+        build_layout(make_config(RENDER_ENGINE=engine, SUPERSAMPLE_TEXT=False))
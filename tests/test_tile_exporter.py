@@ -0,0 +1,62 @@
+"""
+Deep Zoom 瓦片导出测试 - 最高层瓦片编码的在途数量有上限、金字塔完整
+"""
+
+import os
+
+from calendar_app.services.calendar_service import CalendarService
+from calendar_app.services.tile_exporter import DeepZoomExporter
+
+
+class _LazyFuture:
+    def __init__(self, executor, fn, args):
+        self.executor = executor
+        self.fn = fn
+        self.args = args
+
+    def result(self):
+        if self.fn is not None:
+            self.fn(*self.args)
+            self.fn = None
+            self.executor.outstanding -= 1
+
+
+class _LazyExecutor:
+    """只在取结果时执行任务的执行器：记录尚未完成的任务数峰值（模拟编码跟不上绘制）"""
+
+    def __init__(self):
+        self.outstanding = 0
+        self.peak = 0
+
+    def submit(self, fn, *args):
+        self.outstanding += 1
+        self.peak = max(self.peak, self.outstanding)
+        return _LazyFuture(self, fn, args)
+
+
+def test_base_level_tiles_in_flight_are_bounded(make_config, tmp_path):
+    config = make_config(CACHE_DIR=None, RENDER_SCALE=1, TILE_SIZE=64)
+    exporter = DeepZoomExporter(config, workers=1)
+    calendar_data = CalendarService(config).generate_year_data(2026)
+    level = exporter.get_max_level()
+    cols, rows = exporter.get_tile_grid(level)
+    assert rows > 2
+
+    executor = _LazyExecutor()
+    exporter._write_base_level(calendar_data, str(tmp_path), level, executor)
+    assert executor.outstanding == 0
+    assert executor.peak <= 2 * cols
+    assert len(os.listdir(tmp_path / str(level))) == cols * rows
+
+
+def test_export_writes_complete_pyramid(make_config, tmp_path):
+    config = make_config(CACHE_DIR=None, RENDER_SCALE=1, TILE_SIZE=128)
+    exporter = DeepZoomExporter(config, workers=1)
+    output_file = str(tmp_path / "calendar.dzi")
+    exporter.export(CalendarService(config).generate_year_data(2026), output_file)
+
+    files_dir = exporter.get_files_dir(output_file)
+    for level in range(exporter.get_max_level() + 1):
+        cols, rows = exporter.get_tile_grid(level)
+        assert len(os.listdir(os.path.join(files_dir, str(level)))) == cols * rows
+    assert sorted(os.listdir(tmp_path)) == ["calendar.dzi", "calendar_files"]